@@ -3,17 +3,44 @@ Flask web application for video editing frontend.
 Allows users to upload videos, select transcript highlights, and process videos.
 """
 
+import base64
 import os
 import json
 import tempfile
+import time
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
+from flask import (
+    Flask,
+    Response,
+    render_template,
+    request,
+    jsonify,
+    send_file,
+    send_from_directory,
+    stream_with_context,
+)
 from werkzeug.utils import secure_filename
+from asset_catalogue import AssetCatalogue
+from asset_ingest import ingest_status, ingested_path, resolve_render_paths, start_ingest_thread
+from asset_store import GC_GRACE_SECONDS, AssetStore, is_valid_hash
+from audio_peaks import DEFAULT_PEAK_LEVEL, get_peaks_file
+from filmstrips import filmstrip_image_path, get_filmstrip
+from render_jobs import JobStore, resume_interrupted_jobs, run_job, start_job_thread
+from render_profiler import PROFILE_MODES, profile_call
 from video_overlay_script import (
     ProjectConfig,
     HighlightAssignment,
+    OutputVariant,
+    begin_streaming_outputs,
     build_transcript,
+    output_variants,
+    parse_aspect_ratio,
+    prune_pcm_cache,
     render_project,
+    stream_whisper_transcript,
+    streaming_marker_path,
+    SUBTITLE_RENDERERS,
+    SUBTITLE_SIDECAR_FORMATS,
 )
 
 # Vercel will serve the React build, so Flask only needs to be an API.
@@ -29,78 +56,37 @@ os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 os.makedirs('clips', exist_ok=True)
 os.makedirs('audio_files', exist_ok=True)
 
+# Render jobs and their finished segments survive restarts (see render_jobs.py)
+JOB_STORE = JobStore()
+# Uploaded clips/music are stored once per content hash (see asset_store.py)
+ASSET_STORE = AssetStore()
+# Indexed metadata for clips/ and audio_files/, served by /list-clips
+CATALOGUE = AssetCatalogue(ASSET_STORE)
+
+# /stream/<filename> follows a streaming render's file as it grows
+STREAM_CHUNK_BYTES = 256 * 1024
+STREAM_POLL_SECONDS = 0.25
+STREAM_IDLE_SECONDS = 60.0  # Stop following a file that has not grown for this long
+
+# /jobs/<job_id>/events pushes live progress as server-sent events
+EVENTS_KEEPALIVE_SECONDS = 15.0  # Comment line that keeps idle proxies from closing the stream
+EVENTS_POLL_SECONDS = 1.0  # Store polling for jobs rendered by another process
 
-def render_project_with_transcript(config: ProjectConfig, transcript: list):
+
+def render_project_with_transcript(config: ProjectConfig, transcript: list, checkpoint=None, progress=None):
     """
     Render project using an existing transcript instead of regenerating it.
     This avoids calling Whisper again which is slow and unnecessary.
+    An optional RenderCheckpoint makes the video pass resumable, and an
+    optional RenderProgress receives live progress.
     """
-    from video_overlay_script import (
-        map_assignments_to_segments,
-        process_video_with_overlays,
-        merge_audio_tracks,
-        generate_default_subtitle_segments,
-        HAVE_MOVIEPY
-    )
-
-    # Use the provided transcript instead of calling build_transcript
-    highlight_segments = map_assignments_to_segments(
-        transcript, config.highlight_assignments
-    )
-
-    any_segment_music = any(
-        assignment.music_path for assignment in config.highlight_assignments
-    )
-    needs_audio_merge = HAVE_MOVIEPY and (
-        config.preserve_audio or bool(config.global_music_path) or any_segment_music
-    )
-    final_output_path = config.output_path
-    silent_output_path = final_output_path
-
-    # Generate subtitle segments
-    subtitle_segments = config.subtitle_segments
-    if subtitle_segments is None:
-        subtitle_segments = generate_default_subtitle_segments(
-            transcript, highlight_segments
-        )
+    return render_project(config, checkpoint=checkpoint, transcript=transcript, progress=progress)
 
-    if needs_audio_merge:
-        root, ext = os.path.splitext(final_output_path)
-        ext = ext or ".mp4"
-        silent_output_path = f"{root}.silent{ext}"
-
-    # Render video with overlays
-    process_video_with_overlays(
-        config.main_video_path,
-        transcript,
-        highlight_segments,
-        config.subtitle_design,
-        silent_output_path,
-        subtitle_segments=subtitle_segments,
-        custom_subtitles=None,
-    )
 
-    # Merge audio if needed
-    if needs_audio_merge:
-        merge_audio_tracks(
-            silent_output_path,
-            config.main_video_path,
-            transcript,
-            highlight_segments,
-            final_output_path,
-            preserve_main_audio=config.preserve_audio,
-            global_music_path=config.global_music_path,
-            global_music_volume=config.global_music_volume,
-        )
+def render_job(config: ProjectConfig, transcript, checkpoint, progress=None):
+    """Render callback used by the job runner for jobs created by this API."""
+    return render_project_with_transcript(config, transcript or [], checkpoint=checkpoint, progress=progress)
 
-        if os.path.exists(silent_output_path) and silent_output_path != final_output_path:
-            os.remove(silent_output_path)
-
-    return {
-        "output_path": final_output_path,
-        "transcript": transcript,
-        "highlight_segments": highlight_segments,
-    }
 
 ALLOWED_VIDEO_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv'}
 ALLOWED_AUDIO_EXTENSIONS = {'mp3', 'wav', 'aac', 'm4a'}
@@ -111,6 +97,20 @@ def allowed_file(filename, allowed_extensions):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
 
+def parse_optional_bool(value):
+    """Parse an optional true/false query parameter (None when absent)."""
+    if value is None or value == '':
+        return None
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def store_main_video(file):
+    """Store an uploaded main video in the asset store and link it into uploads/."""
+    filename = secure_filename(file.filename)
+    content_hash = ASSET_STORE.put_stream(file.stream, os.path.splitext(filename)[1].lower(), 'video')
+    return ASSET_STORE.link(content_hash, app.config['UPLOAD_FOLDER'], filename), content_hash
+
+
 # The root route is handled by Vercel serving the React app's index.html.
 # This route is no longer needed in Flask.
 
@@ -123,7 +123,14 @@ def test_route():
 
 @app.route('/upload-video', methods=['POST'])
 def upload_video():
-    """Handle main video upload and generate transcript."""
+    """Handle main video upload and generate transcript.
+
+    With ``stream=true`` the response is newline-delimited JSON instead, one
+    object per line with an ``event`` field: ``uploaded`` once the video is
+    stored, ``words`` after each transcribed window (the new words, plus the
+    seconds transcribed out of the duration), then ``done`` with the same
+    fields as the plain response, or ``error``.
+    """
     if 'video' not in request.files:
         return jsonify({'error': 'No video file provided'}), 400
 
@@ -135,13 +142,17 @@ def upload_video():
         return jsonify({'error': 'Invalid file type. Please upload a video file.'}), 400
 
     try:
-        # Save the uploaded video
-        filename = secure_filename(file.filename)
-        video_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(video_path)
+        # Save the uploaded video (deduplicated by content hash)
+        video_path, content_hash = store_main_video(file)
 
         # Generate transcript using Whisper
         whisper_model = request.form.get('whisper_model', 'base')
+        if parse_optional_bool(request.form.get('stream')):
+            return Response(
+                stream_with_context(transcript_stream(video_path, content_hash, whisper_model)),
+                mimetype='application/x-ndjson',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+            )
         transcript = build_transcript(video_path, None, whisper_model)
 
         # Extract just the words for display
@@ -151,6 +162,7 @@ def upload_video():
         return jsonify({
             'success': True,
             'video_path': video_path,
+            'sha256': content_hash,
             'transcript': transcript,
             'full_text': full_text,
             'word_count': len(words)
@@ -160,6 +172,37 @@ def upload_video():
         return jsonify({'error': f'Error processing video: {str(e)}'}), 500
 
 
+def ndjson_event(event, data):
+    """Format one line of a newline-delimited JSON event stream."""
+    return json.dumps({'event': event, **data}) + '\n'
+
+
+def transcript_stream(video_path, content_hash, whisper_model):
+    """Yield the events of a streamed /upload-video transcription."""
+    yield ndjson_event('uploaded', {'video_path': video_path, 'sha256': content_hash})
+    transcript = []
+    try:
+        for words, transcribed, duration in stream_whisper_transcript(video_path, whisper_model):
+            yield ndjson_event('words', {
+                'start_word': len(transcript),
+                'words': words,
+                'transcribed_seconds': round(transcribed, 2),
+                'duration': round(duration, 2),
+            })
+            transcript.extend(words)
+    except Exception as e:
+        yield ndjson_event('error', {'error': f'Error processing video: {str(e)}'})
+        return
+    yield ndjson_event('done', {
+        'success': True,
+        'video_path': video_path,
+        'sha256': content_hash,
+        'transcript': transcript,
+        'full_text': ' '.join(entry['word'] for entry in transcript),
+        'word_count': len(transcript),
+    })
+
+
 @app.route('/upload-video-with-txt', methods=['POST'])
 def upload_video_with_txt():
     """Handle video upload with TXT transcript file."""
@@ -183,10 +226,8 @@ def upload_video_with_txt():
         return jsonify({'error': 'Transcript must be a .txt file'}), 400
 
     try:
-        # Save the uploaded video
-        video_filename = secure_filename(video_file.filename)
-        video_path = os.path.join(app.config['UPLOAD_FOLDER'], video_filename)
-        video_file.save(video_path)
+        # Save the uploaded video (deduplicated by content hash)
+        video_path, content_hash = store_main_video(video_file)
         print(f"[DEBUG] Video saved to: {video_path}")
 
         # Read the transcript text and split by lines
@@ -197,6 +238,7 @@ def upload_video_with_txt():
 
         # Generate transcript with evenly spaced timing
         from video_overlay_script import probe_video_metadata, evenly_spaced_transcript
+        # Cached by path/size/mtime, so the render reuses this probe.
         _, _, _, _, duration = probe_video_metadata(video_path)
         print(f"[DEBUG] Video duration: {duration} seconds")
 
@@ -229,6 +271,7 @@ def upload_video_with_txt():
         response_data = {
             'success': True,
             'video_path': video_path,
+            'sha256': content_hash,
             'transcript': transcript,
             'full_text': full_text,
             'word_count': len(words),
@@ -246,42 +289,149 @@ def upload_video_with_txt():
 
 @app.route('/upload-clip', methods=['POST'])
 def upload_clip():
-    """Handle clip/audio file upload for highlights."""
-    if 'file' not in request.files:
+    """Handle clip/audio file upload for highlights.
+
+    Files go into the content-addressed asset store. A client that already
+    knows the SHA-256 of its file can send ``sha256`` and ``filename`` instead
+    of the file (see /assets/<hash>) and skip the transfer entirely.
+    """
+    known_hash = (request.form.get('sha256') or '').lower()
+    if 'file' in request.files:
+        file = request.files['file']
+        original_name = file.filename
+    elif known_hash:
+        file = None
+        original_name = request.form.get('filename', '')
+    else:
         return jsonify({'error': 'No file provided'}), 400
 
-    file = request.files['file']
-    if file.filename == '':
+    if original_name == '':
         return jsonify({'error': 'No file selected'}), 400
 
     # Check if it's video or audio
-    is_video = allowed_file(file.filename, ALLOWED_VIDEO_EXTENSIONS)
-    is_audio = allowed_file(file.filename, ALLOWED_AUDIO_EXTENSIONS)
+    is_video = allowed_file(original_name, ALLOWED_VIDEO_EXTENSIONS)
+    is_audio = allowed_file(original_name, ALLOWED_AUDIO_EXTENSIONS)
 
     if not (is_video or is_audio):
         return jsonify({'error': 'Invalid file type. Please upload a video or audio file.'}), 400
 
     try:
-        filename = secure_filename(file.filename)
+        filename = secure_filename(original_name)
+        kind = 'video' if is_video else 'audio'
 
-        # Save to appropriate folder
-        if is_video:
-            save_path = os.path.join('clips', filename)
+        if file is not None:
+            content_hash = ASSET_STORE.put_stream(file.stream, os.path.splitext(filename)[1].lower(), kind)
+        elif ASSET_STORE.has(known_hash):
+            content_hash = known_hash
         else:
-            save_path = os.path.join('audio_files', filename)
+            return jsonify({'error': 'Unknown asset hash; upload the file instead', 'sha256': known_hash}), 404
+
+        # Link into the appropriate folder (same-named different content gets a unique name)
+        save_path = ASSET_STORE.link(content_hash, 'clips' if is_video else 'audio_files', filename)
+        CATALOGUE.record(save_path, content_hash)
 
-        file.save(save_path)
+        # Transcode to the render-friendly mezzanine/PCM audio in the background
+        start_ingest_thread(ASSET_STORE, content_hash)
 
         return jsonify({
             'success': True,
             'file_path': save_path,
-            'file_type': 'video' if is_video else 'audio'
+            'file_type': kind,
+            'sha256': content_hash,
+            'ingest': ingest_status(ASSET_STORE, content_hash)
         })
 
     except Exception as e:
         return jsonify({'error': f'Error uploading file: {str(e)}'}), 500
 
 
+@app.route('/assets/<content_hash>')
+def asset_info(content_hash):
+    """Tell a client whether the store already holds this SHA-256."""
+    asset = ASSET_STORE.get(content_hash.lower())
+    if asset is None:
+        return jsonify({'sha256': content_hash, 'exists': False}), 404
+    return jsonify({
+        'sha256': asset['hash'],
+        'exists': True,
+        'kind': asset['kind'],
+        'size': asset['size'],
+        'refcount': asset['refcount'],
+        'ingest': ingest_status(ASSET_STORE, asset['hash'])
+    })
+
+
+@app.route('/assets/<content_hash>/peaks')
+def asset_peaks(content_hash):
+    """Serve waveform peaks (binary, see audio_peaks.py) for an audio track."""
+    content_hash = content_hash.lower()
+    if not ASSET_STORE.has(content_hash):
+        return jsonify({'error': 'Asset not found'}), 404
+    try:
+        samples_per_peak = int(request.args.get('samples_per_peak', DEFAULT_PEAK_LEVEL))
+        path = get_peaks_file(
+            ASSET_STORE,
+            content_hash,
+            samples_per_peak,
+            decoded_audio_path=ingested_path(ASSET_STORE, content_hash, 'audio'),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': f'No audio to draw: {str(e).splitlines()[0]}'}), 422
+    # Content-addressed, so the peaks for a hash never change
+    return send_file(os.path.abspath(path), mimetype='application/octet-stream', max_age=31536000)
+
+
+@app.route('/assets/<content_hash>/filmstrip')
+def asset_filmstrip(content_hash):
+    """Describe the keyframe thumbnail sprite sheet of a video (built on first request)."""
+    content_hash = content_hash.lower()
+    if not is_valid_hash(content_hash):
+        return jsonify({'error': 'Asset not found'}), 404
+    try:
+        layout = get_filmstrip(ASSET_STORE, content_hash)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 422
+    except RuntimeError as e:
+        return jsonify({'error': f'Could not build filmstrip: {str(e).splitlines()[0]}'}), 500
+    if layout is None:
+        return jsonify({'error': 'Asset not found'}), 404
+    return jsonify(dict(layout, sha256=content_hash, image_url=f'/assets/{content_hash}/filmstrip.jpg'))
+
+
+@app.route('/assets/<content_hash>/filmstrip.jpg')
+def asset_filmstrip_image(content_hash):
+    """Serve a filmstrip sprite sheet built by /assets/<hash>/filmstrip."""
+    content_hash = content_hash.lower()
+    if not is_valid_hash(content_hash):
+        return jsonify({'error': 'Asset not found'}), 404
+    path = filmstrip_image_path(ASSET_STORE, content_hash)
+    if not os.path.exists(path):
+        return jsonify({'error': 'Filmstrip not built yet'}), 404
+    # The sheet only changes when FILMSTRIP_VERSION does, so revalidate cheaply
+    return send_file(os.path.abspath(path), mimetype='image/jpeg', max_age=3600)
+
+
+@app.route('/assets/gc', methods=['POST'])
+def asset_gc():
+    """Delete stored assets (and their derived caches) that nothing references.
+
+    Decoded music in the PCM cache that no render used within the grace
+    period is removed as well. ``grace_seconds`` can only lengthen the
+    default: an upload stores its object a moment before linking it, and a
+    shorter grace period could delete it in between.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        grace_seconds = max(float(data.get('grace_seconds', GC_GRACE_SECONDS)), GC_GRACE_SECONDS)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'grace_seconds must be a number'}), 400
+    removed = ASSET_STORE.collect_garbage(grace_seconds)
+    removed_pcm = prune_pcm_cache(max_age=grace_seconds)
+    return jsonify({'success': True, 'removed': removed, 'removed_pcm_files': len(removed_pcm)})
+
+
 @app.route('/process-video', methods=['POST'])
 def process_video():
     """Process the video with highlights and generate output."""
@@ -306,14 +456,54 @@ def process_video():
                 music_volume=float(highlight.get('music_volume', 1.0)),
                 occurrence=int(highlight.get('occurrence', 1)),
                 start_word=highlight.get('start_word'),
-                end_word=highlight.get('end_word')
+                end_word=highlight.get('end_word'),
+                fit_to_segment=bool(highlight.get('fit_to_segment', False))
             )
             assignments.append(assignment)
 
+        # Render from ingested mezzanine clips/decoded music where they are ready.
+        # Mezzanines keep the full frame, so every aspect ratio crops them as it
+        # would the original upload.
+        resolve_render_paths(ASSET_STORE, assignments)
+
         # Generate output filename
         output_filename = f"output_{Path(video_path).stem}.mp4"
         output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
 
+        # Optional extra crops (e.g. ["9:16", "1:1"]) rendered in the same pass
+        aspect_ratio = str(data.get('aspect_ratio') or '4:5')
+        extra_aspect_ratios = [str(ratio) for ratio in data.get('extra_aspect_ratios') or []]
+        try:
+            for ratio in [aspect_ratio, *extra_aspect_ratios]:
+                parse_aspect_ratio(ratio)
+        except ValueError as exc:
+            return jsonify({'error': str(exc)}), 400
+
+        # "ass" burns subtitles in with ffmpeg's libass; sidecars are "srt"/"ass"
+        subtitle_renderer = str(data.get('subtitle_renderer') or 'python')
+        if subtitle_renderer not in SUBTITLE_RENDERERS:
+            return jsonify({'error': f'Unknown subtitle renderer: {subtitle_renderer}'}), 400
+        subtitle_sidecars = [str(fmt) for fmt in data.get('subtitle_sidecars') or []]
+        # Fragmented MP4 that /stream/<filename> serves while the render runs
+        stream_output = bool(data.get('stream_output', False))
+        # Estimated peak (MB) above which the render takes bounded-memory paths
+        try:
+            memory_budget_mb = float(data['memory_budget_mb']) if data.get('memory_budget_mb') else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'memory_budget_mb must be a number'}), 400
+        for fmt in subtitle_sidecars:
+            if fmt not in SUBTITLE_SIDECAR_FORMATS:
+                return jsonify({'error': f'Unknown subtitle sidecar format: {fmt}'}), 400
+        # Profiling wraps this request's own render, which a background job leaves
+        profile_mode = data.get('profile')
+        if profile_mode:
+            if profile_mode is True:
+                profile_mode = 'sample'
+            if profile_mode not in PROFILE_MODES:
+                return jsonify({'error': f'Unknown profile mode: {profile_mode}'}), 400
+            if data.get('background'):
+                return jsonify({'error': 'profile cannot be combined with background renders'}), 400
+
         # Convert subtitles to subtitle_segments format (list of tuples)
         subtitle_segments = None
         if subtitles:
@@ -328,18 +518,65 @@ def process_video():
             output_path=output_path,
             highlight_assignments=assignments,
             preserve_audio=data.get('preserve_audio', True),
-            subtitle_segments=subtitle_segments
+            subtitle_segments=subtitle_segments,
+            aspect_ratio=aspect_ratio,
+            extra_outputs=[OutputVariant(aspect_ratio=ratio) for ratio in extra_aspect_ratios],
+            subtitle_renderer=subtitle_renderer,
+            subtitle_sidecars=subtitle_sidecars,
+            stream_output=stream_output,
+            memory_budget_mb=memory_budget_mb,
         )
+        # Store the final paths with the job so /jobs can report every file
+        config.extra_outputs = output_variants(config)[1:]
+        output_filenames = [os.path.basename(variant.output_path) for variant in output_variants(config)]
+
+        # Persist the job first so a restart mid-render resumes it instead of
+        # losing it; the render itself writes resumable segments.
+        job_id = JOB_STORE.create_job(config, transcript)
+
+        if data.get('background'):
+            if stream_output:
+                # /stream waits for this render from now on, not just once encoding starts
+                begin_streaming_outputs([variant.output_path for variant in output_variants(config)])
+            start_job_thread(JOB_STORE, job_id, render_job)
+            response_data = {
+                'success': True,
+                'job_id': job_id,
+                'status_url': f'/jobs/{job_id}',
+                'events_url': f'/jobs/{job_id}/events',
+                'output_filename': output_filename,
+                'output_filenames': output_filenames
+            }
+            if stream_output:
+                response_data['stream_url'] = f'/stream/{output_filename}?job={job_id}'
+            return jsonify(response_data), 202
+
+        # Render the project with the existing transcript, optionally profiled
+        profile_reports = None
+        if profile_mode:
+            result, profile_reports = profile_call(
+                lambda: run_job(JOB_STORE, job_id, render_job),
+                output_path,
+                mode=profile_mode,
+            )
+        else:
+            result = run_job(JOB_STORE, job_id, render_job)
 
-        # Render the project with the existing transcript
-        result = render_project_with_transcript(config, transcript)
+        if result is None:
+            return jsonify({'error': 'This render is already running in another process', 'job_id': job_id}), 409
 
-        return jsonify({
+        response_data = {
             'success': True,
+            'job_id': job_id,
             'output_path': output_path,
             'output_filename': output_filename,
+            'output_filenames': output_filenames,
+            'subtitle_filenames': [os.path.basename(path) for path in result.get('subtitle_files', [])],
             'message': 'Video processed successfully!'
-        })
+        }
+        if profile_reports:
+            response_data['profile_reports'] = profile_reports
+        return jsonify(response_data)
 
     except Exception as e:
         import traceback
@@ -347,6 +584,164 @@ def process_video():
         return jsonify({'error': f'Error processing video: {str(e)}'}), 500
 
 
+def describe_job(job_id, job):
+    """Status fields of a stored job, as reported by /jobs and its events."""
+    total = job['total_segments']
+    completed = job['completed_segments']
+    progress = 1.0 if job['status'] == 'completed' else (completed / total if total else 0.0)
+    response_data = {
+        'job_id': job_id,
+        'status': job['status'],
+        'progress': round(min(progress, 1.0), 4),
+        'completed_segments': completed,
+        'total_segments': total,
+        'attempts': job['attempts'],
+        'resumable': job['resumable'],
+        'output_filename': os.path.basename(job['config']['output_path']),
+        'output_filenames': [
+            os.path.basename(path)
+            for path in [job['config']['output_path']]
+            + [variant['output_path'] for variant in job['config'].get('extra_outputs') or []]
+        ]
+    }
+    if job['error']:
+        response_data['error'] = job['error'].splitlines()[0]
+    return response_data
+
+
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Report the status and segment progress of a render job."""
+    job = JOB_STORE.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(describe_job(job_id, job))
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Push a render job's progress as server-sent events.
+
+    ``progress`` events carry the stage, frames done out of the total,
+    measured fps and ETA, a few times per second. ``preview`` events carry a
+    downscaled JPEG of a recently composited frame as a data URL. A final
+    ``done`` event has the same fields as /jobs/<job_id> and ends the stream.
+    Jobs rendered by another process only report segment progress.
+    """
+    if JOB_STORE.get_job(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def events():
+        progress = None
+        sequence = preview_sequence = 0
+        try:
+            while True:
+                if progress is None:
+                    progress = JOB_STORE.live_progress.get(job_id)
+                    if progress is not None:
+                        progress.add_watcher()
+                if progress is None:
+                    job = JOB_STORE.get_job(job_id)
+                    status = describe_job(job_id, job)
+                    if job['status'] in ('completed', 'failed'):
+                        yield sse_event('done', status)
+                        return
+                    yield sse_event('progress', {'stage': job['status'], 'progress': status['progress']})
+                    time.sleep(EVENTS_POLL_SECONDS)
+                    continue
+
+                latest = progress.wait(sequence, EVENTS_KEEPALIVE_SECONDS)
+                if latest == sequence:
+                    yield ': keepalive\n\n'
+                    continue
+                sequence = latest
+                snapshot = progress.snapshot()
+                if snapshot['status'] is not None:
+                    yield sse_event('done', describe_job(job_id, JOB_STORE.get_job(job_id)))
+                    return
+                yield sse_event('progress', snapshot)
+                if progress.preview_sequence > preview_sequence:
+                    preview_sequence, jpeg = progress.preview_jpeg()
+                    if jpeg:
+                        yield sse_event('preview', {
+                            'image': 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode('ascii'),
+                        })
+        finally:
+            if progress is not None:
+                progress.remove_watcher()
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@app.route('/stream/<filename>')
+def stream_file(filename):
+    """Serve a rendered video while it is still being written.
+
+    Streaming renders write fragmented MP4, so every byte already on disk is
+    playable. The response follows the file as it grows and ends once the
+    render has finished it. Finished files are served normally, with ranges.
+
+    The ``stream_url`` of a background job adds ``?job=<job_id>``. While that
+    job is queued or running, the response waits for encoding to start
+    (transcript, audio mix, a wait for memory) instead of giving up after
+    ``STREAM_IDLE_SECONDS``.
+    """
+    file_path = os.path.abspath(os.path.join(app.config['OUTPUT_FOLDER'], secure_filename(filename)))
+    marker_path = streaming_marker_path(file_path)
+    job_id = request.args.get('job')
+    if not os.path.exists(marker_path):
+        if os.path.exists(file_path):
+            return send_file(file_path, mimetype='video/mp4', conditional=True)
+        return jsonify({'error': 'File not found'}), 404
+
+    def job_is_live():
+        job = JOB_STORE.get_job(job_id) if job_id else None
+        return job is not None and job['status'] in ('queued', 'running')
+
+    def follow():
+        idle_since = time.monotonic()
+        while not os.path.exists(file_path):
+            if not os.path.exists(marker_path):
+                return
+            if time.monotonic() - idle_since > STREAM_IDLE_SECONDS:
+                if not job_is_live():
+                    return
+                idle_since = time.monotonic()
+            time.sleep(STREAM_POLL_SECONDS)
+        with open(file_path, 'rb') as file:
+            idle_since = time.monotonic()
+            while True:
+                chunk = file.read(STREAM_CHUNK_BYTES)
+                if chunk:
+                    idle_since = time.monotonic()
+                    yield chunk
+                elif not os.path.exists(marker_path):
+                    # The writer removes the marker only after its last fragment
+                    rest = file.read()
+                    if rest:
+                        yield rest
+                    return
+                elif time.monotonic() - idle_since > STREAM_IDLE_SECONDS:
+                    return
+                else:
+                    time.sleep(STREAM_POLL_SECONDS)
+
+    return Response(
+        stream_with_context(follow()),
+        mimetype='video/mp4',
+        headers={'Cache-Control': 'no-cache'},
+    )
+
+
 @app.route('/download/<filename>')
 def download_file(filename):
     """Download the processed video."""
@@ -358,21 +753,53 @@ def download_file(filename):
 
 @app.route('/list-clips')
 def list_clips():
-    """List available clips and audio files."""
-    clips = []
-    audio_files = []
-
-    if os.path.exists('clips'):
-        clips = [f for f in os.listdir('clips') if allowed_file(f, ALLOWED_VIDEO_EXTENSIONS)]
-
-    if os.path.exists('audio_files'):
-        audio_files = [f for f in os.listdir('audio_files') if allowed_file(f, ALLOWED_AUDIO_EXTENSIONS)]
+    """List available clips and audio files from the asset catalogue.
+
+    Query parameters: ``kind`` (clips/audio), ``limit`` (every file when
+    omitted), ``cursor`` (the
+    ``next_cursor`` of the previous page, for a single kind), ``q`` (name
+    substring), ``has_audio`` (files without an ffprobe result report null and
+    match neither value), ``min_duration``, ``max_duration`` and ``rescan=1``
+    to re-check files modified in place.
+    """
+    args = request.args
+    kind = args.get('kind')
+    if kind not in (None, 'clips', 'audio'):
+        return jsonify({'error': 'kind must be clips or audio'}), 400
+    try:
+        limit = int(args['limit']) if args.get('limit') else None
+        min_duration = float(args['min_duration']) if args.get('min_duration') else None
+        max_duration = float(args['max_duration']) if args.get('max_duration') else None
+    except ValueError:
+        return jsonify({'error': 'limit, min_duration and max_duration must be numbers'}), 400
+
+    # Cheap when nothing changed: only folder mtimes are compared
+    CATALOGUE.scan(force=parse_optional_bool(args.get('rescan')) or False)
+
+    response_data = {'next_cursor': {}}
+    for list_kind, folder, names_key, details_key in (
+        ('clips', 'clips', 'clips', 'clip_details'),
+        ('audio', 'audio_files', 'audio_files', 'audio_details'),
+    ):
+        if kind not in (None, list_kind):
+            continue
+        details, next_cursor = CATALOGUE.page(
+            folder,
+            limit=limit,
+            cursor=args.get('cursor') if kind else None,
+            query=args.get('q'),
+            has_audio=parse_optional_bool(args.get('has_audio')),
+            min_duration=min_duration,
+            max_duration=max_duration,
+        )
+        response_data[names_key] = [detail['name'] for detail in details]
+        response_data[details_key] = details
+        response_data['next_cursor'][list_kind] = next_cursor
+    return jsonify(response_data)
 
-    return jsonify({
-        'clips': clips,
-        'audio_files': audio_files
-    })
 
+# Pick up renders interrupted by a crash or redeploy of a previous process.
+resume_interrupted_jobs(JOB_STORE, render_job)
 
 # This block is not needed for Vercel deployment.
 
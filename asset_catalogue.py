@@ -0,0 +1,289 @@
+"""
+Persistent catalogue of the clips and music offered by ``/list-clips``.
+
+Each file in ``clips/`` and ``audio_files/`` has one row with its duration,
+frame rate, resolution, audio presence, size and content hash. The row is
+written when the file is uploaded (``record``) or found by ``scan``. A scan
+only re-probes files whose mtime or size changed, and it only runs for a
+folder whose own mtime moved, which happens when an entry was added, removed
+or renamed. Listing is keyset-paginated by name: an unfiltered page, or one
+filtered by ``has_audio``, seeks through an index and costs the same in a
+library of ten assets or ten thousand. Name substring and duration filters
+check each row of the folder in name order, so their pages cost more the
+more rows they skip.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from asset_store import AssetStore, hash_file
+from video_overlay_script import get_media_metadata
+
+CATALOGUE_FOLDERS: Dict[str, Tuple[str, ...]] = {
+    "clips": (".mp4", ".avi", ".mov", ".mkv"),
+    "audio_files": (".mp3", ".wav", ".aac", ".m4a"),
+}
+MAX_PAGE_SIZE = 1000
+
+METADATA_COLUMNS = ("duration", "fps", "width", "height", "has_audio", "metadata_source")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalogue (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    hash TEXT,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    duration REAL,
+    fps REAL,
+    width INTEGER,
+    height INTEGER,
+    has_audio INTEGER,  -- NULL when unknown: only ffprobe lists audio streams
+    metadata_source TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS catalogue_folder_name ON catalogue(folder, name);
+CREATE INDEX IF NOT EXISTS catalogue_hash ON catalogue(hash);
+CREATE INDEX IF NOT EXISTS catalogue_folder_audio_name ON catalogue(folder, has_audio, name);
+CREATE TABLE IF NOT EXISTS catalogue_folders (
+    folder TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+"""
+
+
+class AssetCatalogue:
+    """SQLite index of the media files in the catalogued folders."""
+
+    def __init__(self, store: AssetStore, folders: Optional[Dict[str, Tuple[str, ...]]] = None):
+        self.store = store
+        self.folders = dict(folders or CATALOGUE_FOLDERS)
+        self.db_path = store.db_path
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+            columns = {row["name"] for row in connection.execute("PRAGMA table_info(catalogue)")}
+            if "metadata_source" not in columns:
+                # Older rows claimed "no audio" for every file probed without
+                # ffprobe; forget them so the next scan describes each file again.
+                connection.execute("ALTER TABLE catalogue ADD COLUMN metadata_source TEXT")
+                connection.execute("DELETE FROM catalogue")
+                connection.execute("DELETE FROM catalogue_folders")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        try:
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            yield connection
+        finally:
+            connection.close()
+
+    # ---------------------------------------------------------------- updates
+
+    def describe(
+        self,
+        connection: sqlite3.Connection,
+        folder: str,
+        name: str,
+        stat: os.stat_result,
+        content_hash: Optional[str] = None,
+    ) -> Dict[str, object]:
+        """Probe one file into a catalogue row.
+
+        Copies of content already in the catalogue reuse its metadata, so only
+        the hash is computed for them.
+        """
+
+        path = os.path.join(folder, name)
+        row: Dict[str, object] = {
+            "path": path,
+            "folder": folder,
+            "name": name,
+            "hash": content_hash,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "duration": None,
+            "fps": None,
+            "width": None,
+            "height": None,
+            "has_audio": None,
+            "metadata_source": None,
+            "error": None,
+            "updated_at": time.time(),
+        }
+        try:
+            if row["hash"] is None:
+                row["hash"] = self.store.referenced_hash(path) or hash_file(path)
+            known = connection.execute(
+                f"SELECT {', '.join(METADATA_COLUMNS)} FROM catalogue"
+                " WHERE hash = ? AND error IS NULL LIMIT 1",
+                (row["hash"],),
+            ).fetchone()
+            if known is not None:
+                row.update(dict(known))
+                return row
+            metadata = self.store.metadata(row["hash"]) or get_media_metadata(path)
+        except (IOError, OSError) as exc:
+            row["error"] = str(exc)
+            return row
+        width, height = metadata.display_size
+        row.update(
+            {
+                "duration": metadata.duration,
+                "fps": metadata.fps,
+                "width": width,
+                "height": height,
+                # Only ffprobe lists audio streams; the OpenCV fallback leaves it unknown
+                "has_audio": int(metadata.has_audio) if metadata.source == "ffprobe" else None,
+                "metadata_source": metadata.source,
+            }
+        )
+        return row
+
+    def _upsert(self, connection: sqlite3.Connection, rows: Iterable[Dict[str, object]]) -> None:
+        connection.executemany(
+            "INSERT OR REPLACE INTO catalogue (path, folder, name, hash, size, mtime_ns,"
+            " duration, fps, width, height, has_audio, metadata_source, error, updated_at)"
+            " VALUES (:path, :folder, :name, :hash, :size, :mtime_ns, :duration, :fps,"
+            " :width, :height, :has_audio, :metadata_source, :error, :updated_at)",
+            list(rows),
+        )
+
+    def record(self, path: str, content_hash: Optional[str] = None) -> Dict[str, object]:
+        """Add or refresh the row of one file (called right after an upload)."""
+
+        folder, name = os.path.split(os.path.normpath(path))
+        with self._connect() as connection:
+            row = self.describe(connection, folder, name, os.stat(path), content_hash)
+            self._upsert(connection, [row])
+        return row
+
+    def scan(self, force: bool = False) -> int:
+        """Bring the catalogue in line with the folders; return the rows changed.
+
+        Folders whose mtime has not moved since the last scan are skipped
+        unless ``force`` is set (needed to notice files rewritten in place).
+        """
+
+        changed = 0
+        for folder, extensions in self.folders.items():
+            if not os.path.isdir(folder):
+                continue
+            folder_mtime = os.stat(folder).st_mtime_ns
+            with self._connect() as connection:
+                seen = connection.execute(
+                    "SELECT mtime_ns FROM catalogue_folders WHERE folder = ?", (folder,)
+                ).fetchone()
+                if seen is not None and seen["mtime_ns"] == folder_mtime and not force:
+                    continue
+                known = {
+                    row["name"]: (row["size"], row["mtime_ns"])
+                    for row in connection.execute(
+                        "SELECT name, size, mtime_ns FROM catalogue WHERE folder = ?", (folder,)
+                    )
+                }
+
+            present: Dict[str, os.stat_result] = {}
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.lower().endswith(extensions):
+                        present[entry.name] = entry.stat()
+            removed = [name for name in known if name not in present]
+
+            with self._connect() as connection:
+                updates = 0
+                for name, stat in sorted(present.items()):
+                    if known.get(name) != (stat.st_size, stat.st_mtime_ns):
+                        # Upsert as we go so later copies of the same content reuse the row
+                        self._upsert(connection, [self.describe(connection, folder, name, stat)])
+                        updates += 1
+                connection.executemany(
+                    "DELETE FROM catalogue WHERE folder = ? AND name = ?",
+                    [(folder, name) for name in removed],
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO catalogue_folders (folder, mtime_ns) VALUES (?, ?)",
+                    (folder, folder_mtime),
+                )
+            changed += updates + len(removed)
+        return changed
+
+    # ---------------------------------------------------------------- queries
+
+    def page(
+        self,
+        folder: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        query: Optional[str] = None,
+        has_audio: Optional[bool] = None,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+    ) -> Tuple[List[Dict[str, object]], Optional[str]]:
+        """Return one page of rows ordered by name plus the cursor of the next page.
+
+        The cursor is the last name returned; pages seek through the
+        ``(folder, name)`` index instead of counting past earlier rows.
+        Without ``limit`` every matching row is returned in one page.
+        """
+
+        if limit is not None:
+            limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        clauses = ["folder = ?"]
+        params: List[object] = [folder]
+        if cursor:
+            clauses.append("name > ?")
+            params.append(cursor)
+        if query:
+            clauses.append("name LIKE ? ESCAPE '\\'")
+            escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        if has_audio is not None:
+            clauses.append("has_audio = ?")
+            params.append(int(has_audio))
+        if min_duration is not None:
+            clauses.append("duration >= ?")
+            params.append(float(min_duration))
+        if max_duration is not None:
+            clauses.append("duration <= ?")
+            params.append(float(max_duration))
+        sql = f"SELECT * FROM catalogue WHERE {' AND '.join(clauses)} ORDER BY name"
+        with self._connect() as connection:
+            if limit is None:
+                rows = connection.execute(sql, params).fetchall()
+                return [summarise_row(row) for row in rows], None
+            rows = connection.execute(f"{sql} LIMIT ?", (*params, limit + 1)).fetchall()
+        next_cursor = rows[limit - 1]["name"] if len(rows) > limit else None
+        return [summarise_row(row) for row in rows[:limit]], next_cursor
+
+
+def summarise_row(row: sqlite3.Row) -> Dict[str, object]:
+    """Shape a catalogue row like the ``/list-clips`` details the frontend reads."""
+
+    summary: Dict[str, object] = {
+        "name": row["name"],
+        "path": row["path"],
+        "sha256": row["hash"],
+        "size": row["size"],
+    }
+    if row["error"]:
+        summary["error"] = row["error"]
+        return summary
+    summary.update(
+        {
+            "duration": round(row["duration"], 3),
+            "fps": round(row["fps"], 3),
+            "width": row["width"],
+            "height": row["height"],
+            "has_audio": None if row["has_audio"] is None else bool(row["has_audio"]),
+        }
+    )
+    return summary
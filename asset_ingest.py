@@ -0,0 +1,365 @@
+"""
+Background ingest of uploaded assets into render-friendly intermediates.
+
+Overlay clips arrive in any codec and GOP structure, and without ingest all of
+that decode and seek cost lands inside the render. ``start_ingest_thread``
+converts each new asset once, off the request thread, into files kept in the
+asset's derived directory (``assets/derived/<hash>/``):
+
+- ``mezzanine.mp4``: the full, uncropped clip at its own resolution, as H.264
+  with a half-second GOP and no B-frames, so any seek decodes only a handful
+  of frames. Keeping the framing means every output aspect ratio crops the
+  same picture from it as from the original upload.
+- ``audio.wav``: the audio track decoded to 16-bit PCM, plus the waveform
+  peaks computed from it (see ``audio_peaks.py``).
+- ``ingest.json``: status plus metadata of the source and the outputs.
+
+``resolve_render_paths`` swaps clip and music paths for these files once ingest
+has finished; until then renders use the original upload. Assets ingested with
+an older ``INGEST_VERSION`` are ingested again the first time a render uses them.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import threading
+import time
+import traceback
+from dataclasses import asdict
+from typing import Dict, List, Optional, Sequence
+
+from asset_store import AssetStore
+from audio_peaks import PEAK_LEVELS, build_peaks
+from video_overlay_script import (
+    HighlightAssignment,
+    MediaMetadata,
+    find_ffmpeg,
+    get_keyframe_index,
+    get_media_metadata,
+    media_metadata_from_dict,
+)
+
+INGEST_VERSION = 3  # Bump when the mezzanine settings change so assets re-ingest
+MEZZANINE_GOP_SECONDS = 0.5  # 0 makes the mezzanine all-intra
+MEZZANINE_CRF = 16  # Visually lossless for an intermediate that is decoded once more
+AUDIO_SAMPLE_RATE = 44100
+
+MANIFEST_NAME = "ingest.json"
+MEZZANINE_NAME = "mezzanine.mp4"
+AUDIO_NAME = "audio.wav"
+
+INGEST_STATUSES = ("running", "completed", "failed")
+
+# Hashes being ingested by this process, so repeated uploads do not start twice
+_INGESTS_IN_FLIGHT: Dict[str, threading.Thread] = {}
+_INGEST_LOCK = threading.Lock()
+
+
+# --------------------------------------------------------------------------- #
+# Manifest
+# --------------------------------------------------------------------------- #
+
+
+def read_manifest(store: AssetStore, content_hash: str) -> Optional[Dict[str, object]]:
+    """Return the ingest manifest of ``content_hash`` (``None`` if never ingested)."""
+
+    path = os.path.join(store.derived_root, content_hash, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(store: AssetStore, content_hash: str, manifest: Dict[str, object]) -> None:
+    """Atomically replace the ingest manifest of ``content_hash``."""
+
+    path = store.derived_path(content_hash, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+    os.replace(tmp_path, path)
+
+
+def ingest_status(store: AssetStore, content_hash: str) -> Dict[str, object]:
+    """Summarise the ingest state of ``content_hash`` for API responses."""
+
+    with _INGEST_LOCK:
+        in_flight = content_hash in _INGESTS_IN_FLIGHT
+    manifest = read_manifest(store, content_hash)
+    if manifest is None or manifest.get("version") != INGEST_VERSION:
+        return {"status": "running" if in_flight else "pending"}
+    status = {"status": manifest["status"]}
+    if manifest["status"] == "running" and not in_flight:
+        status["status"] = "pending"  # Left behind by a process that died
+    if manifest.get("error"):
+        status["error"] = str(manifest["error"]).splitlines()[0]
+    return status
+
+
+def ingested_path(store: AssetStore, content_hash: str, key: str) -> Optional[str]:
+    """Return the ingested file stored under ``key`` in a completed manifest."""
+
+    manifest = read_manifest(store, content_hash)
+    if (
+        manifest is None
+        or manifest.get("version") != INGEST_VERSION
+        or manifest.get("status") != "completed"
+    ):
+        return None
+    name = manifest.get(key)
+    if not name:
+        return None
+    path = os.path.join(store.derived_root, content_hash, name)
+    return path if os.path.exists(path) else None
+
+
+# --------------------------------------------------------------------------- #
+# Transcoding
+# --------------------------------------------------------------------------- #
+
+
+def mezzanine_filter(metadata: MediaMetadata) -> str:
+    """Return the ffmpeg filter chain that normalises a clip for the mezzanine.
+
+    The frame is neither cropped nor scaled down. Renders crop overlays to
+    each output's aspect ratio and size themselves, so the mezzanine must
+    match the frames they would decode from the original (rotated upright,
+    same pixels). An odd dimension loses its last row or column, since 4:2:0
+    chroma needs even ones; it is cropped rather than rescaled, so every
+    remaining pixel stays where it was.
+    """
+
+    width, height = metadata.display_size
+    target_width = max(2, width - width % 2)
+    target_height = max(2, height - height % 2)
+    if (target_width, target_height) == (width, height):
+        return "setsar=1"
+    return f"crop={target_width}:{target_height}:0:0,setsar=1"
+
+
+def build_mezzanine_command(
+    ffmpeg: str, source_path: str, output_path: str, metadata: MediaMetadata
+) -> List[str]:
+    """ffmpeg arguments that transcode ``source_path`` into the mezzanine format."""
+
+    gop = max(1, int(round((metadata.fps or 30.0) * MEZZANINE_GOP_SECONDS)))
+    return [
+        ffmpeg,
+        "-v",
+        "error",
+        "-nostdin",
+        "-y",
+        "-i",
+        source_path,
+        "-map",
+        "0:v:0",
+        "-an",
+        "-sn",
+        "-vf",
+        mezzanine_filter(metadata),
+        "-c:v",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-crf",
+        str(MEZZANINE_CRF),
+        "-g",
+        str(gop),
+        "-keyint_min",
+        str(gop),
+        "-sc_threshold",
+        "0",
+        "-bf",
+        "0",
+        "-pix_fmt",
+        "yuv420p",
+        "-fps_mode",
+        "passthrough",  # Keep the source timestamps; overlays are sampled by time
+        "-movflags",
+        "+faststart",
+        output_path,
+    ]
+
+
+def build_audio_command(ffmpeg: str, source_path: str, output_path: str) -> List[str]:
+    """ffmpeg arguments that decode the first audio stream to PCM WAV."""
+
+    return [
+        ffmpeg,
+        "-v",
+        "error",
+        "-nostdin",
+        "-y",
+        "-i",
+        source_path,
+        "-map",
+        "0:a:0",
+        "-vn",
+        "-c:a",
+        "pcm_s16le",
+        "-ar",
+        str(AUDIO_SAMPLE_RATE),
+        output_path,
+    ]
+
+
+def run_to_file(command: Sequence[str], output_path: str) -> None:
+    """Run an ffmpeg command that writes ``output_path`` via a temporary file."""
+
+    root, ext = os.path.splitext(output_path)
+    tmp_path = f"{root}.part{ext}"
+    try:
+        subprocess.run([*command[:-1], tmp_path], capture_output=True, check=True)
+        os.replace(tmp_path, output_path)
+    except subprocess.CalledProcessError as exc:
+        stderr = exc.stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(f"ffmpeg failed: {stderr or exc}") from exc
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def ingest_asset(store: AssetStore, content_hash: str) -> Dict[str, object]:
+    """Transcode ``content_hash`` into its render intermediates and return the manifest.
+
+    Failures are recorded in the manifest (renders then keep using the
+    original file) and re-raised.
+    """
+
+    asset = store.get(content_hash)
+    if asset is None:
+        raise KeyError(f"Unknown asset {content_hash}")
+    manifest: Dict[str, object] = {
+        "version": INGEST_VERSION,
+        "status": "running",
+        "kind": asset["kind"],
+        "started_at": time.time(),
+    }
+    write_manifest(store, content_hash, manifest)
+
+    try:
+        ffmpeg = find_ffmpeg()
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg is required to ingest assets.")
+        source_metadata = store.metadata(content_hash)
+        manifest["source"] = asdict(source_metadata)
+
+        if asset["kind"] == "video" and source_metadata.has_video:
+            mezzanine_path = store.derived_path(content_hash, MEZZANINE_NAME)
+            run_to_file(
+                build_mezzanine_command(ffmpeg, asset["path"], mezzanine_path, source_metadata),
+                mezzanine_path,
+            )
+            manifest["mezzanine"] = MEZZANINE_NAME
+            manifest["mezzanine_metadata"] = asdict(get_media_metadata(mezzanine_path))
+            # Build the keyframe index now so the first render does not probe
+            get_keyframe_index(mezzanine_path)
+
+        if source_metadata.has_audio:
+            audio_path = store.derived_path(content_hash, AUDIO_NAME)
+            run_to_file(build_audio_command(ffmpeg, asset["path"], audio_path), audio_path)
+            manifest["audio"] = AUDIO_NAME
+            build_peaks(store, content_hash, audio_path)
+            manifest["peaks"] = list(PEAK_LEVELS)
+
+        manifest["status"] = "completed"
+    except Exception:
+        manifest["status"] = "failed"
+        manifest["error"] = traceback.format_exc()
+        raise
+    finally:
+        manifest["finished_at"] = time.time()
+        write_manifest(store, content_hash, manifest)
+    return manifest
+
+
+def start_ingest_thread(store: AssetStore, content_hash: str) -> Optional[threading.Thread]:
+    """Ingest ``content_hash`` on a background thread unless it is done or running."""
+
+    manifest = read_manifest(store, content_hash)
+    if (
+        manifest is not None
+        and manifest.get("version") == INGEST_VERSION
+        and manifest.get("status") == "completed"
+    ):
+        return None
+
+    with _INGEST_LOCK:
+        if content_hash in _INGESTS_IN_FLIGHT:
+            return _INGESTS_IN_FLIGHT[content_hash]
+
+        def target() -> None:
+            try:
+                ingest_asset(store, content_hash)
+            except Exception:  # noqa: BLE001 - already stored in the manifest
+                print(f"[warn] Ingest of asset {content_hash} failed; renders use the original.")
+            finally:
+                with _INGEST_LOCK:
+                    _INGESTS_IN_FLIGHT.pop(content_hash, None)
+
+        thread = threading.Thread(target=target, name=f"ingest-{content_hash[:8]}", daemon=True)
+        _INGESTS_IN_FLIGHT[content_hash] = thread
+        thread.start()
+    return thread
+
+
+# --------------------------------------------------------------------------- #
+# Render integration
+# --------------------------------------------------------------------------- #
+
+
+def mezzanine_keeps_framing(manifest: Dict[str, object]) -> bool:
+    """Return True when the manifest's mezzanine shows the whole source frame.
+
+    A render with several aspect ratios crops every output from the same
+    overlay frame. A mezzanine is only a stand-in for the upload when it
+    has the upload's full picture. Anything else would change the framing
+    of some outputs depending on whether ingest had finished.
+    """
+
+    source, mezzanine = manifest.get("source"), manifest.get("mezzanine_metadata")
+    if not source or not mezzanine:
+        return False
+    source_size = media_metadata_from_dict(source).display_size
+    mezzanine_size = media_metadata_from_dict(mezzanine).display_size
+    # Odd source dimensions are evened for 4:2:0
+    return all(0 <= have - got <= 1 for have, got in zip(source_size, mezzanine_size))
+
+
+def resolve_render_paths(
+    store: AssetStore, assignments: Sequence[HighlightAssignment]
+) -> None:
+    """Point assignments at ingested clips and decoded music where available.
+
+    Paths that are not asset store links, or whose ingest has not finished,
+    are left unchanged. So are clips whose mezzanine does not have the full
+    source frame (see ``mezzanine_keeps_framing``); every output aspect
+    ratio must crop the same picture. Assets never ingested by this
+    ``INGEST_VERSION`` are queued for ingest so later renders can use them.
+    """
+
+    def resolve(path: str, key: str) -> str:
+        content_hash = store.referenced_hash(path)
+        if not content_hash:
+            return path
+        ingested = ingested_path(store, content_hash, key)
+        manifest = read_manifest(store, content_hash)
+        if ingested is None:
+            if manifest is None or manifest.get("version") != INGEST_VERSION:
+                start_ingest_thread(store, content_hash)
+            return path
+        if key == "mezzanine" and not mezzanine_keeps_framing(manifest):
+            print(f"[warn] Mezzanine of {content_hash} does not match the clip's frame; using the original.")
+            return path
+        return ingested
+
+    for assignment in assignments:
+        if assignment.clip_path:
+            assignment.clip_path = resolve(assignment.clip_path, "mezzanine")
+        if assignment.music_path:
+            assignment.music_path = resolve(assignment.music_path, "audio")
@@ -0,0 +1,302 @@
+"""
+Content-addressed storage for uploaded clips and music.
+
+Every upload is stored once under its SHA-256 (``assets/objects/ab/<hash>.<ext>``)
+no matter how often or under which name it arrives. The user-facing files in
+``clips/`` and ``audio_files/`` are hard links (copies where links are not
+supported) to those objects, recorded as references. An object without
+references is removed by ``collect_garbage`` together with its derived
+caches in ``assets/derived/<hash>/`` (metadata, conformed clips, audio, ...).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+from video_overlay_script import (
+    MediaMetadata,
+    get_media_metadata,
+    media_metadata_from_dict,
+)
+
+ASSET_ROOT = os.environ.get("VIDEO_OVERLAY_ASSET_DIR", "assets")
+HASH_CHUNK_SIZE = 1024 * 1024
+GC_GRACE_SECONDS = 3600.0  # Unreferenced objects younger than this are kept
+
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS asset_refs (
+    ref TEXT PRIMARY KEY,
+    hash TEXT NOT NULL REFERENCES assets(hash),
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS asset_refs_hash ON asset_refs(hash);
+"""
+
+
+def is_valid_hash(value: str) -> bool:
+    return bool(HASH_PATTERN.match(value or ""))
+
+
+def hash_file(path: str) -> str:
+    """Return the SHA-256 hex digest of ``path``."""
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalise_ref(path: str) -> str:
+    """References are stored as normalised paths relative to the working directory."""
+
+    return os.path.normpath(os.path.relpath(path)).replace(os.sep, "/")
+
+
+class AssetStore:
+    """SQLite index plus object directory for content-addressed assets."""
+
+    def __init__(self, root: str = ASSET_ROOT):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.derived_root = os.path.join(root, "derived")
+        self.tmp_dir = os.path.join(root, "tmp")
+        for directory in (self.objects_dir, self.derived_root, self.tmp_dir):
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = os.path.join(root, "assets.sqlite3")
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        try:
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            yield connection
+        finally:
+            connection.close()
+
+    # ----------------------------------------------------------------- objects
+
+    def object_path(self, content_hash: str, ext: str) -> str:
+        return os.path.join(self.objects_dir, content_hash[:2], f"{content_hash}{ext}")
+
+    def get(self, content_hash: str) -> Optional[Dict[str, object]]:
+        """Return the asset row (with ``path`` and ``refcount``) or ``None``."""
+
+        if not is_valid_hash(content_hash):
+            return None
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT a.*, COUNT(r.ref) AS refcount FROM assets a"
+                " LEFT JOIN asset_refs r ON r.hash = a.hash WHERE a.hash = ?"
+                " GROUP BY a.hash",
+                (content_hash,),
+            ).fetchone()
+        if row is None:
+            return None
+        asset = dict(row)
+        asset["path"] = self.object_path(content_hash, asset["ext"])
+        if not os.path.exists(asset["path"]):
+            return None
+        return asset
+
+    def has(self, content_hash: str) -> bool:
+        return self.get(content_hash) is not None
+
+    def put_stream(self, stream: BinaryIO, ext: str, kind: str) -> str:
+        """Store the bytes of ``stream``, hashing them in the same pass.
+
+        Returns the content hash; the bytes are kept only if the store did not
+        already hold that content.
+        """
+
+        digest = hashlib.sha256()
+        size = 0
+        descriptor, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix=ext)
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    file.write(chunk)
+                    size += len(chunk)
+            content_hash = digest.hexdigest()
+            self._adopt(tmp_path, content_hash, size, ext, kind)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return content_hash
+
+    def put_file(self, path: str, kind: str) -> str:
+        """Store a copy of an existing file and return its content hash."""
+
+        with open(path, "rb") as file:
+            return self.put_stream(file, os.path.splitext(path)[1].lower(), kind)
+
+    def _adopt(self, tmp_path: str, content_hash: str, size: int, ext: str, kind: str) -> None:
+        now = time.time()
+        existing = self.get(content_hash)
+        if existing is None:
+            target = self.object_path(content_hash, ext)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(tmp_path, target)
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO assets (hash, size, kind, ext, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(hash) DO UPDATE SET"
+                " last_used = excluded.last_used",
+                (content_hash, size, kind, ext, now, now),
+            )
+
+    # -------------------------------------------------------------- references
+
+    def link(self, content_hash: str, directory: str, filename: str) -> str:
+        """Expose ``content_hash`` as ``directory/filename`` and reference it.
+
+        A file of that name with different content is never overwritten: the
+        new link gets a ``-<hash prefix>`` suffix instead. Returns the path.
+        """
+
+        asset = self.get(content_hash)
+        if asset is None:
+            raise KeyError(f"Unknown asset {content_hash}")
+        os.makedirs(directory, exist_ok=True)
+        stem, ext = os.path.splitext(filename)
+        target = os.path.join(directory, filename)
+        if os.path.exists(target) and self.hash_for_path(target) != content_hash:
+            target = os.path.join(directory, f"{stem}-{content_hash[:8]}{ext}")
+
+        if not os.path.exists(target):
+            try:
+                os.link(asset["path"], target)
+            except OSError:
+                shutil.copyfile(asset["path"], target)
+
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO asset_refs (ref, hash, created_at) VALUES (?, ?, ?)",
+                (normalise_ref(target), content_hash, now),
+            )
+            connection.execute(
+                "UPDATE assets SET last_used = ? WHERE hash = ?", (now, content_hash)
+            )
+        return target
+
+    def unlink(self, path: str) -> None:
+        """Drop the reference held by ``path`` (the file itself is removed too)."""
+
+        with self._connect() as connection:
+            connection.execute("DELETE FROM asset_refs WHERE ref = ?", (normalise_ref(path),))
+        if os.path.exists(path):
+            os.remove(path)
+
+    def hash_for_path(self, path: str) -> Optional[str]:
+        """Return the content hash behind ``path``.
+
+        Uses the reference table when ``path`` is still a hard link to the
+        recorded object, hashing the file otherwise.
+        """
+
+        if not os.path.exists(path):
+            return None
+        return self.referenced_hash(path) or hash_file(path)
+
+    def referenced_hash(self, path: str) -> Optional[str]:
+        """Return the hash ``path`` links to, or ``None`` without hashing anything."""
+
+        if not os.path.exists(path):
+            return None
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT a.hash, a.ext FROM asset_refs r JOIN assets a ON a.hash = r.hash"
+                " WHERE r.ref = ?",
+                (normalise_ref(path),),
+            ).fetchone()
+        if row is not None:
+            object_path = self.object_path(row["hash"], row["ext"])
+            if os.path.exists(object_path) and os.path.samefile(path, object_path):
+                return row["hash"]
+        return None
+
+    # ----------------------------------------------------------------- derived
+
+    def derived_dir(self, content_hash: str) -> str:
+        """Directory for caches computed from ``content_hash`` (created on demand)."""
+
+        directory = os.path.join(self.derived_root, content_hash)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def derived_path(self, content_hash: str, name: str) -> str:
+        return os.path.join(self.derived_dir(content_hash), name)
+
+    def metadata(self, content_hash: str) -> Optional[MediaMetadata]:
+        """Media metadata for an asset, probed once per content hash."""
+
+        asset = self.get(content_hash)
+        if asset is None:
+            return None
+        cache_path = self.derived_path(content_hash, "metadata.json")
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, "r", encoding="utf-8") as file:
+                    return media_metadata_from_dict(json.load(file))
+            except (OSError, TypeError, ValueError):
+                pass
+        metadata = get_media_metadata(asset["path"])
+        with open(cache_path, "w", encoding="utf-8") as file:
+            json.dump(asdict(metadata), file)
+        return metadata
+
+    # ---------------------------------------------------------------------- gc
+
+    def collect_garbage(self, grace_seconds: float = GC_GRACE_SECONDS) -> List[str]:
+        """Delete objects nobody references any more; return their hashes.
+
+        References whose linked file has been deleted from disk are dropped
+        first, so removing a clip from ``clips/`` eventually frees its object.
+        """
+
+        cutoff = time.time() - grace_seconds
+        with self._connect() as connection:
+            refs = connection.execute("SELECT ref FROM asset_refs").fetchall()
+            missing = [row["ref"] for row in refs if not os.path.exists(row["ref"])]
+            connection.executemany(
+                "DELETE FROM asset_refs WHERE ref = ?", [(ref,) for ref in missing]
+            )
+            rows = connection.execute(
+                "SELECT a.hash, a.ext FROM assets a LEFT JOIN asset_refs r"
+                " ON r.hash = a.hash WHERE r.ref IS NULL AND a.last_used < ?",
+                (cutoff,),
+            ).fetchall()
+            removed: List[str] = []
+            for row in rows:
+                object_path = self.object_path(row["hash"], row["ext"])
+                if os.path.exists(object_path):
+                    os.remove(object_path)
+                shutil.rmtree(os.path.join(self.derived_root, row["hash"]), ignore_errors=True)
+                connection.execute("DELETE FROM assets WHERE hash = ?", (row["hash"],))
+                removed.append(row["hash"])
+        return removed
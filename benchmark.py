@@ -0,0 +1,392 @@
+"""
+Reproducible performance benchmarks for the video overlay pipeline.
+
+Synthetic inputs are produced with the same generators used by ``--demo``, so
+every machine renders identical media. Each case times the pipeline stages
+reported by ``render_project`` plus a per-frame subtitle drawing measurement,
+and the results are written as JSON that ``compare`` can check against a stored
+baseline.
+
+Usage:
+    python benchmark.py run --output bench_results.json
+    python benchmark.py compare bench_baseline.json bench_results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from video_overlay_script import (
+    HighlightAssignment,
+    ProjectConfig,
+    SubtitleDesign,
+    clear_render_caches,
+    compute_cropped_dimensions,
+    create_dummy_video,
+    create_overlay_clip,
+    draw_subtitle_on_frame,
+    render_project,
+)
+
+WORD_POOL = (
+    "look if you are suffering from neuropathy I need to ask you three quick "
+    "questions answer them honestly because what I am about to reveal could "
+    "explain why nothing you have tried has ever worked"
+).split()
+
+OVERLAY_RESOLUTION = (960, 768)
+SUBTITLE_SAMPLE_FRAMES = 300
+MS_STAGE_MARKER = "_ms"  # In the name of stages measured in milliseconds; the rest are seconds
+
+
+@dataclass
+class BenchmarkCase:
+    """One parameterised benchmark input."""
+
+    name: str
+    resolution: Tuple[int, int] = (1280, 720)  # (height, width) of the main video
+    duration: float = 6.0  # Main video length in seconds
+    fps: int = 30
+    highlights: int = 2  # Number of overlay highlights spread across the video
+    words_per_second: float = 2.5  # Subtitle density
+    ttf_font: bool = True  # Render subtitles with the bundled TTF font
+    audio: bool = False  # Give the main video an audio track and mix it in
+
+
+DEFAULT_CASES: List[BenchmarkCase] = [
+    BenchmarkCase("baseline-720p"),
+    BenchmarkCase("hershey-720p", ttf_font=False),
+    BenchmarkCase("dense-subtitles-720p", words_per_second=5.0),
+    BenchmarkCase("many-highlights-720p", highlights=6),
+    BenchmarkCase("no-highlights-720p", highlights=0),
+    BenchmarkCase("audio-720p", audio=True),
+    BenchmarkCase("baseline-1080p", resolution=(1920, 1080)),
+    BenchmarkCase("long-720p", duration=20.0),
+]
+
+
+# --------------------------------------------------------------------------- #
+# Input generation
+# --------------------------------------------------------------------------- #
+
+
+def prepare_case_media(case: BenchmarkCase, media_dir: str) -> Tuple[str, str]:
+    """Generate (or reuse) the main video and overlay clip for ``case``."""
+
+    os.makedirs(media_dir, exist_ok=True)
+    height, width = case.resolution
+    main_path = os.path.join(
+        media_dir,
+        f"main_{width}x{height}_{case.duration:g}s_{case.fps}fps"
+        f"_{'audio' if case.audio else 'silent'}.mp4",
+    )
+    overlay_path = os.path.join(
+        media_dir, f"overlay_{OVERLAY_RESOLUTION[1]}x{OVERLAY_RESOLUTION[0]}.mp4"
+    )
+    if not os.path.exists(main_path):
+        create_dummy_video(
+            main_path,
+            duration=case.duration,
+            fps=case.fps,
+            resolution=case.resolution,
+            with_audio=case.audio,
+        )
+    if not os.path.exists(overlay_path):
+        create_overlay_clip(overlay_path, resolution=OVERLAY_RESOLUTION, with_audio=False)
+    return main_path, overlay_path
+
+
+def build_case_config(
+    case: BenchmarkCase, main_path: str, overlay_path: str, output_path: str
+) -> ProjectConfig:
+    """Create a deterministic project for ``case``."""
+
+    word_count = max(1, int(case.duration * case.words_per_second))
+    words = [WORD_POOL[idx % len(WORD_POOL)] for idx in range(word_count)]
+
+    assignments: List[HighlightAssignment] = []
+    if case.highlights > 0:
+        stride = word_count / case.highlights
+        for idx in range(case.highlights):
+            start_word = int(idx * stride)
+            end_word = min(word_count - 1, start_word + max(0, int(stride / 2) - 1))
+            assignments.append(
+                HighlightAssignment(
+                    clip_path=overlay_path, start_word=start_word, end_word=end_word
+                )
+            )
+
+    design = SubtitleDesign()
+    if not case.ttf_font:
+        design.font_path = None
+
+    return ProjectConfig(
+        main_video_path=main_path,
+        output_path=output_path,
+        transcript_text=" ".join(words),
+        highlight_assignments=assignments,
+        preserve_audio=case.audio,
+        subtitle_design=design,
+    )
+
+
+# --------------------------------------------------------------------------- #
+# Measurement
+# --------------------------------------------------------------------------- #
+
+
+def time_subtitle_drawing(
+    case: BenchmarkCase, config: ProjectConfig, result: Dict[str, object]
+) -> float:
+    """Return the mean milliseconds ``draw_subtitle_on_frame`` takes per frame."""
+
+    height, width = case.resolution
+    width, height = compute_cropped_dimensions(width, height, 4.0 / 5.0)
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    highlight_ranges = [
+        (seg["start_word"], seg["end_word"]) for seg in result["highlight_segments"]
+    ]
+    total_frames = int(case.duration * case.fps)
+    sample_frames = min(total_frames, SUBTITLE_SAMPLE_FRAMES)
+    if sample_frames <= 0:
+        return 0.0
+
+    layout_cache: Dict[Tuple[object, ...], Optional[Dict[str, object]]] = {}
+    started = time.perf_counter()
+    for idx in range(sample_frames):
+        frame_index = int(idx * total_frames / sample_frames)
+        draw_subtitle_on_frame(
+            canvas,
+            result["transcript"],
+            frame_index / case.fps,
+            config.subtitle_design,
+            highlight_ranges,
+            subtitle_segments=result["subtitle_segments"],
+            custom_subtitles=result["custom_subtitles"],
+            layout_cache=layout_cache,
+        )
+    return (time.perf_counter() - started) * 1000.0 / sample_frames
+
+
+def run_case(case: BenchmarkCase, media_dir: str, repeats: int) -> Dict[str, object]:
+    """Render ``case`` ``repeats`` times and return median stage timings.
+
+    Every repeat starts from empty in-memory caches, so the medians describe
+    a cold render rather than whichever repeat reused the previous one's
+    fonts, probes and keyframe indexes.
+    """
+
+    main_path, overlay_path = prepare_case_media(case, media_dir)
+    output_path = os.path.join(media_dir, f"out_{case.name}.mp4")
+
+    samples: Dict[str, List[float]] = {}
+    for _ in range(repeats):
+        clear_render_caches()
+        config = build_case_config(case, main_path, overlay_path, output_path)
+        result = render_project(config)
+        for stage, seconds in result["timings"].items():
+            samples.setdefault(stage, []).append(seconds)
+        samples.setdefault("subtitle_draw_ms_per_frame", []).append(
+            time_subtitle_drawing(case, config, result)
+        )
+
+    stages = {stage: statistics.median(values) for stage, values in samples.items()}
+    frames = int(case.duration * case.fps)
+    total = stages.get("total", 0.0)
+    return {
+        "params": asdict(case),
+        "frames": frames,
+        "stages": stages,
+        "render_fps": frames / total if total > 0 else 0.0,
+    }
+
+
+def run_benchmarks(
+    cases: Sequence[BenchmarkCase], media_dir: str, repeats: int
+) -> Dict[str, object]:
+    """Run every case and collect the results document."""
+
+    results: Dict[str, object] = {
+        "schema": 1,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+        },
+        "repeats": repeats,
+        "cases": {},
+    }
+    for case in cases:
+        print(f"[bench] Running {case.name} ...")
+        case_result = run_case(case, media_dir, repeats)
+        results["cases"][case.name] = case_result
+        print(
+            f"[bench] {case.name}: {case_result['stages']['total']:.2f}s total, "
+            f"{case_result['render_fps']:.1f} fps"
+        )
+    return results
+
+
+# --------------------------------------------------------------------------- #
+# Baseline comparison
+# --------------------------------------------------------------------------- #
+
+
+def compare_results(
+    baseline: Dict[str, object],
+    current: Dict[str, object],
+    threshold: float = 0.10,
+    min_delta: float = 0.05,
+    min_delta_ms: float = 0.5,
+) -> List[Dict[str, object]]:
+    """Return one row per (case, stage) present in both result documents.
+
+    A row is flagged as a regression when the current timing is more than
+    ``threshold`` (relative) and an absolute amount slower than baseline:
+    ``min_delta`` seconds for stage timings, ``min_delta_ms`` for the
+    millisecond metrics such as ``subtitle_draw_ms_per_frame``.
+    """
+
+    rows: List[Dict[str, object]] = []
+    for name, current_case in current.get("cases", {}).items():
+        baseline_case = baseline.get("cases", {}).get(name)
+        if baseline_case is None:
+            continue
+        for stage, value in current_case["stages"].items():
+            base_value = baseline_case["stages"].get(stage)
+            if base_value is None:
+                continue
+            ratio = value / base_value if base_value > 0 else float("inf")
+            stage_min_delta = min_delta_ms if MS_STAGE_MARKER in stage else min_delta
+            rows.append(
+                {
+                    "case": name,
+                    "stage": stage,
+                    "baseline": base_value,
+                    "current": value,
+                    "ratio": ratio,
+                    "regression": ratio > 1.0 + threshold
+                    and value - base_value > stage_min_delta,
+                }
+            )
+    return rows
+
+
+def print_comparison(rows: Sequence[Dict[str, object]]) -> None:
+    """Pretty-print the rows produced by ``compare_results``."""
+
+    print(f"{'case':<24} {'stage':<28} {'baseline':>10} {'current':>10} {'change':>8}")
+    for row in rows:
+        marker = "  REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['case']:<24} {row['stage']:<28} {row['baseline']:>10.3f} "
+            f"{row['current']:>10.3f} {(row['ratio'] - 1.0) * 100:>+7.1f}%{marker}"
+        )
+
+
+# --------------------------------------------------------------------------- #
+# CLI
+# --------------------------------------------------------------------------- #
+
+
+def parse_cli_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Configure and parse command line arguments."""
+
+    parser = argparse.ArgumentParser(description="Benchmark the overlay pipeline.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmark suite.")
+    run_parser.add_argument(
+        "--output", default="bench_results.json", help="Where to write the results."
+    )
+    run_parser.add_argument(
+        "--media-dir",
+        default=".bench",
+        help="Directory for generated inputs and renders (reused between runs).",
+    )
+    run_parser.add_argument(
+        "--repeats", type=int, default=3, help="Renders per case; the median is kept."
+    )
+    run_parser.add_argument(
+        "--case",
+        action="append",
+        dest="cases",
+        help="Only run the named case (may be repeated).",
+    )
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="Flag regressions against a stored baseline."
+    )
+    compare_parser.add_argument("baseline", help="Baseline results JSON.")
+    compare_parser.add_argument("current", help="Results JSON to check.")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative slowdown that counts as a regression (default 0.10).",
+    )
+    compare_parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=0.05,
+        help="Ignore stage slowdowns smaller than this many seconds (default 0.05).",
+    )
+    compare_parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=0.5,
+        help="Ignore slowdowns of millisecond metrics smaller than this (default 0.5).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_cli_args(argv)
+
+    if args.command == "run":
+        cases = DEFAULT_CASES
+        if args.cases:
+            known = {case.name: case for case in DEFAULT_CASES}
+            unknown = [name for name in args.cases if name not in known]
+            if unknown:
+                raise SystemExit(f"Unknown benchmark case(s): {', '.join(unknown)}")
+            cases = [known[name] for name in args.cases]
+        results = run_benchmarks(cases, args.media_dir, max(1, args.repeats))
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+        print(f"[bench] Results written to {args.output}")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.current, "r", encoding="utf-8") as file:
+        current = json.load(file)
+    rows = compare_results(
+        baseline, current, args.threshold, args.min_delta, args.min_delta_ms
+    )
+    print_comparison(rows)
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"[bench] {len(regressions)} regression(s) detected.")
+        return 1
+    print("[bench] No regressions detected.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Premultiplied-alpha sprites and an integer blend kernel.
+
+A sprite is a small BGRA uint8 image with premultiplied colour (each channel
+already multiplied by alpha / 255) and its position on the frame. Blending a
+sprite touches only the frame pixels under it:
+
+    dst = src + dst * (255 - alpha) / 255
+
+This is computed in 16-bit fixed point with an exact round-to-nearest divide
+by 255, so there is no float conversion and no full-frame pass. Layers that
+do not change between frames (a subtitle box, its text and outline) are
+flattened into one sprite once with ``over``. Each frame then costs one blend
+over the union of their areas.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class Sprite:
+    """Premultiplied BGRA pixels placed with their top-left corner at ``(x, y)``."""
+
+    x: int
+    y: int
+    pixels: np.ndarray  # (h, w, 4) uint8, colour premultiplied by alpha
+
+    @property
+    def width(self) -> int:
+        return int(self.pixels.shape[1])
+
+    @property
+    def height(self) -> int:
+        return int(self.pixels.shape[0])
+
+
+def div255(values: np.ndarray) -> np.ndarray:
+    """Round ``values / 255`` to the nearest integer for ``0 <= values <= 255 * 255``."""
+
+    values = values + 128
+    return (values + (values >> 8)) >> 8
+
+
+def solid_layer(color: Sequence[int], coverage: np.ndarray) -> np.ndarray:
+    """Premultiplied BGRA layer of one ``color`` with per-pixel ``coverage`` (uint8 alpha)."""
+
+    alpha = coverage.astype(np.uint16)
+    layer = np.empty(coverage.shape + (4,), dtype=np.uint8)
+    for channel in range(3):
+        layer[..., channel] = div255(alpha * int(color[channel]))
+    layer[..., 3] = coverage
+    return layer
+
+
+def over(top: np.ndarray, bottom: np.ndarray) -> np.ndarray:
+    """Porter-Duff ``top`` over ``bottom`` for two same-sized premultiplied layers."""
+
+    inverse = 255 - top[..., 3:4].astype(np.uint16)
+    return (top + div255(bottom.astype(np.uint16) * inverse)).astype(np.uint8)
+
+
+def rounded_rect_mask(width: int, height: int, radius: int) -> np.ndarray:
+    """Coverage mask (0/255) of a filled rounded rectangle spanning ``width`` x ``height``."""
+
+    mask = np.zeros((height, width), dtype=np.uint8)
+    right, bottom = width - 1, height - 1
+    radius = max(0, min(int(radius), min(right, bottom) // 2))
+    cv2.rectangle(mask, (radius, 0), (right - radius, bottom), 255, -1)
+    cv2.rectangle(mask, (0, radius), (right, bottom - radius), 255, -1)
+    for cx, cy in (
+        (radius, radius),
+        (right - radius, radius),
+        (radius, bottom - radius),
+        (right - radius, bottom - radius),
+    ):
+        cv2.circle(mask, (cx, cy), radius, 255, -1)
+    return mask
+
+
+def crop_to_content(sprite: Sprite) -> Optional[Sprite]:
+    """Trim fully transparent rows and columns; ``None`` when nothing is visible."""
+
+    alpha = sprite.pixels[..., 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if rows.size == 0:
+        return None
+    columns = np.flatnonzero(alpha.any(axis=0))
+    top, bottom = int(rows[0]), int(rows[-1]) + 1
+    left, right = int(columns[0]), int(columns[-1]) + 1
+    return Sprite(
+        sprite.x + left,
+        sprite.y + top,
+        np.ascontiguousarray(sprite.pixels[top:bottom, left:right]),
+    )
+
+
+def flatten(sprites: Iterable[Sprite]) -> Optional[Sprite]:
+    """Merge sprites (first at the bottom) into one covering their union."""
+
+    sprites = list(sprites)
+    if not sprites:
+        return None
+    left = min(sprite.x for sprite in sprites)
+    top = min(sprite.y for sprite in sprites)
+    right = max(sprite.x + sprite.width for sprite in sprites)
+    bottom = max(sprite.y + sprite.height for sprite in sprites)
+    merged = np.zeros((bottom - top, right - left, 4), dtype=np.uint8)
+    for sprite in sprites:
+        y0, x0 = sprite.y - top, sprite.x - left
+        region = merged[y0 : y0 + sprite.height, x0 : x0 + sprite.width]
+        region[:] = over(sprite.pixels, region)
+    return Sprite(left, top, merged)
+
+
+def sprite_region(
+    frame_shape: Tuple[int, ...], sprite: Sprite
+) -> Optional[Tuple[slice, slice, slice, slice]]:
+    """Return ``(frame_rows, frame_cols, sprite_rows, sprite_cols)`` of the visible overlap."""
+
+    frame_h, frame_w = frame_shape[:2]
+    x0, y0 = max(0, sprite.x), max(0, sprite.y)
+    x1 = min(frame_w, sprite.x + sprite.width)
+    y1 = min(frame_h, sprite.y + sprite.height)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (
+        slice(y0, y1),
+        slice(x0, x1),
+        slice(y0 - sprite.y, y1 - sprite.y),
+        slice(x0 - sprite.x, x1 - sprite.x),
+    )
+
+
+def blend_sprite(frame: np.ndarray, sprite: Optional[Sprite]) -> np.ndarray:
+    """Blend ``sprite`` onto a BGR uint8 ``frame`` in place and return the frame."""
+
+    if sprite is None:
+        return frame
+    region = sprite_region(frame.shape, sprite)
+    if region is None:
+        return frame
+    frame_rows, frame_cols, sprite_rows, sprite_cols = region
+    pixels = sprite.pixels[sprite_rows, sprite_cols]
+    roi = frame[frame_rows, frame_cols]
+    inverse = 255 - pixels[..., 3:4].astype(np.uint16)
+    roi[:] = pixels[..., :3] + div255(roi.astype(np.uint16) * inverse).astype(np.uint8)
+    return frame
@@ -0,0 +1,228 @@
+"""
+Thumbnail filmstrips (sprite sheets) for main videos and overlay clips.
+
+Thumbnails are taken from keyframes only, and only from one keyframe per tile.
+An input-side ``noise`` bitstream filter drops every packet except the first
+keyframe at or after each tile's grid time, before anything reaches the
+decoder. So a 30-minute 1080p video decodes about 100 frames instead of
+54,000 (or the ~900 keyframes of a keyframe-only pass), and its filmstrip
+takes about a second. Short clips with too few keyframes fall back to
+decoding every frame. Results are cached per content hash next to the asset:
+
+- ``filmstrip.jpg``: the sprite sheet, ``columns`` tiles per row.
+- ``filmstrip.json``: the layout plus the timestamp each tile shows.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import subprocess
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from asset_store import AssetStore
+from video_overlay_script import find_ffmpeg
+
+FILMSTRIP_VERSION = 1  # Bump when the layout changes so cached sheets rebuild
+FILMSTRIP_TILE_WIDTH = 160
+FILMSTRIP_COLUMNS = 10
+FILMSTRIP_MAX_TILES = 100
+FILMSTRIP_MIN_INTERVAL = 1.0  # Seconds; short clips get one tile per second at most
+FILMSTRIP_FULL_DECODE_SECONDS = 120.0  # Clips up to this long may decode every frame
+FILMSTRIP_JPEG_QUALITY = 80
+
+FILMSTRIP_IMAGE = "filmstrip.jpg"
+FILMSTRIP_MANIFEST = "filmstrip.json"
+
+SHOWINFO_PTS_PATTERN = re.compile(r"Parsed_showinfo.*\bpts_time:\s*(-?[0-9.]+)")
+
+_FILMSTRIP_LOCK = threading.Lock()
+
+
+def plan_filmstrip(duration: float, width: int, height: int) -> Dict[str, object]:
+    """Return the tile grid interval and tile size for a video."""
+
+    tile_count = max(
+        1, min(FILMSTRIP_MAX_TILES, int(math.ceil(duration / FILMSTRIP_MIN_INTERVAL)))
+    )
+    interval = duration / tile_count if duration > 0 else FILMSTRIP_MIN_INTERVAL
+    tile_height = FILMSTRIP_TILE_WIDTH * 9 // 16
+    if width > 0 and height > 0:
+        tile_height = int(round(FILMSTRIP_TILE_WIDTH * height / width))
+    tile_height = max(2, tile_height - tile_height % 2)
+    return {
+        "version": FILMSTRIP_VERSION,
+        "planned_tiles": tile_count,
+        "interval": interval,
+        "tile_width": FILMSTRIP_TILE_WIDTH,
+        "tile_height": tile_height,
+    }
+
+
+def grid_pick_expression(time_expr: str, interval: float, condition: str = "1") -> str:
+    """ffmpeg expression that is non-zero for the first match at or after each grid time.
+
+    ``ld(0)``/``st(0)`` keep the next grid time between evaluations.
+    """
+
+    return (
+        f"if({condition}*gte({time_expr},ld(0)),"
+        f"st(0,(floor({time_expr}/{interval:.6f})+1)*{interval:.6f}),0)"
+    )
+
+
+def build_filmstrip_command(
+    ffmpeg: str, source_path: str, layout: Dict[str, object], keyframes_only: bool = True
+) -> List[str]:
+    """ffmpeg arguments that write the tiles as raw BGR frames to stdout.
+
+    ``showinfo`` logs each tile's timestamp to stderr.
+    """
+
+    interval = float(layout["interval"])
+    scale = f"scale={layout['tile_width']}:{layout['tile_height']}:flags=fast_bilinear"
+    input_args: List[str] = []
+    if keyframes_only:
+        # noise=drop drops a packet when its expression is non-zero
+        pick = grid_pick_expression("pts*tb", interval, "key").replace(",", "\\,")
+        input_args = ["-discard", "nokey", "-bsf:v", f"noise=drop=not({pick})"]
+        filters = f"{scale},showinfo"
+    else:
+        filters = f"select='{grid_pick_expression('t', interval)}',{scale},showinfo"
+    return [
+        ffmpeg,
+        "-hide_banner",
+        "-v",
+        "info",
+        "-nostdin",
+        *input_args,
+        "-i",
+        source_path,
+        "-map",
+        "0:v:0",
+        "-an",
+        "-sn",
+        "-vf",
+        filters,
+        "-fps_mode",
+        "passthrough",
+        "-frames:v",
+        str(layout["planned_tiles"]),
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "bgr24",
+        "pipe:1",
+    ]
+
+
+def decode_tiles(
+    ffmpeg: str, source_path: str, layout: Dict[str, object], keyframes_only: bool
+) -> List[Tuple[float, np.ndarray]]:
+    """Run the tile decode and return ``(timestamp, tile)`` pairs."""
+
+    completed = subprocess.run(
+        build_filmstrip_command(ffmpeg, source_path, layout, keyframes_only),
+        capture_output=True,
+    )
+    stderr = completed.stderr.decode("utf-8", "replace")
+    if completed.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {stderr.strip().splitlines()[-1:]}")
+    width, height = int(layout["tile_width"]), int(layout["tile_height"])
+    frames = np.frombuffer(completed.stdout, dtype=np.uint8)
+    frames = frames[: len(frames) - len(frames) % (width * height * 3)]
+    tiles = frames.reshape(-1, height, width, 3)
+    times = [float(match) for match in SHOWINFO_PTS_PATTERN.findall(stderr)]
+    if len(times) != len(tiles):
+        times = [index * float(layout["interval"]) for index in range(len(tiles))]
+    return list(zip(times, tiles))
+
+
+def build_filmstrip(store: AssetStore, content_hash: str) -> Dict[str, object]:
+    """Render and cache the filmstrip of ``content_hash``; return its layout."""
+
+    asset = store.get(content_hash)
+    if asset is None:
+        raise KeyError(f"Unknown asset {content_hash}")
+    metadata = store.metadata(content_hash)
+    if not metadata.has_video:
+        raise ValueError(f"Asset {content_hash} has no video stream")
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg is required to build filmstrips.")
+
+    width, height = metadata.display_size
+    layout = plan_filmstrip(metadata.duration, width, height)
+    tiles = decode_tiles(ffmpeg, asset["path"], layout, keyframes_only=True)
+    if (
+        len(tiles) * 2 < int(layout["planned_tiles"])
+        and metadata.duration <= FILMSTRIP_FULL_DECODE_SECONDS
+    ):
+        # Long GOPs leave grid cells without a keyframe; short clips can afford a full decode
+        tiles = decode_tiles(ffmpeg, asset["path"], layout, keyframes_only=False)
+    if not tiles:
+        raise RuntimeError(f"No frames decoded from asset {content_hash}")
+
+    columns = min(FILMSTRIP_COLUMNS, len(tiles))
+    rows = int(math.ceil(len(tiles) / columns))
+    tile_width, tile_height = int(layout["tile_width"]), int(layout["tile_height"])
+    sheet = np.zeros((rows * tile_height, columns * tile_width, 3), dtype=np.uint8)
+    for index, (_, tile) in enumerate(tiles):
+        y, x = divmod(index, columns)
+        sheet[y * tile_height : (y + 1) * tile_height, x * tile_width : (x + 1) * tile_width] = tile
+    ok, encoded = cv2.imencode(".jpg", sheet, [cv2.IMWRITE_JPEG_QUALITY, FILMSTRIP_JPEG_QUALITY])
+    if not ok:
+        raise RuntimeError("Could not encode the filmstrip image.")
+
+    image_path = store.derived_path(content_hash, FILMSTRIP_IMAGE)
+    with open(f"{image_path}.tmp", "wb") as file:
+        file.write(encoded.tobytes())
+    os.replace(f"{image_path}.tmp", image_path)
+
+    layout.update(
+        {
+            "duration": metadata.duration,
+            "tile_count": len(tiles),
+            "columns": columns,
+            "rows": rows,
+            "times": [round(timestamp, 3) for timestamp, _ in tiles],
+        }
+    )
+    manifest_path = store.derived_path(content_hash, FILMSTRIP_MANIFEST)
+    with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as file:
+        json.dump(layout, file)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+    return layout
+
+
+def get_filmstrip(store: AssetStore, content_hash: str) -> Optional[Dict[str, object]]:
+    """Return the cached filmstrip layout, building the sheet on first use.
+
+    Returns ``None`` for unknown assets.
+    """
+
+    if not store.has(content_hash):
+        return None
+    directory = os.path.join(store.derived_root, content_hash)
+    manifest_path = os.path.join(directory, FILMSTRIP_MANIFEST)
+    image_path = os.path.join(directory, FILMSTRIP_IMAGE)
+    with _FILMSTRIP_LOCK:
+        if os.path.exists(manifest_path) and os.path.exists(image_path):
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as file:
+                    layout = json.load(file)
+                if layout.get("version") == FILMSTRIP_VERSION:
+                    return layout
+            except (OSError, ValueError):
+                pass
+        return build_filmstrip(store, content_hash)
+
+
+def filmstrip_image_path(store: AssetStore, content_hash: str) -> str:
+    return os.path.join(store.derived_root, content_hash, FILMSTRIP_IMAGE)
@@ -0,0 +1,264 @@
+"""
+Shared-memory frame ring for compositing on several processes.
+
+Frames never cross a process boundary by pickling. One
+``multiprocessing.shared_memory`` block is split into fixed-size slots, and
+each slot holds one frame per output (several outputs of different sizes may
+share a slot). Only small ``(slot, frame_index, payload)`` tuples travel
+through queues:
+
+1. The parent takes a free slot, decodes straight into it and puts the slot on
+   the work queue together with a per-frame payload (e.g. which overlay frame
+   to show).
+2. A compositor process attaches to the block once and draws on the slot's
+   frames in place. Then it returns the slot on the done queue.
+3. The parent hands finished slots to ``on_frame`` strictly in frame order
+   (the encoder) and only then marks the slot free again.
+
+The number of slots bounds memory and the number of frames in flight. When
+every slot is busy the parent blocks on the done queue, which throttles the
+decoder to the compositors' pace.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import queue
+import traceback
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+SLOTS_PER_WORKER = 3  # Enough to keep every compositor busy while the parent encodes
+WORKER_POLL_SECONDS = 1.0  # How often a blocked parent checks that compositors are alive
+WORKER_JOIN_SECONDS = 5.0
+
+FrameShape = Tuple[int, int, int]
+RingSpec = Tuple[str, Tuple[FrameShape, ...], int]
+
+
+class FrameRing:
+    """Fixed-size uint8 frame slots in one shared-memory block."""
+
+    def __init__(
+        self,
+        frame_shapes: Sequence[FrameShape],
+        slot_count: int,
+        name: Optional[str] = None,
+    ):
+        self.frame_shapes = tuple(tuple(int(value) for value in shape) for shape in frame_shapes)
+        self.slot_count = int(slot_count)
+        self.frame_bytes = [int(np.prod(shape)) for shape in self.frame_shapes]
+        self.slot_bytes = sum(self.frame_bytes)
+        if name is None:
+            self.memory = shared_memory.SharedMemory(
+                create=True, size=max(1, self.slot_bytes * self.slot_count)
+            )
+            self.owner = True
+        else:
+            # Compositors are children of the creating process and share its
+            # resource tracker, so attaching here does not register a second owner.
+            self.memory = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self._views: Dict[int, List[np.ndarray]] = {}
+
+    @property
+    def spec(self) -> RingSpec:
+        """Picklable description that ``attach`` turns back into a ring."""
+
+        return self.memory.name, self.frame_shapes, self.slot_count
+
+    @classmethod
+    def attach(cls, spec: RingSpec) -> "FrameRing":
+        name, frame_shapes, slot_count = spec
+        return cls(frame_shapes, slot_count, name=name)
+
+    def views(self, slot: int) -> List[np.ndarray]:
+        """Return the frames of ``slot`` as arrays backed by the shared block."""
+
+        views = self._views.get(slot)
+        if views is None:
+            views = []
+            offset = slot * self.slot_bytes
+            for shape, size in zip(self.frame_shapes, self.frame_bytes):
+                views.append(
+                    np.ndarray(shape, dtype=np.uint8, buffer=self.memory.buf, offset=offset)
+                )
+                offset += size
+            self._views[slot] = views
+        return views
+
+    def close(self) -> None:
+        # Views hold exports of the buffer; they must go before the mapping closes
+        self._views.clear()
+        try:
+            self.memory.close()
+        except BufferError:
+            pass  # A caller still holds a view; the mapping goes with the last one
+        if self.owner:
+            self.memory.unlink()
+
+
+# handler(views, frame_index, payload, state, *handler_args) composites one slot in place
+FrameHandler = Callable[..., None]
+
+
+def ring_worker_loop(
+    spec: RingSpec,
+    work_queue: "multiprocessing.Queue",
+    done_queue: "multiprocessing.Queue",
+    handler: FrameHandler,
+    handler_args: Tuple[object, ...],
+) -> None:
+    """Compositor process entry: run ``handler`` on queued slots until a ``None`` arrives.
+
+    ``state`` is a dict private to this process, for readers and caches that
+    should live across frames.
+    """
+
+    ring = FrameRing.attach(spec)
+    state: Dict[str, object] = {}
+    try:
+        while True:
+            item = work_queue.get()
+            if item is None:
+                break
+            slot, frame_index, payload = item
+            handler(ring.views(slot), frame_index, payload, state, *handler_args)
+            done_queue.put((slot, frame_index, None))
+    except BaseException:  # noqa: BLE001 - reported to the parent, which raises it
+        done_queue.put((-1, -1, traceback.format_exc()))
+    finally:
+        ring.close()
+
+
+class FramePipeline:
+    """Parent side of the ring: dispatches slots and collects them in frame order.
+
+    Use as a context manager::
+
+        with FramePipeline(shapes, 4, handler, args, on_frame=write) as pipeline:
+            slot = pipeline.acquire()
+            ...decode into pipeline.views(slot)...
+            pipeline.submit(slot, frame_index, payload)
+            pipeline.finish()
+
+    Frame indices must be submitted consecutively from ``first_frame``.
+    """
+
+    def __init__(
+        self,
+        frame_shapes: Sequence[FrameShape],
+        workers: int,
+        handler: FrameHandler,
+        handler_args: Tuple[object, ...] = (),
+        on_frame: Optional[Callable[[List[np.ndarray]], None]] = None,
+        first_frame: int = 0,
+        slot_count: Optional[int] = None,
+    ):
+        self.frame_shapes = frame_shapes
+        self.workers = max(1, int(workers))
+        self.handler = handler
+        self.handler_args = handler_args
+        self.on_frame = on_frame
+        self.next_frame = first_frame
+        self.slot_count = max(2, int(slot_count or self.workers * SLOTS_PER_WORKER))
+        self.ring: Optional[FrameRing] = None
+        self.processes: List[multiprocessing.Process] = []
+        self.free_slots: List[int] = []
+        self.completed: Dict[int, int] = {}  # Frame index -> slot, waiting for earlier frames
+        self.in_flight = 0
+
+    def __enter__(self) -> "FramePipeline":
+        context = multiprocessing.get_context()
+        self.ring = FrameRing(self.frame_shapes, self.slot_count)
+        self.work_queue = context.Queue()
+        self.done_queue = context.Queue()
+        self.free_slots = list(range(self.slot_count - 1, -1, -1))
+        try:
+            for _ in range(self.workers):
+                process = context.Process(
+                    target=ring_worker_loop,
+                    args=(
+                        self.ring.spec,
+                        self.work_queue,
+                        self.done_queue,
+                        self.handler,
+                        self.handler_args,
+                    ),
+                    daemon=True,
+                )
+                process.start()
+                self.processes.append(process)
+        except BaseException:
+            self.close()
+            raise
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def views(self, slot: int) -> List[np.ndarray]:
+        return self.ring.views(slot)
+
+    def acquire(self) -> int:
+        """Return a free slot, waiting for compositors to hand one back if needed."""
+
+        while not self.free_slots:
+            self._collect(block=True)
+        return self.free_slots.pop()
+
+    def release(self, slot: int) -> None:
+        """Return a slot that was acquired but not submitted."""
+
+        self.free_slots.append(slot)
+
+    def submit(self, slot: int, frame_index: int, payload: object = None) -> None:
+        self.work_queue.put((slot, frame_index, payload))
+        self.in_flight += 1
+        self._collect(block=False)
+
+    def finish(self) -> None:
+        """Wait until every submitted frame has been passed to ``on_frame``."""
+
+        while self.in_flight:
+            self._collect(block=True)
+
+    def _collect(self, block: bool) -> None:
+        while self.in_flight:
+            try:
+                if block:
+                    slot, frame_index, error = self.done_queue.get(timeout=WORKER_POLL_SECONDS)
+                else:
+                    slot, frame_index, error = self.done_queue.get_nowait()
+            except queue.Empty:
+                if not block:
+                    return
+                if not all(process.is_alive() for process in self.processes):
+                    raise RuntimeError("A compositor process exited unexpectedly.")
+                continue
+            if error is not None:
+                raise RuntimeError(f"Compositor process failed:\n{error}")
+            self.in_flight -= 1
+            self.completed[frame_index] = slot
+            while self.next_frame in self.completed:
+                ready_slot = self.completed.pop(self.next_frame)
+                if self.on_frame is not None:
+                    self.on_frame(self.ring.views(ready_slot))
+                self.free_slots.append(ready_slot)
+                self.next_frame += 1
+            block = False  # Something arrived; take whatever else is ready without waiting
+
+    def close(self) -> None:
+        for _ in self.processes:
+            self.work_queue.put(None)
+        for process in self.processes:
+            process.join(WORKER_JOIN_SECONDS)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.processes = []
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
@@ -19,6 +19,8 @@ function App() {
   const [musicHighlights, setMusicHighlights] = useState([]);
   const [selectedRange, setSelectedRange] = useState(null);
   const [outputFilename, setOutputFilename] = useState(null);
+  // Seconds transcribed out of the duration while Whisper is still running
+  const [transcription, setTranscription] = useState(null);
 
   // Section visibility
   const [showTranscriptPreview, setShowTranscriptPreview] = useState(false);
@@ -32,7 +34,10 @@ function App() {
   const handleUploadSuccess = (data) => {
     setCurrentVideoPath(data.video_path);
     setTranscriptData(data.transcript);
-    setSubtitles(data.subtitles);
+    setSubtitles(data.subtitles || []);
+    setTranscription(
+      data.transcribing ? { transcribed: 0, duration: null } : null
+    );
     setShowTranscriptPreview(true);
     setShowSelection(true);
     setShowHighlights(true);
@@ -41,6 +46,25 @@ function App() {
     setShowProcess(true);
   };
 
+  const handleTranscriptWords = (event) => {
+    // start_word places each batch, so a repeated batch cannot duplicate words
+    setTranscriptData((previous) => [
+      ...previous.slice(0, event.start_word),
+      ...event.words,
+    ]);
+    setTranscription({
+      transcribed: event.transcribed_seconds,
+      duration: event.duration,
+    });
+  };
+
+  const handleTranscriptDone = (data) => {
+    if (data) {
+      setTranscriptData(data.transcript);
+    }
+    setTranscription(null);
+  };
+
   const handleProcessSuccess = (filename) => {
     setOutputFilename(filename);
     setShowResult(true);
@@ -54,6 +78,7 @@ function App() {
     setMusicHighlights([]);
     setSelectedRange(null);
     setOutputFilename(null);
+    setTranscription(null);
     setShowTranscriptPreview(false);
     setShowSelection(false);
     setShowHighlights(false);
@@ -81,7 +106,11 @@ function App() {
         </header>
 
         {/* Step 1: Upload */}
-        <UploadSection onUploadSuccess={handleUploadSuccess} />
+        <UploadSection
+          onUploadSuccess={handleUploadSuccess}
+          onTranscriptWords={handleTranscriptWords}
+          onTranscriptDone={handleTranscriptDone}
+        />
 
         {/* Step 2: Transcript Preview */}
         {showTranscriptPreview && (
@@ -101,6 +130,7 @@ function App() {
             setHighlights={setHighlights}
             selectedRange={selectedRange}
             setSelectedRange={setSelectedRange}
+            transcription={transcription}
           />
         )}
 
@@ -142,6 +172,7 @@ function App() {
             highlights={highlights}
             musicHighlights={musicHighlights}
             transcriptData={transcriptData}
+            transcribing={Boolean(transcription)}
             onProcessSuccess={handleProcessSuccess}
           />
         )}
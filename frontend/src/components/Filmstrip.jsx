@@ -0,0 +1,62 @@
+import { useEffect, useState } from "react";
+
+// Render the keyframe sprite sheet from /api/assets/<sha256>/filmstrip as a
+// row of tiles; each tile is a CSS background offset into the one image.
+function Filmstrip({ sha256, maxTiles = 10, className = "" }) {
+  const [layout, setLayout] = useState(null);
+
+  useEffect(() => {
+    let cancelled = false;
+    setLayout(null);
+    if (!sha256) return undefined;
+    fetch(`/api/assets/${sha256}/filmstrip`)
+      .then((response) => (response.ok ? response.json() : null))
+      .then((data) => !cancelled && setLayout(data))
+      .catch((error) => console.error("Error loading filmstrip:", error));
+    return () => {
+      cancelled = true;
+    };
+  }, [sha256]);
+
+  if (!layout) {
+    return null;
+  }
+
+  const shown = Math.min(maxTiles, layout.tile_count);
+  const tiles = Array.from({ length: shown }, (_, i) =>
+    Math.floor((i * layout.tile_count) / shown)
+  );
+  const sheetWidth = layout.columns * layout.tile_width;
+  const sheetHeight = layout.rows * layout.tile_height;
+
+  return (
+    <div className={`flex gap-1 overflow-hidden rounded-lg ${className}`}>
+      {tiles.map((tile) => (
+        <div
+          key={tile}
+          title={`${(layout.times?.[tile] ?? tile * layout.interval).toFixed(1)}s`}
+          className="flex-1 bg-gray-200"
+          style={{
+            aspectRatio: `${layout.tile_width} / ${layout.tile_height}`,
+            backgroundImage: `url(/api${layout.image_url})`,
+            // Percent offsets scale with the tile's rendered size
+            backgroundSize: `${(sheetWidth / layout.tile_width) * 100}% ${
+              (sheetHeight / layout.tile_height) * 100
+            }%`,
+            backgroundPosition: `${
+              layout.columns > 1
+                ? ((tile % layout.columns) / (layout.columns - 1)) * 100
+                : 0
+            }% ${
+              layout.rows > 1
+                ? (Math.floor(tile / layout.columns) / (layout.rows - 1)) * 100
+                : 0
+            }%`,
+          }}
+        />
+      ))}
+    </div>
+  );
+}
+
+export default Filmstrip;
@@ -8,6 +8,7 @@ import {
   Divider,
 } from "@heroui/react";
 import { Icon } from "@iconify/react";
+import Waveform from "./Waveform";
 
 function MusicList({ musicHighlights, onRemoveMusicHighlight }) {
   const handleRemove = (index) => {
@@ -102,6 +103,14 @@ function MusicList({ musicHighlights, onRemoveMusicHighlight }) {
                           {music.music_path.split("/").pop()}
                         </span>
                       </div>
+                      {music.sha256 && (
+                        <Waveform
+                          sha256={music.sha256}
+                          height={40}
+                          color="#7c3aed"
+                          className="mt-3"
+                        />
+                      )}
                     </div>
                     <div className="flex flex-col gap-2">
                       <Tooltip
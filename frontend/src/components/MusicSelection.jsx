@@ -16,6 +16,7 @@ import {
   Divider,
 } from "@heroui/react";
 import { Icon } from "@iconify/react";
+import Waveform from "./Waveform";
 
 function MusicSelection({
   transcriptData,
@@ -24,6 +25,7 @@ function MusicSelection({
 }) {
   const [selectedRange, setSelectedRange] = useState(null);
   const [audioFiles, setAudioFiles] = useState([]);
+  const [audioHashes, setAudioHashes] = useState({});
   const [selectedAudio, setSelectedAudio] = useState("");
   const [uploadedFile, setUploadedFile] = useState(null);
   const [uploading, setUploading] = useState(false);
@@ -39,6 +41,12 @@ function MusicSelection({
       const response = await fetch("/api/list-clips");
       const data = await response.json();
       setAudioFiles(data.audio_files || []);
+      // Content hashes let the waveform load compact peaks instead of the file
+      const hashes = {};
+      (data.audio_details || []).forEach((detail) => {
+        if (detail.sha256) hashes[`audio_files/${detail.name}`] = detail.sha256;
+      });
+      setAudioHashes(hashes);
     } catch (error) {
       console.error("Error loading audio files:", error);
     }
@@ -121,6 +129,7 @@ function MusicSelection({
       start_word: start,
       end_word: end,
       music_path: audioPath,
+      sha256: audioHashes[audioPath],
       text: selectedWords,
       occurrence: 1,
     };
@@ -252,6 +261,12 @@ function MusicSelection({
                     </SelectItem>
                   ))}
                 </Select>
+                {audioHashes[selectedAudio] && (
+                  <Waveform
+                    sha256={audioHashes[selectedAudio]}
+                    className="mt-4"
+                  />
+                )}
               </CardBody>
             </Card>
           </div>
@@ -13,17 +13,68 @@ import {
   useDisclosure,
   Divider,
   Tooltip,
+  Switch,
 } from "@heroui/react";
 import { Icon } from "@iconify/react";
 
+const STAGE_LABELS = {
+  queued: "Waiting to start",
+  waiting: "Waiting for memory",
+  running: "Rendering",
+  transcript: "Transcribing",
+  preparing: "Preparing subtitles",
+  audio: "Mixing audio",
+  video: "Compositing frames",
+  subtitles: "Burning in subtitles",
+  done: "Finishing",
+};
+
+// Follow a background render's server-sent events until it has completed or
+// failed. Resolves with the final job status.
+function followJob(jobId, onProgress, onPreview) {
+  return new Promise((resolve, reject) => {
+    const source = new EventSource(`/api/jobs/${jobId}/events`);
+    source.addEventListener("progress", (event) => {
+      onProgress(JSON.parse(event.data));
+    });
+    source.addEventListener("preview", (event) => {
+      onPreview(JSON.parse(event.data).image);
+    });
+    source.addEventListener("done", (event) => {
+      source.close();
+      resolve(JSON.parse(event.data));
+    });
+    source.onerror = () => {
+      // The browser reconnects by itself unless the stream was refused
+      if (source.readyState === EventSource.CLOSED) {
+        reject(new Error("Lost connection to the render progress stream"));
+      }
+    };
+  });
+}
+
+function formatDuration(seconds) {
+  const total = Math.max(0, Math.round(seconds));
+  const minutes = Math.floor(total / 60);
+  return `${minutes}:${String(total % 60).padStart(2, "0")}`;
+}
+
 function ProcessSection({
   currentVideoPath,
   highlights,
   musicHighlights,
   transcriptData,
+  transcribing,
   onProcessSuccess,
 }) {
   const [processing, setProcessing] = useState(false);
+  // Streamed renders are watchable early but cannot resume after a restart
+  const [watchWhileRendering, setWatchWhileRendering] = useState(false);
+  // Fragmented MP4 of the render in progress; playable before it finishes
+  const [streamUrl, setStreamUrl] = useState(null);
+  // Latest server-sent progress of the render and a recent frame from it
+  const [jobProgress, setJobProgress] = useState(null);
+  const [previewImage, setPreviewImage] = useState(null);
   const { isOpen, onOpen, onClose } = useDisclosure();
   const [modalMessage, setModalMessage] = useState("");
   const [modalType, setModalType] = useState("info");
@@ -40,6 +91,11 @@ function ProcessSection({
       return;
     }
 
+    if (transcribing) {
+      showModal("Please wait until the transcript is complete", "error");
+      return;
+    }
+
     if (highlights.length === 0) {
       showModal("Please add at least one highlight", "error");
       return;
@@ -54,6 +110,8 @@ function ProcessSection({
       highlights: allHighlights,
       transcript: transcriptData,
       preserve_audio: true,
+      background: true,
+      stream_output: watchWhileRendering,
     };
 
     console.log("Payload being sent to backend:", payload);
@@ -74,11 +132,29 @@ function ProcessSection({
         return;
       }
 
+      if (data.job_id) {
+        if (data.stream_url) {
+          setStreamUrl(`/api${data.stream_url}`);
+        }
+        const job = await followJob(
+          data.job_id,
+          setJobProgress,
+          setPreviewImage,
+        );
+        if (job.status === "failed") {
+          showModal("Error: " + (job.error || "Render failed"), "error");
+          return;
+        }
+      }
+
       onProcessSuccess(data.output_filename);
     } catch (error) {
       showModal("Error processing video: " + error.message, "error");
     } finally {
       setProcessing(false);
+      setStreamUrl(null);
+      setJobProgress(null);
+      setPreviewImage(null);
     }
   };
 
@@ -104,6 +180,17 @@ function ProcessSection({
         </div>
       </CardHeader>
       <CardBody className="pt-6 space-y-6">
+        <Switch
+          isSelected={watchWhileRendering}
+          onValueChange={setWatchWhileRendering}
+          isDisabled={processing}
+          size="sm"
+        >
+          <span className="text-sm text-gray-600">
+            Watch while it renders (such a render cannot resume if the server
+            restarts)
+          </span>
+        </Switch>
         <Tooltip
           content="Process your video with all highlights and effects"
           color="primary"
@@ -147,7 +234,9 @@ function ProcessSection({
               </div>
               <Progress
                 size="lg"
-                isIndeterminate
+                isIndeterminate={!jobProgress || !jobProgress.total_frames}
+                value={jobProgress ? jobProgress.progress * 100 : 0}
+                showValueLabel={Boolean(jobProgress && jobProgress.total_frames)}
                 aria-label="Processing..."
                 className="w-full"
                 color="primary"
@@ -155,9 +244,55 @@ function ProcessSection({
                   indicator: "bg-gradient-to-r from-cyan-500 to-blue-500",
                 }}
               />
-              <p className="text-center text-sm text-gray-600 font-medium">
-                Combining all highlights and music. This may take a while...
-              </p>
+              {jobProgress ? (
+                <div className="flex flex-wrap justify-center gap-x-6 gap-y-1 text-sm text-gray-600 font-medium">
+                  <span>
+                    {STAGE_LABELS[jobProgress.stage] || jobProgress.stage}
+                  </span>
+                  {jobProgress.total_frames > 0 && (
+                    <span>
+                      Frame {jobProgress.frames_done} of{" "}
+                      {jobProgress.total_frames}
+                    </span>
+                  )}
+                  {jobProgress.fps > 0 && (
+                    <span>{jobProgress.fps.toFixed(1)} fps</span>
+                  )}
+                  {jobProgress.stage === "video" &&
+                    jobProgress.eta_seconds != null && (
+                      <span>
+                        About {formatDuration(jobProgress.eta_seconds)} left
+                      </span>
+                    )}
+                </div>
+              ) : (
+                <p className="text-center text-sm text-gray-600 font-medium">
+                  Combining all highlights and music. This may take a while...
+                </p>
+              )}
+              {previewImage && (
+                <img
+                  src={previewImage}
+                  alt="Most recently rendered frame"
+                  className="mx-auto max-h-48 rounded-lg shadow"
+                />
+              )}
+              {streamUrl && (
+                <div className="space-y-2">
+                  <video
+                    src={streamUrl}
+                    controls
+                    autoPlay
+                    muted
+                    playsInline
+                    className="w-full max-h-96 rounded-lg bg-black"
+                  />
+                  <p className="text-center text-xs text-gray-500">
+                    Preview of the part rendered so far. It keeps growing
+                    while the rest of the video renders.
+                  </p>
+                </div>
+              )}
             </CardBody>
           </Card>
         )}
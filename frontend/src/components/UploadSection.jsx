@@ -10,12 +10,37 @@ import {
 } from "@heroui/react";
 import { Icon } from "@iconify/react";
 
-export default function UploadSection({ onUploadSuccess }) {
+// Call onEvent with each object of a newline-delimited JSON response body
+// as soon as its line has arrived.
+async function readEventStream(body, onEvent) {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    const lines = buffered.split("\n");
+    buffered = lines.pop();
+    lines
+      .filter((line) => line.trim())
+      .forEach((line) => onEvent(JSON.parse(line)));
+  }
+  if (buffered.trim()) onEvent(JSON.parse(buffered));
+}
+
+export default function UploadSection({
+  onUploadSuccess,
+  onTranscriptWords,
+  onTranscriptDone,
+}) {
   const [videoFile, setVideoFile] = useState(null);
   const [txtFile, setTxtFile] = useState(null);
   const [uploading, setUploading] = useState(false);
   const videoInputRef = useRef(null);
   const txtInputRef = useRef(null);
+  // Stops reading a running transcription when another upload starts
+  const transcriptionRef = useRef(null);
 
   const handleVideoChange = (e) => {
     if (e.target.files && e.target.files[0]) {
@@ -29,11 +54,76 @@ export default function UploadSection({ onUploadSuccess }) {
     }
   };
 
+  // Without a script, Whisper transcribes the video on the server. Its words
+  // arrive a window at a time, and the later steps open with the first batch.
+  const handleTranscribe = async () => {
+    transcriptionRef.current?.abort();
+    const controller = new AbortController();
+    transcriptionRef.current = controller;
+
+    const formData = new FormData();
+    formData.append("video", videoFile);
+    formData.append("stream", "true");
+    setUploading(true);
+
+    try {
+      const response = await fetch("/api/upload-video", {
+        method: "POST",
+        body: formData,
+        signal: controller.signal,
+      });
+
+      if (!response.ok || !response.body) {
+        const data = await response.json();
+        alert("Error: " + (data.error || response.statusText));
+        return;
+      }
+
+      let finished = false;
+      await readEventStream(response.body, (event) => {
+        if (event.event === "uploaded") {
+          setUploading(false);
+          onUploadSuccess({
+            ...event,
+            transcript: [],
+            subtitles: [],
+            transcribing: true,
+          });
+        } else if (event.event === "words") {
+          onTranscriptWords(event);
+        } else if (event.event === "done") {
+          finished = true;
+          onTranscriptDone(event);
+        } else if (event.event === "error") {
+          finished = true;
+          onTranscriptDone(null);
+          alert("Error: " + event.error);
+        }
+      });
+      if (!finished) {
+        onTranscriptDone(null);
+        alert("Transcription stopped before it finished");
+      }
+    } catch (error) {
+      if (error.name !== "AbortError") {
+        onTranscriptDone(null);
+        alert("Error uploading video: " + error.message);
+      }
+    } finally {
+      setUploading(false);
+    }
+  };
+
   const handleUpload = async () => {
-    if (!videoFile || !txtFile) {
-      alert("Please select both video and TXT files");
+    if (!videoFile) {
+      alert("Please select a video file");
+      return;
+    }
+    if (!txtFile) {
+      await handleTranscribe();
       return;
     }
+    transcriptionRef.current?.abort();
 
     const formData = new FormData();
     formData.append("video", videoFile);
@@ -80,7 +170,7 @@ export default function UploadSection({ onUploadSuccess }) {
               Step 1: Upload Your Files
             </h2>
             <p className="text-sm text-gray-500 mt-1">
-              Upload your video and transcript to begin
+              Upload your video, and a script if you have one
             </p>
           </div>
         </div>
@@ -151,10 +241,11 @@ export default function UploadSection({ onUploadSuccess }) {
               </div>
               <div className="flex-1">
                 <h3 className="text-lg font-bold text-blue-700 mb-1">
-                  Script/Transcript
+                  Script/Transcript (optional)
                 </h3>
                 <p className="text-sm text-gray-600 mb-3">
-                  Plain text file (.txt) with your script
+                  Plain text file (.txt) with your script. Without one,
+                  Whisper transcribes the video.
                 </p>
                 <input
                   ref={txtInputRef}
@@ -201,7 +292,9 @@ export default function UploadSection({ onUploadSuccess }) {
           <p className="text-sm text-blue-700 flex items-center gap-2 font-medium">
             <Icon icon="mdi:information" className="text-xl text-blue-600" />
             <span>
-              Words will be evenly distributed across the video duration
+              {txtFile
+                ? "Words will be evenly distributed across the video duration"
+                : "Words appear as Whisper transcribes them, so you can start selecting right away"}
             </span>
           </p>
         </div>
@@ -213,7 +306,7 @@ export default function UploadSection({ onUploadSuccess }) {
           variant="shadow"
           radius="lg"
           className="w-full font-bold text-base h-14 bg-gradient-to-r from-purple-600 to-blue-600 text-white"
-          isDisabled={!videoFile || !txtFile || uploading}
+          isDisabled={!videoFile || uploading}
           isLoading={uploading}
           onPress={handleUpload}
           startContent={
@@ -0,0 +1,118 @@
+import { useEffect, useRef, useState } from "react";
+
+// Peaks files are immutable per content hash, so share them across components.
+const peaksCache = new Map();
+
+// Parse the binary format written by audio_peaks.py:
+// "PEAK" | uint32 sample_rate | uint32 samples_per_peak | uint32 count | int8 min/max pairs
+function parsePeaks(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(
+    view.getUint8(0),
+    view.getUint8(1),
+    view.getUint8(2),
+    view.getUint8(3)
+  );
+  if (magic !== "PEAK") {
+    throw new Error("Invalid peaks data");
+  }
+  const sampleRate = view.getUint32(4, true);
+  const samplesPerPeak = view.getUint32(8, true);
+  const count = view.getUint32(12, true);
+  return {
+    duration: (count * samplesPerPeak) / sampleRate,
+    pairs: new Int8Array(buffer, 16, count * 2),
+  };
+}
+
+async function loadPeaks(sha256, samplesPerPeak) {
+  const key = `${sha256}:${samplesPerPeak}`;
+  if (!peaksCache.has(key)) {
+    const request = fetch(
+      `/api/assets/${sha256}/peaks?samples_per_peak=${samplesPerPeak}`
+    )
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(`Peaks request failed (${response.status})`);
+        }
+        return response.arrayBuffer();
+      })
+      .then(parsePeaks);
+    request.catch(() => peaksCache.delete(key));
+    peaksCache.set(key, request);
+  }
+  return peaksCache.get(key);
+}
+
+function Waveform({
+  sha256,
+  samplesPerPeak = 1024,
+  height = 56,
+  color = "#db2777",
+  className = "",
+}) {
+  const canvasRef = useRef(null);
+  const [peaks, setPeaks] = useState(null);
+  const [failed, setFailed] = useState(false);
+
+  useEffect(() => {
+    let cancelled = false;
+    setPeaks(null);
+    setFailed(false);
+    if (!sha256) return undefined;
+    loadPeaks(sha256, samplesPerPeak)
+      .then((data) => !cancelled && setPeaks(data))
+      .catch((error) => {
+        console.error("Error loading waveform:", error);
+        if (!cancelled) setFailed(true);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [sha256, samplesPerPeak]);
+
+  useEffect(() => {
+    const canvas = canvasRef.current;
+    if (!canvas || !peaks) return;
+    const width = canvas.clientWidth || 300;
+    const scale = window.devicePixelRatio || 1;
+    canvas.width = Math.round(width * scale);
+    canvas.height = Math.round(height * scale);
+    const context = canvas.getContext("2d");
+    context.scale(scale, scale);
+    context.clearRect(0, 0, width, height);
+    context.fillStyle = color;
+
+    // Each pixel column covers a range of peaks; draw their overall min/max.
+    const count = peaks.pairs.length / 2;
+    const middle = height / 2;
+    for (let x = 0; x < width && count > 0; x++) {
+      const first = Math.floor((x * count) / width);
+      const last = Math.max(first + 1, Math.floor(((x + 1) * count) / width));
+      let min = 127;
+      let max = -128;
+      for (let i = first; i < last && i < count; i++) {
+        min = Math.min(min, peaks.pairs[i * 2]);
+        max = Math.max(max, peaks.pairs[i * 2 + 1]);
+      }
+      const top = middle - (max / 128) * middle;
+      const bottom = middle - (min / 128) * middle;
+      context.fillRect(x, top, 1, Math.max(1, bottom - top));
+    }
+  }, [peaks, height, color]);
+
+  if (!sha256 || failed) {
+    return null;
+  }
+
+  return (
+    <canvas
+      ref={canvasRef}
+      className={`w-full rounded-lg bg-white/60 ${className}`}
+      style={{ height }}
+      title={peaks ? `${peaks.duration.toFixed(1)}s` : "Loading waveform..."}
+    />
+  );
+}
+
+export default Waveform;
@@ -15,8 +15,16 @@ import {
   Divider,
   ScrollShadow,
   Tooltip,
+  Spinner,
 } from "@heroui/react";
 import { Icon } from "@iconify/react";
+import Filmstrip from "./Filmstrip";
+
+function formatDuration(seconds) {
+  const total = Math.max(0, Math.round(seconds));
+  const minutes = Math.floor(total / 60);
+  return `${minutes}:${String(total % 60).padStart(2, "0")}`;
+}
 
 export default function WordSelection({
   transcriptData,
@@ -24,9 +32,11 @@ export default function WordSelection({
   setHighlights,
   selectedRange,
   setSelectedRange,
+  transcription,
 }) {
   const [clipFile, setClipFile] = useState(null);
   const [existingClips, setExistingClips] = useState([]);
+  const [clipHashes, setClipHashes] = useState({});
   const [selectedClip, setSelectedClip] = useState(new Set([]));
   const [uploading, setUploading] = useState(false);
   const clipInputRef = useRef(null);
@@ -42,6 +52,11 @@ export default function WordSelection({
       const response = await fetch("/api/list-clips");
       const data = await response.json();
       setExistingClips(data.clips || []);
+      const hashes = {};
+      (data.clip_details || []).forEach((detail) => {
+        if (detail.sha256) hashes[`clips/${detail.name}`] = detail.sha256;
+      });
+      setClipHashes(hashes);
     } catch (error) {
       console.error("Error loading clips:", error);
     }
@@ -192,6 +207,14 @@ export default function WordSelection({
               </span>
             );
           })}
+          {transcription && (
+            <span className="inline-flex items-center gap-2 text-sm text-blue-500">
+              <Spinner size="sm" color="primary" />
+              {transcription.duration
+                ? `Transcribing... ${formatDuration(transcription.transcribed)} of ${formatDuration(transcription.duration)}`
+                : "Transcribing..."}
+            </span>
+          )}
         </ScrollShadow>
 
         {selectedRange && (
@@ -303,6 +326,12 @@ export default function WordSelection({
                       </SelectItem>
                     ))}
                   </Select>
+                  {clipHashes[Array.from(selectedClip)[0]] && (
+                    <Filmstrip
+                      sha256={clipHashes[Array.from(selectedClip)[0]]}
+                      className="mt-3"
+                    />
+                  )}
                 </div>
               </div>
 
@@ -0,0 +1,169 @@
+"""
+Resident-memory tracking and admission control for renders.
+
+``MemoryTracker`` samples this process's resident set size on a background
+thread and keeps the peak of each render stage, so a stage that balloons shows
+up in the render result instead of as an OOM kill. Child processes (ffmpeg
+encoders, compositor workers) are not included. ``getrusage`` cannot tell
+their own peak apart from the parent memory they inherit at fork.
+
+``MemoryGate`` keeps several renders in one process within a shared limit.
+Each job reserves its estimated peak before it starts and waits while the jobs
+already running leave too little room. A job that is alone always runs, even
+when its estimate is larger than the whole limit.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+try:
+    import resource
+
+    HAVE_RESOURCE = True
+except ImportError:  # Windows
+    HAVE_RESOURCE = False
+
+MEMORY_SAMPLE_SECONDS = 0.1
+MB = 1024 * 1024
+
+try:
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+
+def budget_from_env(name: str) -> Optional[int]:
+    """Read a budget in megabytes from environment variable ``name`` (bytes, or ``None``)."""
+
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return None
+    try:
+        megabytes = float(value)
+    except ValueError:
+        print(f"[warn] Ignoring {name}={value!r}; expected a number of megabytes.")
+        return None
+    return int(megabytes * MB) if megabytes > 0 else None
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, or ``None`` where it cannot be read."""
+
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        pass
+    if HAVE_RESOURCE:
+        # The peak so far, the best available without /proc; macOS reports bytes, others KiB
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+    return None
+
+
+class MemoryTracker:
+    """Per-stage peak resident memory of the current process.
+
+    Use as a context manager around a render and call ``enter`` at each stage
+    boundary. The tracker measures the whole process, so renders that run at
+    the same time in one process show up in each other's numbers.
+    """
+
+    def __init__(self, interval: float = MEMORY_SAMPLE_SECONDS):
+        self.interval = interval
+        self.stage: Optional[str] = None
+        self.peaks: Dict[str, int] = {}
+        self.stage_start_rss: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "MemoryTracker":
+        self._thread = threading.Thread(target=self._run, name="memory-tracker", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.enter(None)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def enter(self, stage: Optional[str]) -> None:
+        """Close the current stage and start measuring ``stage`` (``None`` to stop)."""
+
+        with self._lock:
+            self._sample()
+            self.stage = stage
+            if stage is not None:
+                rss = current_rss()
+                if rss is not None:
+                    self.stage_start_rss.setdefault(stage, rss)
+                self._sample()
+
+    def _sample(self) -> None:
+        if self.stage is None:
+            return
+        rss = current_rss()
+        if rss is not None and rss > self.peaks.get(self.stage, 0):
+            self.peaks[self.stage] = rss
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                self._sample()
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Return ``{stage: {"peak_mb", "growth_mb"}}``; growth is over the stage's starting RSS."""
+
+        with self._lock:
+            return {
+                stage: {
+                    "peak_mb": round(peak / MB, 1),
+                    "growth_mb": round(max(0, peak - self.stage_start_rss.get(stage, peak)) / MB, 1),
+                }
+                for stage, peak in self.peaks.items()
+            }
+
+
+class MemoryGate:
+    """Admit renders into one process while their estimated peaks fit ``limit`` bytes."""
+
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+        self.reserved = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes: int, on_wait: Optional[Callable[[], None]] = None) -> Iterator[None]:
+        """Hold ``nbytes`` of the limit for the duration of the block.
+
+        Waits while other reservations leave too little room. ``on_wait`` is
+        called once when that happens.
+        """
+
+        nbytes = max(0, int(nbytes))
+        with self._condition:
+            waited = False
+            while self.limit and self.reserved and self.reserved + nbytes > self.limit:
+                if not waited:
+                    waited = True
+                    print(
+                        f"[info] Waiting for memory: {nbytes / MB:.0f} MB needed, "
+                        f"{self.reserved / MB:.0f} of {self.limit / MB:.0f} MB reserved."
+                    )
+                    if on_wait is not None:
+                        on_wait()
+                self._condition.wait()
+            self.reserved += nbytes
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.reserved -= nbytes
+                self._condition.notify_all()
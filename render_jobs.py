@@ -0,0 +1,440 @@
+"""
+Crash-safe render jobs backed by SQLite.
+
+A job stores everything needed to render again (project config, transcript) and
+the segments of the output that are already finalised on disk. Renders run with
+a ``RenderCheckpoint`` so every completed segment is recorded as soon as it is
+durable; after a crash or redeploy ``resume_interrupted_jobs`` hands the job to
+a new process, which resumes encoding after the last completed segment instead
+of starting again from frame 0. Streaming renders write one growing file and
+cannot resume; they are recorded as not ``resumable``, and one interrupted
+mid-render is marked failed instead of being restarted from scratch.
+
+While a job runs, its live progress (frames, fps, preview frames) is kept in
+memory by ``JobStore.live_progress`` for the process that renders it. Jobs
+rendering in one process share ``VIDEO_OVERLAY_PROCESS_MEMORY_MB``: each
+reserves its estimated peak (see ``plan_render_memory``) and waits for room.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Callable, Dict, Iterator, List, Optional
+
+from memory_budget import MemoryGate, budget_from_env
+from render_progress import ProgressRegistry, RenderProgress
+from video_overlay_script import (
+    CACHE_DIR,
+    ProjectConfig,
+    RenderCheckpoint,
+    apply_project_config_data,
+    end_streaming_outputs,
+    get_media_metadata,
+    plan_render_memory,
+)
+
+JOB_DB_PATH = os.environ.get("VIDEO_OVERLAY_JOB_DB", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+SEGMENT_ROOT = os.path.join(CACHE_DIR, "segments")
+DEFAULT_SEGMENT_FRAMES = 300  # 10 seconds at 30 fps
+HEARTBEAT_INTERVAL = 10.0  # Seconds between liveness updates while a job runs
+STALE_AFTER = 60.0  # A running job without a heartbeat this long is considered dead
+PROCESS_MEMORY_BUDGET_ENV = "VIDEO_OVERLAY_PROCESS_MEMORY_MB"  # Shared by jobs in one process
+
+JOB_STATUSES = ("queued", "running", "completed", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    config TEXT NOT NULL,
+    transcript TEXT,
+    segment_frames INTEGER NOT NULL,
+    total_segments INTEGER NOT NULL DEFAULT 0,
+    resumable INTEGER NOT NULL DEFAULT 1,
+    owner TEXT,
+    heartbeat REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_segments (
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    segment_index INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    first_frame INTEGER NOT NULL,
+    frame_count INTEGER NOT NULL,
+    completed_at REAL NOT NULL,
+    PRIMARY KEY (job_id, segment_index)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status);
+"""
+
+
+def process_owner() -> str:
+    """Identify this process as ``host:pid`` for job ownership."""
+
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def owner_is_alive(owner: Optional[str]) -> bool:
+    """Return False when ``owner`` is a process on this host that no longer exists."""
+
+    if not owner or ":" not in owner:
+        return False
+    host, _, pid_text = owner.rpartition(":")
+    if host != socket.gethostname():
+        return True  # Cannot check other hosts; rely on the heartbeat instead
+    try:
+        os.kill(int(pid_text), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def project_config_to_dict(config: ProjectConfig) -> Dict[str, object]:
+    """Serialise a ``ProjectConfig`` to plain JSON types."""
+
+    return asdict(config)
+
+
+def project_config_from_dict(data: Dict[str, object]) -> ProjectConfig:
+    """Rebuild a ``ProjectConfig`` written by ``project_config_to_dict``."""
+
+    config = ProjectConfig(
+        main_video_path=data["main_video_path"],
+        output_path=data.get("output_path", "output.mp4"),
+        whisper_model=data.get("whisper_model", "base"),
+    )
+    # Unset optional fields keep their defaults rather than being parsed as values.
+    values = {key: value for key, value in data.items() if value is not None}
+    return apply_project_config_data(values, config)
+
+
+class JobStore:
+    """Persistent job table. Each call opens its own connection, so one store
+    can be shared between request threads and render threads."""
+
+    def __init__(self, path: str = JOB_DB_PATH, segment_root: str = SEGMENT_ROOT):
+        self.path = path
+        self.segment_root = segment_root
+        # Progress of the jobs this process is rendering (not persisted)
+        self.live_progress = ProgressRegistry()
+        self.memory_gate = MemoryGate(budget_from_env(PROCESS_MEMORY_BUDGET_ENV))
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+            columns = {row["name"] for row in connection.execute("PRAGMA table_info(jobs)")}
+            if "resumable" not in columns:  # Databases created before the column existed
+                connection.execute("ALTER TABLE jobs ADD COLUMN resumable INTEGER NOT NULL DEFAULT 1")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        try:
+            connection.row_factory = sqlite3.Row
+            # WAL keeps readers unblocked during renders; FULL sync makes every
+            # committed segment record survive a power loss, not just a crash.
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=FULL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            yield connection
+        finally:
+            connection.close()
+
+    def segment_dir(self, job_id: str) -> str:
+        return os.path.join(self.segment_root, job_id)
+
+    def create_job(
+        self,
+        config: ProjectConfig,
+        transcript: Optional[List[Dict[str, float]]] = None,
+        segment_frames: int = DEFAULT_SEGMENT_FRAMES,
+    ) -> str:
+        """Record a new queued job and return its id.
+
+        Streaming renders (``config.stream_output``) are recorded as not
+        resumable, since their output is one file written in a single pass.
+        """
+
+        job_id = uuid.uuid4().hex
+        total_segments = 0
+        try:
+            frame_count = get_media_metadata(config.main_video_path).frame_count
+            total_segments = math.ceil(frame_count / segment_frames) if frame_count else 0
+        except (IOError, OSError):
+            pass
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, status, config, transcript, segment_frames,"
+                " total_segments, resumable, created_at, updated_at)"
+                " VALUES (?, 'queued', ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    json.dumps(project_config_to_dict(config)),
+                    json.dumps(transcript) if transcript is not None else None,
+                    int(segment_frames),
+                    total_segments,
+                    0 if config.stream_output else 1,
+                    now,
+                    now,
+                ),
+            )
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, object]]:
+        """Return the job row plus its completed segment count, or ``None``."""
+
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            completed = connection.execute(
+                "SELECT COUNT(*) FROM job_segments WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+        job = dict(row)
+        job["config"] = json.loads(job["config"])
+        job["transcript"] = json.loads(job["transcript"]) if job["transcript"] else None
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["resumable"] = bool(job["resumable"])
+        job["completed_segments"] = completed
+        return job
+
+    def claim(self, job_id: str, owner: str) -> bool:
+        """Mark ``job_id`` as running for ``owner`` unless another live process holds it."""
+
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT status, owner, heartbeat FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None or row["status"] in ("completed", "failed"):
+                connection.execute("ROLLBACK")
+                return False
+            if (
+                row["status"] == "running"
+                and row["owner"] != owner
+                and now - (row["heartbeat"] or 0.0) < STALE_AFTER
+                and owner_is_alive(row["owner"])
+            ):
+                connection.execute("ROLLBACK")
+                return False
+            connection.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, heartbeat = ?,"
+                " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (owner, now, now, job_id),
+            )
+            connection.execute("COMMIT")
+        return True
+
+    def interrupted_jobs(self) -> List[str]:
+        """Return ids of unfinished jobs whose owning process is gone."""
+
+        now = time.time()
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT id, status, owner, heartbeat FROM jobs"
+                " WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [
+            row["id"]
+            for row in rows
+            if row["status"] == "queued"
+            or now - (row["heartbeat"] or 0.0) >= STALE_AFTER
+            or not owner_is_alive(row["owner"])
+        ]
+
+    def heartbeat(self, job_id: str) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time(), job_id)
+            )
+
+    def record_segment(
+        self, job_id: str, index: int, path: str, first_frame: int, frame_count: int
+    ) -> None:
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO job_segments (job_id, segment_index, path,"
+                " first_frame, frame_count, completed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, index, path, first_frame, frame_count, now),
+            )
+            connection.execute(
+                "UPDATE jobs SET heartbeat = ?, updated_at = ? WHERE id = ?",
+                (now, now, job_id),
+            )
+
+    def resumable_segments(self, job_id: str) -> int:
+        """Return how many leading segments are recorded and still on disk.
+
+        Anything after the first gap is rendered again, and its stale records
+        are dropped so progress reporting stays truthful.
+        """
+
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT segment_index, path FROM job_segments WHERE job_id = ?"
+                " ORDER BY segment_index",
+                (job_id,),
+            ).fetchall()
+            completed = 0
+            for row in rows:
+                if row["segment_index"] != completed or not os.path.exists(row["path"]):
+                    break
+                completed += 1
+            connection.execute(
+                "DELETE FROM job_segments WHERE job_id = ? AND segment_index >= ?",
+                (job_id, completed),
+            )
+        return completed
+
+    def finish(self, job_id: str, result: Dict[str, object]) -> None:
+        self._set_final_status(job_id, "completed", result=json.dumps(result, default=str))
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._set_final_status(job_id, "failed", error=error)
+
+    def _set_final_status(
+        self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None
+    ) -> None:
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, heartbeat = ?,"
+                " updated_at = ? WHERE id = ?",
+                (status, result, error, now, now, job_id),
+            )
+
+
+RenderFunction = Callable[
+    [ProjectConfig, Optional[List[Dict[str, float]]], Optional[RenderCheckpoint], RenderProgress],
+    Dict[str, object],
+]
+
+
+def run_job(store: JobStore, job_id: str, render: RenderFunction) -> Optional[Dict[str, object]]:
+    """Claim and run ``job_id``, resuming after its completed segments.
+
+    ``render(config, transcript, checkpoint, progress)`` performs the render
+    and reports to ``progress``, which subscribers find in
+    ``store.live_progress`` while the job runs. Returns the render result, or
+    ``None`` when another live process owns the job. Failures are recorded on
+    the job and re-raised. Jobs that are not resumable get no checkpoint.
+    """
+
+    owner = process_owner()
+    if not store.claim(job_id, owner):
+        return None
+    job = store.get_job(job_id)
+    completed = store.resumable_segments(job_id)
+    if completed:
+        print(f"[info] Resuming job {job_id} after {completed} completed segment(s).")
+
+    checkpoint: Optional[RenderCheckpoint] = None
+    if job["resumable"]:
+        checkpoint = RenderCheckpoint(
+            segment_dir=store.segment_dir(job_id),
+            segment_frames=int(job["segment_frames"]),
+            completed_segments=completed,
+            on_segment=lambda index, path, first_frame, frame_count: store.record_segment(
+                job_id, index, path, first_frame, frame_count
+            ),
+        )
+
+    stop_heartbeat = threading.Event()
+
+    def beat() -> None:
+        while not stop_heartbeat.wait(HEARTBEAT_INTERVAL):
+            store.heartbeat(job_id)
+
+    heartbeat_thread = threading.Thread(target=beat, name=f"job-{job_id}-heartbeat", daemon=True)
+    heartbeat_thread.start()
+    progress = store.live_progress.start(job_id)
+    try:
+        try:
+            config = project_config_from_dict(job["config"])
+            memory_plan = plan_render_memory(config, verbose=False)
+            with store.memory_gate.reserve(
+                memory_plan.peak, on_wait=lambda: progress.set_stage("waiting")
+            ):
+                result = render(config, job["transcript"], checkpoint, progress)
+        except Exception as exc:  # noqa: BLE001 - recorded on the job, then re-raised
+            store.fail(job_id, f"{exc}\n{traceback.format_exc()}")
+            progress.finish("failed", str(exc))
+            raise
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+        store.finish(
+            job_id,
+            {
+                key: value
+                for key, value in result.items()
+                if key in ("output_path", "outputs", "subtitle_files", "timings", "memory")
+            },
+        )
+        progress.finish("completed")
+    finally:
+        store.live_progress.discard(job_id, progress)
+    if checkpoint is not None:
+        shutil.rmtree(checkpoint.segment_dir, ignore_errors=True)
+    return result
+
+
+def start_job_thread(store: JobStore, job_id: str, render: RenderFunction) -> threading.Thread:
+    """Run ``job_id`` on a background thread (errors are recorded, not raised)."""
+
+    def target() -> None:
+        try:
+            run_job(store, job_id, render)
+        except Exception:  # noqa: BLE001 - already stored on the job
+            print(f"[warn] Render job {job_id} failed.")
+
+    thread = threading.Thread(target=target, name=f"job-{job_id}", daemon=True)
+    thread.start()
+    return thread
+
+
+def resume_interrupted_jobs(store: JobStore, render: RenderFunction) -> List[str]:
+    """Restart every job left unfinished by a crashed or redeployed process.
+
+    A job that is not resumable and was interrupted mid-render is marked
+    failed instead, and its streaming markers are removed. One that was still
+    queued has not written anything yet and runs normally. Returns the ids of
+    the restarted jobs.
+    """
+
+    restarted: List[str] = []
+    for job_id in store.interrupted_jobs():
+        job = store.get_job(job_id)
+        if job["status"] == "running" and not job["resumable"]:
+            print(f"[warn] Render job {job_id} was interrupted while streaming; it cannot resume.")
+            store.fail(job_id, "Interrupted while streaming its output; start the render again.")
+            end_streaming_outputs(
+                [job["config"]["output_path"]]
+                + [variant["output_path"] for variant in job["config"].get("extra_outputs") or []]
+            )
+            continue
+        print(f"[info] Restarting interrupted render job {job_id}.")
+        start_job_thread(store, job_id, render)
+        restarted.append(job_id)
+    return restarted
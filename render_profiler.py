@@ -0,0 +1,162 @@
+"""
+Profiling helpers for the render pipeline.
+
+``profile_call`` runs a callable under either a low-overhead stack sampler or
+``cProfile`` and writes a per-function report next to the render output. The
+sampler also writes a folded stack dump (``<output>.profile.folded``) that
+flame-graph tools such as ``flamegraph.pl`` or speedscope read directly;
+``cProfile`` saves its ``.pstats`` file instead.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+PROFILE_MODES = ("sample", "cprofile")
+DEFAULT_SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+REPORT_TOP_FUNCTIONS = 40
+
+
+class StackSampler:
+    """Periodically capture the Python stack of one thread from a helper thread."""
+
+    def __init__(self, thread_id: int, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = max(0.0005, float(interval))
+        self.stacks: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="render-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+            self.sample_count += 1
+
+    def folded_lines(self) -> List[str]:
+        """Return stacks in the ``root;child;leaf count`` folded format."""
+
+        return [
+            f"{';'.join(stack)} {count}"
+            for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1])
+        ]
+
+    def function_report(self, elapsed: float) -> str:
+        """Summarise samples per function by self and inclusive counts."""
+
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            self_counts[stack[-1]] += count
+            for name in set(stack):
+                total_counts[name] += count
+
+        total = max(1, self.sample_count)
+        lines = [
+            f"Sampling profile: {self.sample_count} samples every "
+            f"{self.interval * 1000:.1f} ms over {elapsed:.2f}s",
+            "",
+            f"{'self %':>7} {'total %':>8} {'self':>7} {'total':>7}  function",
+        ]
+        for name, total_count in total_counts.most_common(REPORT_TOP_FUNCTIONS):
+            self_count = self_counts.get(name, 0)
+            lines.append(
+                f"{self_count * 100.0 / total:>6.1f}% {total_count * 100.0 / total:>7.1f}% "
+                f"{self_count:>7} {total_count:>7}  {name}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+def profile_output_paths(output_path: str) -> Dict[str, str]:
+    """Return the report locations used for a render written to ``output_path``."""
+
+    root, _ = os.path.splitext(output_path)
+    return {
+        "report": f"{root}.profile.txt",
+        "folded": f"{root}.profile.folded",
+        "pstats": f"{root}.profile.pstats",
+    }
+
+
+def profile_call(
+    func: Callable[[], T],
+    output_path: str,
+    mode: str = "sample",
+    interval: float = DEFAULT_SAMPLE_INTERVAL,
+) -> Tuple[T, Dict[str, str]]:
+    """Run ``func`` under the requested profiler and write reports beside ``output_path``.
+
+    ``sample`` mode only inspects the stack every ``interval`` seconds, so it is
+    safe to use on production-sized renders. ``cprofile`` mode records exact
+    call counts and timings for every function instead; only the requested
+    profiler runs, so its numbers are not skewed by the other.
+    """
+
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}'. Use one of {PROFILE_MODES}.")
+
+    paths = profile_output_paths(output_path)
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        paths.pop("folded")
+        try:
+            result = profiler.runcall(func)
+        finally:
+            profiler.dump_stats(paths["pstats"])
+            buffer = io.StringIO()
+            stats = pstats.Stats(profiler, stream=buffer)
+            stats.sort_stats("cumulative").print_stats(REPORT_TOP_FUNCTIONS)
+            stats.sort_stats("tottime").print_stats(REPORT_TOP_FUNCTIONS)
+            with open(paths["report"], "w", encoding="utf-8") as file:
+                file.write(buffer.getvalue())
+            print(f"[profile] Reports written to {paths['report']} and {paths['pstats']}")
+        return result, paths
+
+    paths.pop("pstats")
+    sampler = StackSampler(threading.get_ident(), interval)
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        result = func()
+    finally:
+        sampler.stop()
+        elapsed = time.perf_counter() - started
+        with open(paths["report"], "w", encoding="utf-8") as file:
+            file.write(sampler.function_report(elapsed))
+        with open(paths["folded"], "w", encoding="utf-8") as file:
+            file.write("\n".join(sampler.folded_lines()) + "\n")
+        print(f"[profile] Reports written to {paths['report']} and {paths['folded']}")
+
+    return result, paths
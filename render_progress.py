@@ -0,0 +1,185 @@
+"""
+Live progress of running renders, for the server-sent-events endpoint.
+
+The render loop reports every finished frame to a ``RenderProgress`` with
+``frame_done``. That call is a counter update and one clock read. Only a few
+times per second does it publish a snapshot (frames done, stage, measured
+fps, ETA), and only while someone is watching does it keep a downscaled copy
+of the frame. Everything slower stays on the readers' side: JPEG encoding
+happens in the first subscriber that asks for a new preview, and the result
+is shared with the others.
+
+Subscribers block in ``wait`` until the published sequence number moves past
+the one they last saw, so an idle stream costs nothing on the render thread.
+"""
+
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from typing import Deque, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+PUBLISH_INTERVAL = 0.25  # Seconds between progress snapshots from the render loop
+PREVIEW_INTERVAL = 0.5  # Seconds between preview frames while someone is watching
+PREVIEW_WIDTH = 320
+PREVIEW_JPEG_QUALITY = 70
+FPS_WINDOW_SECONDS = 5.0  # Measured fps covers roughly this much recent rendering
+
+
+class RenderProgress:
+    """Thread-safe progress of one render, written by the renderer and read by subscribers."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self.sequence = 0  # Bumped on every published change
+        self.stage = "queued"
+        self.total_frames = 0
+        self.frames_done = 0
+        self.fps = 0.0
+        self.status: Optional[str] = None  # "completed" or "failed" once finished
+        self.error: Optional[str] = None
+        self.watchers = 0
+        self._samples: Deque[Tuple[float, int]] = collections.deque()
+        self._last_publish = 0.0
+        self._last_preview = 0.0
+        self._preview_frame: Optional[np.ndarray] = None
+        self.preview_sequence = 0
+        self._preview_jpeg: Optional[bytes] = None
+        self._preview_jpeg_sequence = 0
+
+    def set_stage(self, stage: str, total_frames: Optional[int] = None, frames_done: int = 0) -> None:
+        """Enter ``stage``; a stage with ``total_frames`` counts frames from ``frames_done``."""
+
+        with self._condition:
+            self.stage = stage
+            if total_frames is not None:
+                self.total_frames = max(0, int(total_frames))
+                self.frames_done = int(frames_done)
+                self.fps = 0.0
+                self._samples.clear()
+                self._samples.append((time.monotonic(), self.frames_done))
+            self._publish()
+
+    def frame_done(self, frame: Optional[np.ndarray] = None) -> None:
+        """Count one composited frame. Called from the render loop for every frame."""
+
+        self.frames_done += 1
+        now = time.monotonic()
+        if now - self._last_publish < PUBLISH_INTERVAL:
+            return
+        with self._condition:
+            self._last_publish = now
+            self._samples.append((now, self.frames_done))
+            while len(self._samples) > 2 and now - self._samples[0][0] > FPS_WINDOW_SECONDS:
+                self._samples.popleft()
+            first_time, first_frames = self._samples[0]
+            if now > first_time:
+                self.fps = (self.frames_done - first_frames) / (now - first_time)
+            if (
+                frame is not None
+                and self.watchers
+                and now - self._last_preview >= PREVIEW_INTERVAL
+            ):
+                self._last_preview = now
+                height, width = frame.shape[:2]
+                preview_width = min(PREVIEW_WIDTH, width)
+                preview_height = max(1, round(height * preview_width / width))
+                self._preview_frame = cv2.resize(
+                    frame, (preview_width, preview_height), interpolation=cv2.INTER_AREA
+                )
+                self.preview_sequence += 1
+            self._publish()
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        with self._condition:
+            self.status = status
+            self.error = error
+            self.stage = "done" if status == "completed" else status
+            self._preview_frame = None
+            self._publish()
+
+    def _publish(self) -> None:
+        self.sequence += 1
+        self._condition.notify_all()
+
+    def snapshot(self) -> Dict[str, object]:
+        """Return the published state as JSON-ready values."""
+
+        with self._condition:
+            remaining = max(0, self.total_frames - self.frames_done)
+            eta = remaining / self.fps if self.fps > 0 and self.total_frames else None
+            return {
+                "stage": self.stage,
+                "frames_done": min(self.frames_done, self.total_frames)
+                if self.total_frames
+                else self.frames_done,
+                "total_frames": self.total_frames,
+                "progress": round(min(self.frames_done / self.total_frames, 1.0), 4)
+                if self.total_frames
+                else 0.0,
+                "fps": round(self.fps, 2),
+                "eta_seconds": round(eta, 1) if eta is not None else None,
+                "status": self.status,
+            }
+
+    def preview_jpeg(self) -> Tuple[int, Optional[bytes]]:
+        """Return ``(preview_sequence, jpeg bytes)`` of the latest sampled frame."""
+
+        with self._condition:
+            sequence, frame = self.preview_sequence, self._preview_frame
+            if self._preview_jpeg_sequence == sequence:
+                return sequence, self._preview_jpeg
+        if frame is None:
+            return sequence, None
+        ok, encoded = cv2.imencode(
+            ".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), PREVIEW_JPEG_QUALITY]
+        )
+        jpeg = encoded.tobytes() if ok else None
+        with self._condition:
+            if sequence > self._preview_jpeg_sequence:
+                self._preview_jpeg_sequence, self._preview_jpeg = sequence, jpeg
+        return sequence, jpeg
+
+    def wait(self, after_sequence: int, timeout: float) -> int:
+        """Block until something newer than ``after_sequence`` is published (or ``timeout``)."""
+
+        with self._condition:
+            self._condition.wait_for(lambda: self.sequence > after_sequence, timeout)
+            return self.sequence
+
+    def add_watcher(self) -> None:
+        with self._condition:
+            self.watchers += 1
+            self._last_preview = 0.0  # A new viewer gets a frame on the next publish
+
+    def remove_watcher(self) -> None:
+        with self._condition:
+            self.watchers = max(0, self.watchers - 1)
+
+
+class ProgressRegistry:
+    """``RenderProgress`` of the renders running in this process, by job id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, RenderProgress] = {}
+
+    def start(self, job_id: str) -> RenderProgress:
+        with self._lock:
+            progress = self._jobs[job_id] = RenderProgress()
+            return progress
+
+    def get(self, job_id: str) -> Optional[RenderProgress]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id: str, progress: RenderProgress) -> None:
+        """Forget ``progress`` unless a newer run of the job has replaced it."""
+
+        with self._lock:
+            if self._jobs.get(job_id) is progress:
+                del self._jobs[job_id]
@@ -0,0 +1,243 @@
+"""
+SRT and ASS subtitle files, and the ffmpeg filter that burns an ASS file in.
+
+The renderer resolves its subtitles into ``SubtitleEvent`` values, one per
+on-screen subtitle. Each event holds its already wrapped lines and the time
+span it is visible. This module only formats events. Layout and styling
+decisions stay with the caller:
+
+* ``write_srt`` writes a plain sidecar for players and editors.
+* ``write_ass`` writes one ``AssStyle`` and a ``Dialogue`` per event. It uses
+  ``WrapStyle: 2``, so libass keeps the caller's line breaks instead of
+  wrapping again.
+* ``subtitles_filter`` builds the ``-vf`` argument that has ffmpeg's libass
+  draw the file while it encodes.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+ASS_BORDER_OUTLINE = 1  # Outline and drop shadow around the glyphs
+ASS_BORDER_BOX = 3  # Opaque box behind each line, padded by ``outline`` pixels
+ASS_ALIGN_BOTTOM_CENTRE = 2
+
+
+@dataclass
+class SubtitleEvent:
+    """One subtitle as shown on screen."""
+
+    start: float  # Seconds
+    end: float
+    lines: List[str]
+    margin_v: int = 0  # ASS only: distance from the frame bottom (0 keeps the style's)
+    highlighted: List[List[bool]] = field(default_factory=list)  # ASS only: per line, per word
+
+
+@dataclass
+class AssStyle:
+    """The subset of an ASS ``[V4+ Styles]`` entry the renderer maps designs to."""
+
+    font_name: str = "Arial"
+    font_size: float = 48.0
+    primary_colour: Tuple[int, int, int] = (255, 255, 255)  # BGR, like the rest of the renderer
+    outline_colour: Tuple[int, int, int] = (0, 0, 0)  # Also the box colour with ASS_BORDER_BOX
+    outline_opacity: float = 1.0
+    back_colour: Tuple[int, int, int] = (0, 0, 0)  # Shadow colour
+    back_opacity: float = 0.0
+    bold: bool = False
+    border_style: int = ASS_BORDER_OUTLINE
+    outline: float = 0.0
+    shadow: float = 0.0
+    alignment: int = ASS_ALIGN_BOTTOM_CENTRE
+    margin_l: int = 0
+    margin_r: int = 0
+    margin_v: int = 30
+    name: str = "Default"
+    highlight_text_colour: Optional[Tuple[int, int, int]] = None  # Inline override per word
+    highlight_box_colour: Optional[Tuple[int, int, int]] = None  # Box behind a word (box style)
+
+
+def format_srt_timestamp(seconds: float) -> str:
+    """``HH:MM:SS,mmm`` as used by SRT."""
+
+    millis = max(0, int(round(seconds * 1000)))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def format_ass_timestamp(seconds: float) -> str:
+    """``H:MM:SS.cc`` as used by ASS (centisecond precision)."""
+
+    centis = max(0, int(round(seconds * 100)))
+    hours, centis = divmod(centis, 360_000)
+    minutes, centis = divmod(centis, 6000)
+    secs, centis = divmod(centis, 100)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}.{centis:02d}"
+
+
+def ass_colour(bgr: Sequence[int], opacity: float = 1.0) -> str:
+    """``&HAABBGGRR`` for a BGR colour; ASS alpha counts transparency, not opacity."""
+
+    alpha = 255 - int(round(255 * min(max(float(opacity), 0.0), 1.0)))
+    blue, green, red = (min(max(int(value), 0), 255) for value in bgr[:3])
+    return f"&H{alpha:02X}{blue:02X}{green:02X}{red:02X}"
+
+
+def escape_ass_text(text: str) -> str:
+    """Make ``text`` literal inside a ``Dialogue`` line."""
+
+    # A word joiner after the backslash stops "\N", "\h" and "\{" acting as escapes
+    text = re.sub(r"\\(?=[Nnh{}])", "\\\u2060", text)
+    return text.replace("{", "\\{").replace("}", "\\}").replace("\n", " ")
+
+
+def ass_override_colour(bgr: Sequence[int]) -> str:
+    """``&HBBGGRR&`` as used by the ``\\c`` family of override tags."""
+
+    return ass_colour(bgr).replace("&H00", "&H", 1) + "&"
+
+
+def highlight_override(style: AssStyle) -> str:
+    """Override block that recolours a highlighted word, or ``""`` when nothing changes."""
+
+    tags = ""
+    text_colour = style.highlight_text_colour
+    if text_colour is not None and tuple(text_colour) != tuple(style.primary_colour):
+        tags += "\\c" + ass_override_colour(text_colour)
+    box_colour = style.highlight_box_colour
+    if (
+        style.border_style == ASS_BORDER_BOX
+        and box_colour is not None
+        and tuple(box_colour) != tuple(style.outline_colour)
+    ):
+        tags += "\\3c" + ass_override_colour(box_colour)
+    return "{" + tags + "}" if tags else ""
+
+
+def ass_line_text(line: str, highlighted: Sequence[bool], style: AssStyle) -> str:
+    """Escape ``line`` and recolour the words flagged in ``highlighted``."""
+
+    override = highlight_override(style)
+    if not override or not any(highlighted):
+        return escape_ass_text(line)
+    words = line.split(" ")
+    if len(words) != len(highlighted):
+        return escape_ass_text(line)
+    parts = [
+        f"{override}{escape_ass_text(word)}{{\\r}}" if flag else escape_ass_text(word)
+        for word, flag in zip(words, highlighted)
+    ]
+    return " ".join(parts)
+
+
+def write_srt(path: str, events: Sequence[SubtitleEvent]) -> None:
+    """Write ``events`` as a numbered SRT file."""
+
+    with open(path, "w", encoding="utf-8") as file:
+        for number, event in enumerate(events, start=1):
+            file.write(f"{number}\n")
+            file.write(
+                f"{format_srt_timestamp(event.start)} --> {format_srt_timestamp(event.end)}\n"
+            )
+            file.write("\n".join(event.lines) + "\n\n")
+
+
+def write_ass(
+    path: str,
+    events: Sequence[SubtitleEvent],
+    style: AssStyle,
+    play_res: Tuple[int, int],
+) -> None:
+    """Write ``events`` as an ASS script laid out for a ``play_res`` (width, height) frame."""
+
+    width, height = play_res
+    style_fields = [
+        style.name,
+        style.font_name.replace(",", " "),
+        f"{style.font_size:g}",
+        ass_colour(style.primary_colour),
+        ass_colour(style.primary_colour),
+        ass_colour(style.outline_colour, style.outline_opacity),
+        ass_colour(style.back_colour, style.back_opacity),
+        "-1" if style.bold else "0",
+        "0",  # Italic
+        "0",  # Underline
+        "0",  # StrikeOut
+        "100",  # ScaleX
+        "100",  # ScaleY
+        "0",  # Spacing
+        "0",  # Angle
+        str(style.border_style),
+        f"{style.outline:g}",
+        f"{style.shadow:g}",
+        str(style.alignment),
+        str(style.margin_l),
+        str(style.margin_r),
+        str(style.margin_v),
+        "1",  # Encoding
+    ]
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("[Script Info]\n")
+        file.write("ScriptType: v4.00+\n")
+        file.write(f"PlayResX: {width}\n")
+        file.write(f"PlayResY: {height}\n")
+        file.write("WrapStyle: 2\n")
+        file.write("ScaledBorderAndShadow: yes\n")
+        file.write("YCbCr Matrix: None\n\n")
+        file.write("[V4+ Styles]\n")
+        file.write(
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, "
+            "OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, "
+            "ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, "
+            "MarginL, MarginR, MarginV, Encoding\n"
+        )
+        file.write("Style: " + ",".join(style_fields) + "\n\n")
+        file.write("[Events]\n")
+        file.write(
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+        )
+        for event in events:
+            text = "\\N".join(
+                ass_line_text(
+                    line,
+                    event.highlighted[index] if index < len(event.highlighted) else [],
+                    style,
+                )
+                for index, line in enumerate(event.lines)
+            )
+            file.write(
+                f"Dialogue: 0,{format_ass_timestamp(event.start)},"
+                f"{format_ass_timestamp(event.end)},{style.name},,0,0,"
+                f"{max(0, int(event.margin_v))},,{text}\n"
+            )
+
+
+def escape_filter_value(value: str) -> str:
+    """Escape ``value`` for a filter option inside an ffmpeg filtergraph.
+
+    The graph parser and the option parser each strip one level of escaping,
+    so characters special to either are escaped twice over.
+    """
+
+    if os.sep != "/":
+        value = value.replace(os.sep, "/")  # ffmpeg takes forward slashes on Windows too
+    for char in ("\\", "'", ":"):
+        value = value.replace(char, "\\" + char)
+    for char in ("\\", "'", "[", "]", ",", ";"):
+        value = value.replace(char, "\\" + char)
+    return value
+
+
+def subtitles_filter(ass_path: str, fonts_dir: Optional[str] = None) -> str:
+    """``-vf`` argument that burns ``ass_path`` in with libass."""
+
+    description = f"subtitles=filename={escape_filter_value(ass_path)}"
+    if fonts_dir:
+        description += f":fontsdir={escape_filter_value(fonts_dir)}"
+    return description
@@ -0,0 +1,68 @@
+import numpy as np
+
+from compositing import Sprite, blend_sprite, div255, solid_layer
+
+
+def test_div255_rounds_every_product_of_two_bytes():
+    values = np.arange(255 * 255 + 1, dtype=np.uint32)
+
+    expected = np.floor(values / 255.0 + 0.5).astype(np.uint32)
+    np.testing.assert_array_equal(div255(values), expected)
+
+
+def test_div255_keeps_uint16_inputs_in_range():
+    values = np.array([0, 127, 128, 255 * 255], dtype=np.uint16)
+
+    result = div255(values)
+
+    assert result.dtype == np.uint16
+    assert result.tolist() == [0, 0, 1, 255]
+
+
+def reference_blend(frame, colour, alpha):
+    return np.round(frame * (1.0 - alpha / 255.0) + np.asarray(colour) * (alpha / 255.0))
+
+
+def test_blend_sprite_matches_float_over_within_rounding():
+    rng = np.random.default_rng(7)
+    frame = rng.integers(0, 256, (8, 8, 3), dtype=np.uint8)
+    coverage = rng.integers(0, 256, (8, 8), dtype=np.uint8)
+    colour = (30, 200, 90)
+    expected = reference_blend(frame.astype(np.float64), colour, coverage[..., None].astype(np.float64))
+
+    result = blend_sprite(frame, Sprite(0, 0, solid_layer(colour, coverage)))
+
+    assert result is frame
+    assert np.abs(result.astype(int) - expected.astype(int)).max() <= 1
+
+
+def test_blend_sprite_opaque_and_transparent_pixels():
+    frame = np.full((2, 2, 3), 77, dtype=np.uint8)
+    coverage = np.array([[255, 0], [0, 255]], dtype=np.uint8)
+
+    blend_sprite(frame, Sprite(0, 0, solid_layer((1, 2, 3), coverage)))
+
+    assert frame[0, 0].tolist() == [1, 2, 3]
+    assert frame[1, 1].tolist() == [1, 2, 3]
+    assert frame[0, 1].tolist() == [77, 77, 77]
+    assert frame[1, 0].tolist() == [77, 77, 77]
+
+
+def test_blend_sprite_clips_to_the_frame():
+    frame = np.zeros((4, 4, 3), dtype=np.uint8)
+    pixels = solid_layer((255, 255, 255), np.full((3, 3), 255, dtype=np.uint8))
+
+    blend_sprite(frame, Sprite(-1, 2, pixels))
+
+    assert np.flatnonzero(frame[..., 0].ravel()).tolist() == [8, 9, 12, 13]
+
+
+def test_blend_sprite_outside_the_frame_or_missing_is_a_no_op():
+    frame = np.full((4, 4, 3), 9, dtype=np.uint8)
+    pixels = solid_layer((255, 0, 0), np.full((2, 2), 255, dtype=np.uint8))
+
+    assert blend_sprite(frame, None) is frame
+    blend_sprite(frame, Sprite(10, 10, pixels))
+    blend_sprite(frame, Sprite(-2, 0, pixels))
+
+    assert np.all(frame == 9)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from frame_ring import FramePipeline, FrameRing
+
+SHAPES = [(4, 6, 3), (2, 3, 3)]
+
+
+def stamp_frame_index(views, frame_index, payload, state, offset):
+    """Compositor handler: fill each output of the slot with the frame's index."""
+
+    for view in views:
+        view[...] = (frame_index + payload + offset) % 256
+
+
+def fail_on_frame(views, frame_index, payload, state):
+    if frame_index == 2:
+        raise ValueError("broken frame")
+
+
+def test_slots_are_disjoint_views_of_one_block():
+    ring = FrameRing(SHAPES, slot_count=3)
+    try:
+        assert ring.slot_bytes == 4 * 6 * 3 + 2 * 3 * 3
+        for slot in range(3):
+            views = ring.views(slot)
+            assert [view.shape for view in views] == SHAPES
+            for output, view in enumerate(views):
+                view[...] = slot * 10 + output
+        for slot in range(3):
+            assert [int(view[0, 0, 0]) for view in ring.views(slot)] == [slot * 10, slot * 10 + 1]
+        assert ring.views(1)[0] is ring.views(1)[0]
+    finally:
+        ring.close()
+
+
+def test_attached_ring_sees_the_owner_frames():
+    ring = FrameRing(SHAPES, slot_count=2)
+    attached = FrameRing.attach(ring.spec)
+    try:
+        ring.views(1)[1][...] = 42
+        assert not attached.owner
+        assert np.all(attached.views(1)[1] == 42)
+        assert np.all(attached.views(0)[1] == 0)
+    finally:
+        attached.close()
+        ring.close()
+
+
+def test_pipeline_delivers_frames_in_order_and_recycles_slots():
+    delivered = []
+
+    def on_frame(views):
+        delivered.append([int(view[0, 0, 0]) for view in views])
+
+    with FramePipeline(
+        SHAPES, 2, stamp_frame_index, (100,), on_frame=on_frame, slot_count=2
+    ) as pipeline:
+        for frame_index in range(12):
+            slot = pipeline.acquire()
+            assert 0 <= slot < 2
+            pipeline.submit(slot, frame_index, payload=1)
+        pipeline.finish()
+        assert sorted(pipeline.free_slots) == [0, 1]
+        assert pipeline.in_flight == 0
+
+    assert delivered == [[index + 101] * 2 for index in range(12)]
+
+
+def test_released_slot_can_be_acquired_again():
+    with FramePipeline(SHAPES, 1, stamp_frame_index, (0,), slot_count=2) as pipeline:
+        slot = pipeline.acquire()
+        pipeline.release(slot)
+        assert pipeline.acquire() == slot
+        pipeline.release(slot)
+
+
+def test_compositor_errors_reach_the_parent():
+    with pytest.raises(RuntimeError, match="broken frame"):
+        with FramePipeline(SHAPES, 1, fail_on_frame, slot_count=2) as pipeline:
+            for frame_index in range(4):
+                pipeline.submit(pipeline.acquire(), frame_index)
+            pipeline.finish()
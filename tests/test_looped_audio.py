@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+import video_overlay_script
+from video_overlay_script import LoopedAudioSource
+
+SAMPLE_RATE = 100
+
+
+@pytest.fixture
+def pcm(monkeypatch):
+    """Serve ``LoopedAudioSource`` a given int16 buffer instead of decoding a file."""
+
+    def install(samples):
+        buffer = np.repeat(np.asarray(samples, dtype=np.int16)[:, None], 2, axis=1)
+        monkeypatch.setattr(video_overlay_script, "decode_pcm_buffer", lambda *args: buffer)
+        return buffer
+
+    return install
+
+
+def test_hard_loop_repeats_the_buffer(pcm):
+    buffer = pcm(np.arange(50) * 100)
+    source = LoopedAudioSource("music.wav", crossfade=0.0, sample_rate=SAMPLE_RATE)
+
+    frames = source.read(np.arange(120), volume=2.0)
+
+    assert source.period == 50
+    assert frames.shape == (120, 2)
+    expected = buffer[np.arange(120) % 50].astype(np.float32) * (2.0 / 32768.0)
+    np.testing.assert_allclose(frames, expected)
+
+
+def test_first_pass_is_not_faded(pcm):
+    buffer = pcm(np.arange(100) * 10)
+    source = LoopedAudioSource("music.wav", crossfade=0.1, sample_rate=SAMPLE_RATE)
+
+    frames = source.read(np.arange(source.period))
+
+    assert source.crossfade_samples == 10
+    assert source.period == 90
+    np.testing.assert_allclose(frames, buffer[:90] / 32768.0)
+
+
+def test_later_passes_fade_the_head_in_over_the_tail(pcm):
+    buffer = pcm(np.arange(100) * 10)
+    source = LoopedAudioSource("music.wav", crossfade=0.1, sample_rate=SAMPLE_RATE)
+    fade = source.crossfade_samples
+
+    for loop in (1, 3):
+        start = loop * source.period
+        frames = source.read(np.arange(start, start + fade))[:, 0] * 32768.0
+        angle = (np.arange(fade) + 0.5) * (np.pi / 2 / fade)
+        head = buffer[:fade, 0].astype(np.float64)
+        tail = buffer[source.period : source.period + fade, 0].astype(np.float64)
+        np.testing.assert_allclose(frames, head * np.sin(angle) + tail * np.cos(angle), rtol=1e-5)
+        # Past the fade the plain head plays again
+        after = source.read(np.array([start + fade]))[0, 0] * 32768.0
+        assert after == pytest.approx(buffer[fade, 0])
+
+
+def test_crossfade_keeps_equal_power_and_a_smooth_join(pcm):
+    pcm(np.full(100, 1000))
+    source = LoopedAudioSource("music.wav", crossfade=0.2, sample_rate=SAMPLE_RATE)
+    fade = source.crossfade_samples
+
+    frames = source.read(np.arange(source.period, source.period + fade))[:, 0] * 32768.0
+    angle = (np.arange(fade) + 0.5) * (np.pi / 2 / fade)
+
+    # Equal power: the two gains' squares sum to one, so uncorrelated material keeps its level
+    np.testing.assert_allclose(np.sin(angle) ** 2 + np.cos(angle) ** 2, 1.0)
+    # The join starts from the tail, where the previous pass left off
+    assert frames[0] == pytest.approx(1000 * (np.sin(angle[0]) + np.cos(angle[0])))
+    assert abs(frames[0] - 1000) < 1000 * 0.1
+
+
+def test_crossfade_is_limited_to_half_the_buffer(pcm):
+    pcm(np.zeros(40))
+    source = LoopedAudioSource("music.wav", crossfade=5.0, sample_rate=SAMPLE_RATE)
+
+    assert source.crossfade_samples == 20
+    assert source.period == 20
+
+
+def test_negative_indices_read_the_first_sample(pcm):
+    buffer = pcm(np.arange(1, 31))
+    source = LoopedAudioSource("music.wav", sample_rate=SAMPLE_RATE)
+
+    frames = source.read(np.array([-5, -1, 0]))
+
+    np.testing.assert_allclose(frames[:, 0], buffer[0, 0] / 32768.0)
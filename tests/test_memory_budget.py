@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from memory_budget import MB, MemoryGate
+
+WAIT_SECONDS = 5.0
+
+
+def test_reserve_without_limit_never_waits():
+    gate = MemoryGate(None)
+
+    with gate.reserve(10 * MB):
+        with gate.reserve(10_000 * MB):
+            assert gate.reserved == 10_010 * MB
+    assert gate.reserved == 0
+
+
+def test_reservations_that_fit_run_together():
+    gate = MemoryGate(100 * MB)
+
+    with gate.reserve(60 * MB), gate.reserve(40 * MB):
+        assert gate.reserved == 100 * MB
+    assert gate.reserved == 0
+
+
+def test_a_job_alone_runs_even_above_the_limit():
+    gate = MemoryGate(100 * MB)
+
+    with gate.reserve(500 * MB):
+        assert gate.reserved == 500 * MB
+
+
+def test_reserve_waits_until_room_is_released():
+    gate = MemoryGate(100 * MB)
+    waiting = threading.Event()
+    admitted = threading.Event()
+    wait_calls = []
+
+    def second_job():
+        def on_wait():
+            wait_calls.append(True)
+            waiting.set()
+
+        with gate.reserve(50 * MB, on_wait=on_wait):
+            admitted.set()
+
+    with gate.reserve(70 * MB):
+        worker = threading.Thread(target=second_job)
+        worker.start()
+        assert waiting.wait(WAIT_SECONDS)
+        assert not admitted.is_set()
+    worker.join(WAIT_SECONDS)
+
+    assert admitted.is_set()
+    assert wait_calls == [True]
+    assert gate.reserved == 0
+
+
+def test_reservation_is_returned_when_the_job_fails():
+    gate = MemoryGate(100 * MB)
+
+    with pytest.raises(RuntimeError):
+        with gate.reserve(80 * MB):
+            raise RuntimeError("render failed")
+
+    assert gate.reserved == 0
+    with gate.reserve(90 * MB):
+        assert gate.reserved == 90 * MB
+
+
+def test_negative_estimates_reserve_nothing():
+    gate = MemoryGate(100 * MB)
+
+    with gate.reserve(-5 * MB):
+        assert gate.reserved == 0
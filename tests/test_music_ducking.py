@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from video_overlay_script import MusicDucking, ducking_gain_curve, speech_mask_from_transcript
+
+FRAME = 0.25
+
+
+def words(*spans):
+    return [
+        {"word": f"w{index}", "start_time": start, "end_time": end}
+        for index, (start, end) in enumerate(spans)
+    ]
+
+
+def test_speech_mask_marks_frames_covered_by_words():
+    mask = speech_mask_from_transcript(words((0.25, 0.75), (2.0, 2.5)), 3.0, FRAME)
+
+    assert mask.dtype == bool
+    assert np.flatnonzero(mask).tolist() == [1, 2, 8, 9]
+
+
+def test_speech_mask_rounds_partial_frames_outwards():
+    mask = speech_mask_from_transcript(words((0.3, 0.6)), 1.0, FRAME)
+
+    assert np.flatnonzero(mask).tolist() == [1, 2]
+
+
+def test_speech_mask_merges_overlapping_words_and_clips_to_duration():
+    mask = speech_mask_from_transcript(words((0.0, 0.5), (0.25, 1.0), (1.5, 9.0)), 2.0, FRAME)
+
+    assert len(mask) == 8
+    assert np.flatnonzero(mask).tolist() == [0, 1, 2, 3, 6, 7]
+
+
+def test_speech_mask_without_words_is_silent():
+    mask = speech_mask_from_transcript([], 1.1, FRAME)
+
+    assert len(mask) == 5
+    assert not mask.any()
+
+
+def test_gain_curve_without_speech_leaves_music_alone():
+    curve = ducking_gain_curve(np.zeros(12, dtype=bool), MusicDucking(enabled=True), FRAME)
+
+    assert curve.dtype == np.float32
+    assert np.all(curve == 1.0)
+
+
+def test_gain_curve_ramps_down_before_and_up_after_speech():
+    speech = np.zeros(30, dtype=bool)
+    speech[10:13] = True
+    ducking = MusicDucking(enabled=True, gain=0.25, attack=0.2, release=0.4)
+
+    curve = ducking_gain_curve(speech, ducking, frame_seconds=0.1)
+
+    assert curve[10:13] == pytest.approx(0.25)
+    # Attack: 2 frames of look-ahead, so the dip starts one frame early
+    assert curve[8] == pytest.approx(1.0)
+    assert curve[9] == pytest.approx(0.625)
+    # Release: 4 frames back up to full level
+    assert curve[13:17] == pytest.approx([0.4375, 0.625, 0.8125, 1.0])
+    assert curve[:8] == pytest.approx(1.0)
+    assert curve[17:] == pytest.approx(1.0)
+
+
+def test_gain_curve_stays_down_between_close_words():
+    speech = np.zeros(20, dtype=bool)
+    speech[5] = True
+    speech[7] = True
+    ducking = MusicDucking(enabled=True, gain=0.5, attack=0.3, release=0.3)
+
+    curve = ducking_gain_curve(speech, ducking, frame_seconds=0.1)
+
+    assert curve[6] < 1.0
+    assert curve.min() == pytest.approx(0.5)
+
+
+def test_ducking_is_opt_in():
+    assert MusicDucking().enabled is False
@@ -0,0 +1,55 @@
+import numpy as np
+
+from video_overlay_script import composite_output_frame, composite_ring_frame
+
+OUTPUT = {"aspect_ratio": 1.0, "size": (8, 8), "design": None}
+SPEC = {
+    "outputs": [OUTPUT],
+    "fps": 25.0,
+    "transcript": [],
+    "highlight_ranges": [],
+    "subtitle_segments": None,
+    "custom_subtitles": None,
+}
+
+
+def overlay_frame(seed, height=6, width=4):
+    return np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def expected_frame(overlay, clip_path, source_frame):
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    output = dict(OUTPUT, overlays={}, layout_cache={})
+    composite_output_frame(
+        frame, output, (clip_path, source_frame, overlay, False), 0.0, [], [], None, None
+    )
+    return frame
+
+
+def ring_slot(overlay):
+    """A slot with one 8x8 output and a 10x10 overlay frame holding ``overlay``."""
+
+    views = [np.zeros((8, 8, 3), dtype=np.uint8), np.full((10, 10, 3), 99, dtype=np.uint8)]
+    views[1][: overlay.shape[0], : overlay.shape[1]] = overlay
+    return views
+
+
+def test_overlay_is_read_from_the_slot():
+    overlay = overlay_frame(1)
+    views = ring_slot(overlay)
+
+    composite_ring_frame(views, 0, ("a.mp4", 3, 1, 6, 4), {}, SPEC)
+
+    np.testing.assert_array_equal(views[0], expected_frame(overlay, "a.mp4", 3))
+
+
+def test_compositor_keeps_only_the_current_clip_scaled():
+    state = {}
+    first, second = overlay_frame(1), overlay_frame(2, height=4, width=6)
+
+    composite_ring_frame(ring_slot(first), 0, ("a.mp4", 0, 1, 6, 4), state, SPEC)
+    views = ring_slot(second)
+    composite_ring_frame(views, 1, ("b.mp4", 0, 1, 4, 6), state, SPEC)
+
+    assert list(state["outputs"][0]["overlays"]) == ["b.mp4"]
+    np.testing.assert_array_equal(views[0], expected_frame(second, "b.mp4", 0))
@@ -0,0 +1,85 @@
+import pytest
+
+from subtitle_export import (
+    ASS_BORDER_BOX,
+    AssStyle,
+    SubtitleEvent,
+    ass_line_text,
+    escape_ass_text,
+    format_ass_timestamp,
+    write_ass,
+    write_srt,
+)
+
+
+@pytest.mark.parametrize(
+    "seconds, expected",
+    [
+        (0.0, "0:00:00.00"),
+        (1.234, "0:00:01.23"),
+        (59.996, "0:01:00.00"),
+        (3661.237, "1:01:01.24"),
+        (36000.0, "10:00:00.00"),
+        (-2.0, "0:00:00.00"),
+    ],
+)
+def test_format_ass_timestamp(seconds, expected):
+    assert format_ass_timestamp(seconds) == expected
+
+
+def test_escape_ass_text_keeps_override_syntax_literal():
+    assert escape_ass_text("{\\b1}bold") == "\\{\\b1\\}bold"
+    # A word joiner after the backslash stops \N and \h acting as line break and hard space
+    assert escape_ass_text("a\\Nb \\h c") == "a\\\u2060Nb \\\u2060h c"
+    assert escape_ass_text("two\nlines") == "two lines"
+    assert escape_ass_text("plain \\ path") == "plain \\ path"
+
+
+def test_highlighted_words_get_inline_colour_overrides():
+    style = AssStyle(
+        primary_colour=(255, 255, 255),
+        outline_colour=(0, 0, 0),
+        border_style=ASS_BORDER_BOX,
+        highlight_text_colour=(0, 255, 255),
+        highlight_box_colour=(0, 0, 255),
+    )
+
+    text = ass_line_text("say {this} now", [False, True, False], style)
+
+    assert text == "say {\\c&H00FFFF&\\3c&H0000FF&}\\{this\\}{\\r} now"
+
+
+def test_highlight_overrides_are_skipped_when_colours_match():
+    style = AssStyle(highlight_text_colour=(255, 255, 255), highlight_box_colour=(0, 0, 0))
+
+    assert ass_line_text("no change", [True, True], style) == "no change"
+
+
+def test_outline_styles_only_recolour_highlighted_text():
+    style = AssStyle(highlight_text_colour=(10, 20, 30), highlight_box_colour=(0, 0, 255))
+
+    assert ass_line_text("hi", [True], style) == "{\\c&H0A141E&}hi{\\r}"
+
+
+def test_subtitle_files_carry_highlights_only_in_ass(tmp_path):
+    style = AssStyle(highlight_text_colour=(0, 0, 255))
+    events = [
+        SubtitleEvent(0.0, 1.5, ["first line", "second"], highlighted=[[False, True], [False]]),
+        SubtitleEvent(1.5, 3.0, ["{x}"]),
+    ]
+    ass_path = tmp_path / "track.ass"
+    srt_path = tmp_path / "track.srt"
+
+    write_ass(str(ass_path), events, style, (720, 1280))
+    write_srt(str(srt_path), events)
+
+    lines = ass_path.read_text(encoding="utf-8").splitlines()
+    dialogues = [line for line in lines if line.startswith("Dialogue")]
+    assert dialogues == [
+        "Dialogue: 0,0:00:00.00,0:00:01.50,Default,,0,0,0,,first {\\c&H0000FF&}line{\\r}\\Nsecond",
+        "Dialogue: 0,0:00:01.50,0:00:03.00,Default,,0,0,0,,\\{x\\}",
+    ]
+    assert srt_path.read_text(encoding="utf-8") == (
+        "1\n00:00:00,000 --> 00:00:01,500\nfirst line\nsecond\n\n"
+        "2\n00:00:01,500 --> 00:00:03,000\n{x}\n\n"
+    )
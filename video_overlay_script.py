@@ -1,15 +1,39 @@
 from __future__ import annotations
 
 import argparse
+import bisect
+import hashlib
 import json
 import math
 import os
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Sequence, Tuple
+import shutil
+import struct
+import subprocess
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from typing import IO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
 import cv2
 import numpy as np
 
+from compositing import Sprite, blend_sprite, crop_to_content, over, rounded_rect_mask, solid_layer
+from frame_ring import SLOTS_PER_WORKER, FramePipeline
+from memory_budget import MB, MemoryTracker, budget_from_env
+from subtitle_export import (
+    ASS_BORDER_BOX,
+    ASS_BORDER_OUTLINE,
+    AssStyle,
+    SubtitleEvent,
+    subtitles_filter,
+    write_ass,
+    write_srt,
+)
+from render_profiler import PROFILE_MODES, profile_call
+from render_progress import RenderProgress
+
 # Add local FFmpeg to the system PATH for all subprocess calls
 ffmpeg_bin_path = os.path.join(os.path.dirname(__file__), "ffmpeg", "bin")
 if os.path.isdir(ffmpeg_bin_path):
@@ -36,7 +60,67 @@ try:
 except ImportError:
     HAVE_PIL = False
 
-PIL_FONT_CACHE: Dict[Tuple[str, int], "ImageFont.FreeTypeFont"] = {}
+CACHE_DIR = os.environ.get("VIDEO_OVERLAY_CACHE_DIR", ".cache")
+SEEK_FRIENDLY_MAX_GOP_SECONDS = 1.0  # Longer keyframe intervals make overlay seeks costly
+
+
+class BoundedCache(OrderedDict):
+    """Dict that forgets its least recently used entry beyond ``max_entries``.
+
+    Batch workers live for many jobs, so the module level caches must not
+    keep every video, model and font they have ever seen.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+
+    def __getitem__(self, key: object) -> object:
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def get(self, key: object, default: object = None) -> object:
+        return self[key] if key in self else default
+
+    def __setitem__(self, key: object, value: object) -> None:
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.max_entries:
+            self.popitem(last=False)
+
+
+PIL_FONT_CACHE: Dict[Tuple[str, int], "ImageFont.FreeTypeFont"] = BoundedCache(32)
+WHISPER_MODEL_CACHE: Dict[str, object] = BoundedCache(1)  # A model holds up to a few GB
+TRANSCRIPT_CACHE: Dict[
+    Tuple[str, int, int, Optional[str], str], List[Dict[str, float]]
+] = BoundedCache(64)
+WHISPER_SAMPLE_RATE = 16000  # whisper.load_audio resamples to this
+WHISPER_WINDOW_SECONDS = 30.0  # One decoding window per incremental pass
+WHISPER_MIN_ADVANCE_SECONDS = 5.0  # Keep a window's last segment rather than advance less
+WHISPER_PROMPT_CHARS = 200  # Previous text carried into the next window
+TEXT_MEASURER_CACHE: Dict[Tuple[object, ...], "TextMeasurer"] = BoundedCache(32)
+MEDIA_METADATA_CACHE: Dict[Tuple[str, int, int], "MediaMetadata"] = BoundedCache(256)
+# An index keeps one timestamp per frame, about 1 MB per 15 minutes of 30 fps video
+KEYFRAME_INDEX_CACHE: Dict[Tuple[str, int, int], Optional[Dict[str, object]]] = BoundedCache(16)
+FFMPEG_FILTER_CACHE: Dict[str, bool] = {}
+
+
+def clear_render_caches() -> None:
+    """Forget the in-memory fonts, transcripts, probes and indexes of earlier renders.
+
+    The Whisper model and ffmpeg capability caches are kept; they do not
+    depend on the inputs. Caches persisted under ``CACHE_DIR`` are untouched.
+    """
+
+    for cache in (
+        PIL_FONT_CACHE,
+        TRANSCRIPT_CACHE,
+        TEXT_MEASURER_CACHE,
+        MEDIA_METADATA_CACHE,
+        KEYFRAME_INDEX_CACHE,
+    ):
+        cache.clear()
 
 
 # --------------------------------------------------------------------------- #
@@ -87,6 +171,7 @@ class HighlightAssignment:
     occurrence: int = 1  # When the phrase appears multiple times, which one to use
     start_word: Optional[int] = None  # Manual override for the first word index
     end_word: Optional[int] = None  # Manual override for the last word index
+    fit_to_segment: bool = False  # Speed the clip up/down so it spans the segment exactly
 
 
 @dataclass
@@ -100,6 +185,26 @@ class SubtitleSentence:
     end_word: Optional[int] = None  # Manual override for the last word index
 
 
+@dataclass
+class MusicDucking:
+    """Automatic lowering of the global music bed while someone is speaking."""
+
+    enabled: bool = False  # Opt in, so existing projects keep their mix
+    gain: float = 0.3  # Music gain under speech (0.3 is about -10 dB)
+    attack: float = 0.08  # Seconds the music takes to dip before speech starts
+    release: float = 0.5  # Seconds the music takes to recover after speech ends
+    source: str = "auto"  # "audio" (main audio level), "transcript" (word times) or "auto"
+
+
+@dataclass
+class OutputVariant:
+    """An extra deliverable rendered from the same decode as the main output."""
+
+    aspect_ratio: str = "4:5"  # "W:H" such as "9:16" or "1:1" (a plain number also works)
+    output_path: str = ""  # Defaults to the main output path with the ratio appended
+    subtitle_design: Optional[SubtitleDesign] = None  # Defaults to the project's design
+
+
 @dataclass
 class ProjectConfig:
     """All inputs required to render a project."""
@@ -115,6 +220,83 @@ class ProjectConfig:
     subtitle_design: SubtitleDesign = field(default_factory=SubtitleDesign)
     subtitle_segments: Optional[List[Tuple[int, int]]] = None
     subtitle_sentences: List[SubtitleSentence] = field(default_factory=list)
+    decode_backend: str = "opencv"  # "opencv" or "ffmpeg" (crop/scale inside the decoder)
+    music_ducking: MusicDucking = field(default_factory=MusicDucking)
+    music_loop_crossfade: float = 0.0  # Seconds blended where looped music wraps (0: hard cut)
+    aspect_ratio: str = "4:5"  # Crop of the main output
+    extra_outputs: List[OutputVariant] = field(default_factory=list)  # Other crops, same pass
+    render_workers: int = 1  # Compositor processes (frames shared through frame_ring)
+    subtitle_renderer: str = "python"  # "python" (pixel-exact) or "ass" (libass burn-in by ffmpeg)
+    subtitle_sidecars: List[str] = field(default_factory=list)  # "srt"/"ass" files next to outputs
+    stream_output: bool = False  # Fragmented MP4 that plays while the render is still running
+    memory_budget_mb: Optional[float] = None  # Above this estimate, use bounded-memory paths
+
+
+@dataclass
+class RenderCheckpoint:
+    """Settings for a render that is encoded in independently finalised segments."""
+
+    segment_dir: str  # Where finished segments are kept until the final concat
+    segment_frames: int = 300  # Output frames per segment
+    completed_segments: int = 0  # Segments finalised by an earlier, interrupted run
+    # Called as on_segment(index, path, first_frame, frame_count) once a segment is durable.
+    on_segment: Optional[Callable[[int, str, int, int], None]] = None
+
+
+@dataclass
+class StreamingEncode:
+    """Settings for outputs encoded to fragmented MP4 while they are rendered."""
+
+    audio_path: Optional[str] = None  # Pre-mixed soundtrack muxed in alongside the frames
+    video_filters: List[Optional[str]] = field(default_factory=list)  # ffmpeg -vf per output
+    fragment_seconds: float = 1.0  # Keyframe (and so fragment) interval
+    encoder_args: List[str] = field(default_factory=list)  # Extra libx264 options
+
+
+@dataclass
+class AudioStreamInfo:
+    """One audio stream reported by ffprobe."""
+
+    index: int
+    codec: Optional[str] = None
+    sample_rate: int = 0
+    channels: int = 0
+    duration: float = 0.0
+
+
+@dataclass
+class MediaMetadata:
+    """Container and stream facts about a media file."""
+
+    path: str
+    duration: float = 0.0  # Seconds
+    fps: float = 0.0
+    frame_count: int = 0
+    width: int = 0  # Coded size; see ``display_size`` for rotated files
+    height: int = 0
+    rotation: int = 0  # Clockwise display rotation in degrees (0/90/180/270)
+    video_codec: Optional[str] = None
+    pixel_format: Optional[str] = None
+    gop_size: Optional[int] = None  # Longest keyframe interval (frames) near the start
+    format_name: Optional[str] = None
+    bit_rate: int = 0
+    size: int = 0  # Bytes
+    audio_streams: List[AudioStreamInfo] = field(default_factory=list)
+    source: str = "ffprobe"  # "ffprobe" or "opencv" when ffprobe is unavailable
+
+    @property
+    def has_video(self) -> bool:
+        return self.width > 0 and self.height > 0
+
+    @property
+    def has_audio(self) -> bool:
+        return bool(self.audio_streams)
+
+    @property
+    def display_size(self) -> Tuple[int, int]:
+        if self.rotation in (90, 270):
+            return self.height, self.width
+        return self.width, self.height
 
 
 # --------------------------------------------------------------------------- #
@@ -128,21 +310,255 @@ def normalise_word(token: str) -> str:
     return "".join(ch for ch in token.lower() if ch.isalnum())
 
 
-def probe_video_metadata(path: str) -> Tuple[float, int, int, int, float]:
-    """Return fps, frame_count, width, height, duration for ``path``."""
+def file_cache_key(path: str) -> Tuple[str, int, int]:
+    """Return an (absolute path, size, mtime) key that changes when ``path`` does."""
+
+    stat = os.stat(path)
+    return os.path.abspath(path), int(stat.st_size), int(stat.st_mtime_ns)
+
+
+# --------------------------------------------------------------------------- #
+# Media metadata
+# --------------------------------------------------------------------------- #
+
+
+MEDIA_METADATA_VERSION = 1  # Bump when MediaMetadata gains fields so disk entries refresh
+GOP_PROBE_SECONDS = 10.0  # Only the start of the file is scanned to estimate GOP size
+
+
+def find_ffprobe() -> Optional[str]:
+    """Return the ffprobe executable, or ``None`` when it is not installed."""
+
+    return shutil.which("ffprobe")
+
+
+def run_ffprobe_json(args: Sequence[str]) -> Optional[Dict[str, object]]:
+    """Run ffprobe with JSON output and return the parsed result (``None`` on failure)."""
+
+    ffprobe = find_ffprobe()
+    if ffprobe is None:
+        return None
+    try:
+        completed = subprocess.run(
+            [ffprobe, "-v", "error", "-of", "json", *args],
+            capture_output=True,
+            check=True,
+        )
+        return json.loads(completed.stdout.decode("utf-8") or "{}")
+    except (OSError, subprocess.CalledProcessError, ValueError) as exc:
+        print(f"[warn] ffprobe failed for {args[-1] if args else ''} ({exc}).")
+        return None
+
+
+def disk_cache_path(namespace: str, cache_key: Tuple[object, ...]) -> str:
+    """Return the JSON file under ``CACHE_DIR`` that stores ``cache_key``."""
+
+    digest = hashlib.sha1(repr(cache_key).encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, namespace, f"{digest}.json")
+
+
+def parse_frame_rate(value: object) -> float:
+    """Parse an ffprobe rate such as ``"30000/1001"`` (0.0 when unknown)."""
+
+    try:
+        text = str(value)
+        if "/" in text:
+            numerator, denominator = text.split("/", 1)
+            return float(numerator) / float(denominator) if float(denominator) else 0.0
+        return float(text)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_rotation(stream: Dict[str, object]) -> int:
+    """Return the clockwise display rotation stored in a video stream's metadata."""
+
+    rotation = 0.0
+    try:
+        rotation = float(stream.get("tags", {}).get("rotate", 0))
+    except (TypeError, ValueError):
+        pass
+    for side_data in stream.get("side_data_list", []) or []:
+        if "rotation" in side_data:
+            try:
+                # Display matrices store counter-clockwise rotation.
+                rotation = -float(side_data["rotation"])
+            except (TypeError, ValueError):
+                pass
+    return int(round(rotation / 90.0)) * 90 % 360
+
+
+def probe_gop_size(path: str) -> Optional[int]:
+    """Estimate the keyframe interval from the first ``GOP_PROBE_SECONDS`` of video."""
+
+    probe = run_ffprobe_json(
+        [
+            "-select_streams",
+            "v:0",
+            "-read_intervals",
+            f"%+{GOP_PROBE_SECONDS:g}",
+            "-show_entries",
+            "packet=flags",
+            path,
+        ]
+    )
+    if probe is None:
+        return None
+    packets = probe.get("packets", [])
+    keyframes = [
+        idx for idx, packet in enumerate(packets) if "K" in str(packet.get("flags", ""))
+    ]
+    if len(keyframes) < 2:
+        # One GOP covers the whole probed window, so it is at least that long.
+        return len(packets) or None
+    return max(end - start for start, end in zip(keyframes, keyframes[1:]))
+
+
+def ffprobe_media_metadata(path: str) -> Optional[MediaMetadata]:
+    """Read container and stream information with ffprobe (``None`` if unavailable)."""
+
+    probe = run_ffprobe_json(["-show_format", "-show_streams", path])
+    if probe is None:
+        return None
+
+    container = probe.get("format", {}) or {}
+    metadata = MediaMetadata(
+        path=os.path.abspath(path),
+        format_name=container.get("format_name"),
+        bit_rate=int(float(container.get("bit_rate") or 0)),
+        size=int(float(container.get("size") or 0)) or os.path.getsize(path),
+    )
+    try:
+        metadata.duration = float(container.get("duration") or 0.0)
+    except (TypeError, ValueError):
+        metadata.duration = 0.0
+
+    video_stream: Optional[Dict[str, object]] = None
+    for stream in probe.get("streams", []):
+        codec_type = stream.get("codec_type")
+        if codec_type == "video" and video_stream is None:
+            if (stream.get("disposition") or {}).get("attached_pic"):
+                continue  # Cover art in audio files is not a video track
+            video_stream = stream
+        elif codec_type == "audio":
+            metadata.audio_streams.append(
+                AudioStreamInfo(
+                    index=int(stream.get("index", len(metadata.audio_streams))),
+                    codec=stream.get("codec_name"),
+                    sample_rate=int(float(stream.get("sample_rate") or 0)),
+                    channels=int(stream.get("channels") or 0),
+                    duration=float(stream.get("duration") or 0.0),
+                )
+            )
+
+    if video_stream is not None:
+        metadata.width = int(video_stream.get("width") or 0)
+        metadata.height = int(video_stream.get("height") or 0)
+        metadata.video_codec = video_stream.get("codec_name")
+        metadata.pixel_format = video_stream.get("pix_fmt")
+        metadata.rotation = parse_rotation(video_stream)
+        real_rate = parse_frame_rate(video_stream.get("r_frame_rate"))
+        average_rate = parse_frame_rate(video_stream.get("avg_frame_rate"))
+        # r_frame_rate is the nominal rate; VFR files can report a timebase-sized
+        # value there, in which case the average is the better estimate.
+        if real_rate <= 0 or (average_rate > 0 and real_rate > 2 * average_rate):
+            real_rate = average_rate
+        metadata.fps = real_rate
+        stream_duration = float(video_stream.get("duration") or 0.0)
+        if stream_duration > 0:
+            metadata.duration = metadata.duration or stream_duration
+        nb_frames = int(video_stream.get("nb_frames") or 0)
+        if nb_frames <= 0 and metadata.fps > 0:
+            nb_frames = int(round((stream_duration or metadata.duration) * metadata.fps))
+        metadata.frame_count = nb_frames
+        metadata.gop_size = probe_gop_size(path)
+    elif metadata.duration <= 0 and metadata.audio_streams:
+        metadata.duration = max(stream.duration for stream in metadata.audio_streams)
+
+    return metadata
+
+
+def opencv_media_metadata(path: str) -> MediaMetadata:
+    """Fallback probe through OpenCV (video only; frame count is an estimate)."""
 
     cap = cv2.VideoCapture(path)
     if not cap.isOpened():
         raise IOError(f"Cannot open video file: {path}")
-    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
     frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
     cap.release()
-    if fps <= 0:
-        fps = 25.0
-    duration = frame_count / fps if frame_count else 0.0
-    return fps, frame_count, width, height, duration
+    return MediaMetadata(
+        path=os.path.abspath(path),
+        duration=frame_count / fps if frame_count and fps > 0 else 0.0,
+        fps=fps,
+        frame_count=frame_count,
+        width=width,
+        height=height,
+        size=os.path.getsize(path),
+        source="opencv",
+    )
+
+
+def media_metadata_from_dict(data: Dict[str, object]) -> MediaMetadata:
+    """Rebuild ``MediaMetadata`` from its JSON form."""
+
+    values = dict(data)
+    values["audio_streams"] = [
+        AudioStreamInfo(**stream) for stream in values.get("audio_streams", [])
+    ]
+    return MediaMetadata(**values)
+
+
+def get_media_metadata(path: str) -> MediaMetadata:
+    """Return metadata for ``path``, probing it at most once per file version.
+
+    Results are memoised by (path, size, mtime) in memory and, for ffprobe
+    results, in ``CACHE_DIR/metadata`` so restarts and other worker processes
+    reuse them.
+    """
+
+    cache_key = file_cache_key(path)
+    metadata = MEDIA_METADATA_CACHE.get(cache_key)
+    if metadata is not None:
+        return metadata
+
+    cache_path = disk_cache_path("metadata", (MEDIA_METADATA_VERSION, *cache_key))
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as file:
+                metadata = media_metadata_from_dict(json.load(file))
+        except (OSError, TypeError, ValueError):
+            metadata = None
+    if metadata is None:
+        metadata = ffprobe_media_metadata(path)
+        if metadata is not None:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as file:
+                json.dump(asdict(metadata), file)
+        else:
+            metadata = opencv_media_metadata(path)
+
+    MEDIA_METADATA_CACHE[cache_key] = metadata
+    return metadata
+
+
+def has_main_audio(path: str) -> bool:
+    """Return False only when ffprobe reports that ``path`` has no audio track."""
+
+    metadata = get_media_metadata(path)
+    return metadata.has_audio or metadata.source != "ffprobe"
+
+
+def probe_video_metadata(path: str) -> Tuple[float, int, int, int, float]:
+    """Return fps, frame_count, width, height, duration for ``path``."""
+
+    metadata = get_media_metadata(path)
+    fps = metadata.fps if metadata.fps > 0 else 25.0
+    # Video-track duration, so a longer audio track does not stretch the timeline.
+    duration = metadata.frame_count / fps if metadata.frame_count else metadata.duration
+    return fps, metadata.frame_count, metadata.width, metadata.height, duration
 
 
 # --------------------------------------------------------------------------- #
@@ -181,17 +597,34 @@ def transcribe_audio_whisper(
 ) -> List[Dict[str, float]]:
     """Transcribe an audio or video file using Whisper (word level timestamps)."""
 
+    model = load_whisper_model(model_size)
+    result = model.transcribe(audio_path, word_timestamps=True)
+    save_the_transcribe_text(result['text'], audio_path)
+    return whisper_segment_words(result.get("segments", []))
+
+
+def load_whisper_model(model_size: str):
+    """Return the Whisper model ``model_size``, loading it once per process."""
+
     if not HAVE_WHISPER:
         raise ImportError(
             "Whisper is not installed. Please install openai-whisper to transcribe automatically."
         )
 
-    model = whisper.load_model(model_size)
-    result = model.transcribe(audio_path, word_timestamps=True)
-    transcript: List[Dict[str, float]] = []
-    save_the_transcribe_text(result['text'], audio_path)
+    model = WHISPER_MODEL_CACHE.get(model_size)
+    if model is None:
+        model = whisper.load_model(model_size)
+        WHISPER_MODEL_CACHE[model_size] = model
+    return model
+
+
+def whisper_segment_words(
+    segments: Sequence[Dict[str, object]], offset: float = 0.0
+) -> List[Dict[str, float]]:
+    """Flatten the word timestamps of Whisper ``segments``, shifted by ``offset`` seconds."""
 
-    for segment in result.get("segments", []):
+    transcript: List[Dict[str, float]] = []
+    for segment in segments:
         for word_data in segment.get("words", []):
             word = word_data.get("word", "").strip()
             if not word:
@@ -199,13 +632,59 @@ def transcribe_audio_whisper(
             transcript.append(
                 {
                     "word": word,
-                    "start_time": float(word_data["start"]),
-                    "end_time": float(word_data["end"]),
+                    "start_time": float(word_data["start"]) + offset,
+                    "end_time": float(word_data["end"]) + offset,
                 }
             )
     return transcript
 
 
+def iter_whisper_transcript(
+    audio_path: str, model_size: str = "base"
+) -> Iterator[Tuple[List[Dict[str, float]], float, float, str]]:
+    """Transcribe ``audio_path`` one Whisper window at a time.
+
+    Yields ``(words, transcribed_seconds, duration, text)`` after each window,
+    so callers can show the opening of a long file while the rest is still
+    being transcribed. Every window but the last drops its final segment,
+    which may stop mid-word, and the next window starts where that segment
+    did. The language detected in the first window and the tail of the text
+    so far carry over, as in Whisper's own sliding window.
+    """
+
+    model = load_whisper_model(model_size)
+    audio = whisper.load_audio(audio_path)
+    duration = len(audio) / WHISPER_SAMPLE_RATE
+    window = int(WHISPER_WINDOW_SECONDS * WHISPER_SAMPLE_RATE)
+    position = 0
+    language: Optional[str] = None
+    prompt = ""
+    while position < len(audio):
+        offset = position / WHISPER_SAMPLE_RATE
+        final = position + window >= len(audio)
+        result = model.transcribe(
+            audio[position:position + window],
+            word_timestamps=True,
+            language=language,
+            initial_prompt=prompt or None,
+        )
+        language = language or result.get("language")
+        segments = list(result.get("segments", []))
+        advance = WHISPER_WINDOW_SECONDS
+        if not final and len(segments) > 1 and segments[-1]["start"] >= WHISPER_MIN_ADVANCE_SECONDS:
+            advance = float(segments[-1]["start"])
+            segments = segments[:-1]
+        text = "".join(segment.get("text", "") for segment in segments)
+        prompt = (prompt + text)[-WHISPER_PROMPT_CHARS:]
+        position += int(advance * WHISPER_SAMPLE_RATE)
+        yield (
+            whisper_segment_words(segments, offset),
+            min(duration, position / WHISPER_SAMPLE_RATE),
+            duration,
+            text,
+        )
+
+
 def write_subtitle_into_file(
     input_file_name: str, transcript: List[Dict[str, float]]
 ):
@@ -225,11 +704,18 @@ def build_transcript(
 ) -> List[Dict[str, float]]:
     """Create a per-word transcript using Whisper or a provided text."""
 
+    path, size, mtime = file_cache_key(video_path)
+    cache_key = (path, size, mtime, transcript_text, whisper_model)
+    cached = TRANSCRIPT_CACHE.get(cache_key)
+    if cached is not None:
+        return [dict(entry) for entry in cached]
+
     if transcript_text:
         _, _, _, _, duration = probe_video_metadata(video_path)
         transcript = evenly_spaced_transcript(transcript_text, duration)
         if transcript:
             write_subtitle_into_file(video_path, transcript)
+            TRANSCRIPT_CACHE[cache_key] = [dict(entry) for entry in transcript]
             return transcript
         raise RuntimeError("Failed to generate transcript from provided text.")
 
@@ -237,6 +723,7 @@ def build_transcript(
         transcript = transcribe_audio_whisper(video_path, whisper_model)
         if transcript:
             write_subtitle_into_file(video_path, transcript)
+            TRANSCRIPT_CACHE[cache_key] = [dict(entry) for entry in transcript]
             return transcript
     except Exception as exc:  # noqa: BLE001 - Whisper issues should surface as warnings
         raise RuntimeError(
@@ -246,6 +733,43 @@ def build_transcript(
     raise RuntimeError("Whisper returned an empty transcript; cannot proceed.")
 
 
+def stream_whisper_transcript(
+    video_path: str,
+    whisper_model: str,
+) -> Iterator[Tuple[List[Dict[str, float]], float, float]]:
+    """Whisper transcript of ``video_path`` as ``(new words, transcribed_seconds, duration)``.
+
+    Words arrive a window at a time (see ``iter_whisper_transcript``). The
+    finished transcript is saved and cached like ``build_transcript``'s, so a
+    later render of the same file does not transcribe it again.
+    """
+
+    cache_key = file_cache_key(video_path) + (None, whisper_model)
+    cached = TRANSCRIPT_CACHE.get(cache_key)
+    if cached is not None:
+        _, _, _, _, duration = probe_video_metadata(video_path)
+        yield [dict(entry) for entry in cached], duration, duration
+        return
+
+    transcript: List[Dict[str, float]] = []
+    texts: List[str] = []
+    try:
+        for words, transcribed, duration, text in iter_whisper_transcript(video_path, whisper_model):
+            transcript.extend(words)
+            texts.append(text)
+            yield [dict(entry) for entry in words], transcribed, duration
+    except Exception as exc:  # noqa: BLE001 - same message as build_transcript
+        raise RuntimeError(
+            "Whisper transcription failed. Ensure openai-whisper is installed and the model is available."
+        ) from exc
+
+    if not transcript:
+        raise RuntimeError("Whisper returned an empty transcript; cannot proceed.")
+    save_the_transcribe_text("".join(texts), video_path)
+    write_subtitle_into_file(video_path, transcript)
+    TRANSCRIPT_CACHE[cache_key] = [dict(entry) for entry in transcript]
+
+
 # --------------------------------------------------------------------------- #
 # Highlight mapping helpers
 # --------------------------------------------------------------------------- #
@@ -319,6 +843,7 @@ def map_assignments_to_segments(
                 "clip_path": assignment.clip_path,
                 "music_path": assignment.music_path,
                 "music_volume": float(assignment.music_volume),
+                "fit_to_segment": bool(assignment.fit_to_segment),
             }
         )
 
@@ -455,6 +980,22 @@ def safe_audio_subclip(
 # --------------------------------------------------------------------------- #
 
 
+def parse_aspect_ratio(value: object) -> float:
+    """Return width / height for a ``"W:H"`` string or a plain number."""
+
+    try:
+        if isinstance(value, str) and ":" in value:
+            width, height = value.split(":", 1)
+            ratio = float(width) / float(height)
+        else:
+            ratio = float(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        ratio = 0.0
+    if not math.isfinite(ratio) or ratio <= 0:
+        raise ValueError(f"Invalid aspect ratio: {value!r}")
+    return ratio
+
+
 def crop_to_aspect_ratio(frame: np.ndarray, target_ratio: float) -> np.ndarray:
     """Centre-crop ``frame`` to match ``target_ratio`` expressed as width / height."""
 
@@ -494,17 +1035,14 @@ def compute_cropped_dimensions(
     return width, cropped_height
 
 
-def resize_overlay_for_canvas(
-    frame: np.ndarray,
+def compute_overlay_size(
     canvas_width: int,
     canvas_height: int,
     aspect_ratio: float,
     coverage: float = 1.0,
-) -> np.ndarray:
-    """Resize overlay so it fits within the canvas while keeping ``aspect_ratio``."""
+) -> Tuple[int, int]:
+    """Return the (width, height) an overlay is scaled to on the canvas."""
 
-    if frame.size == 0:
-        return frame
     target_height = int(canvas_height * coverage)
     target_width = int(target_height * aspect_ratio)
     if target_width > canvas_width * coverage:
@@ -512,63 +1050,49 @@ def resize_overlay_for_canvas(
         target_height = int(target_width / aspect_ratio)
     target_width = max(1, min(canvas_width, target_width))
     target_height = max(1, min(canvas_height, target_height))
-    return cv2.resize(
-        frame, (target_width, target_height), interpolation=cv2.INTER_AREA
+    return target_width, target_height
+
+
+def compute_crop_box(
+    width: int, height: int, target_ratio: float
+) -> Tuple[int, int, int, int]:
+    """Return the centred (width, height, x, y) crop used for ``target_ratio``."""
+
+    cropped_width, cropped_height = compute_cropped_dimensions(
+        width, height, target_ratio
+    )
+    return (
+        cropped_width,
+        cropped_height,
+        max((width - cropped_width) // 2, 0),
+        max((height - cropped_height) // 2, 0),
     )
 
 
-def shadowed_rect(
-    img: np.ndarray,
-    x: int,
-    y: int,
-    w: int,
-    h: int,
-    box_color: Tuple[int, int, int],
-    box_alpha: float,
-    shadow_offset: Tuple[int, int],
-    shadow_blur: int,
-    shadow_alpha: float,
-    radius: int,
+def resize_overlay_for_canvas(
+    frame: np.ndarray,
+    canvas_width: int,
+    canvas_height: int,
+    aspect_ratio: float,
+    coverage: float = 1.0,
+    dst: Optional[np.ndarray] = None,
 ) -> np.ndarray:
-    """Draw a rounded rectangle with a blurred drop shadow onto ``img``."""
-
-    x = int(round(x))
-    y = int(round(y))
-    w = max(0, int(round(w)))
-    h = max(0, int(round(h)))
-    if w == 0 or h == 0:
-        return img
-
-    base = img.copy()
-
-    def round_fill(dst: np.ndarray, x0: int, y0: int, width: int, height: int, rad: int, color: Tuple[int, int, int]) -> None:
-        rad = max(0, min(rad, min(width, height) // 2))
-        cv2.rectangle(dst, (x0 + rad, y0), (x0 + width - rad, y0 + height), color, -1)
-        cv2.rectangle(dst, (x0, y0 + rad), (x0 + width, y0 + height - rad), color, -1)
-        for cx, cy in (
-            (x0 + rad, y0 + rad),
-            (x0 + width - rad, y0 + rad),
-            (x0 + rad, y0 + height - rad),
-            (x0 + width - rad, y0 + height - rad),
-        ):
-            cv2.circle(dst, (cx, cy), rad, color, -1)
-
-    if shadow_alpha > 0 and shadow_blur > 0:
-        shadow = np.zeros_like(img)
-        sx = x + int(shadow_offset[0])
-        sy = y + int(shadow_offset[1])
-        round_fill(shadow, sx, sy, w, h, radius, (0, 0, 0))
-        ksize = shadow_blur | 1  # ensure odd
-        shadow = cv2.GaussianBlur(shadow, (ksize, ksize), 0)
-        img = cv2.addWeighted(shadow, shadow_alpha, img, 1.0, 0)
-
-    overlay = base.copy()
-    round_fill(overlay, x, y, w, h, radius, box_color)
-    if box_alpha >= 1:
-        img = overlay
-    else:
-        img = cv2.addWeighted(overlay, box_alpha, img, 1.0 - box_alpha, 0)
-    return img
+    """Resize overlay so it fits within the canvas while keeping ``aspect_ratio``.
+
+    When ``dst`` already has the target shape the result is written into it,
+    so callers can reuse one buffer across frames.
+    """
+
+    if frame.size == 0:
+        return frame
+    target_width, target_height = compute_overlay_size(
+        canvas_width, canvas_height, aspect_ratio, coverage
+    )
+    if dst is not None and dst.shape[:2] != (target_height, target_width):
+        dst = None
+    return cv2.resize(
+        frame, (target_width, target_height), dst=dst, interpolation=cv2.INTER_AREA
+    )
 
 
 def get_pil_font(font_path: str, font_size: int) -> "ImageFont.FreeTypeFont":
@@ -582,171 +1106,170 @@ def get_pil_font(font_path: str, font_size: int) -> "ImageFont.FreeTypeFont":
     return font
 
 
-def draw_subtitle_on_frame(
-    frame: np.ndarray,
-    transcript: List[Dict[str, float]],
-    current_time: float,
-    design: SubtitleDesign,
-    highlight_ranges: List[Tuple[int, int]],
-    subtitle_segments: Optional[List[Tuple[int, int]]] = None,
-    custom_subtitles: Optional[List[str]] = None,
-) -> np.ndarray:
-    """Draw a subtitle bar on ``frame`` based on the current playback time."""
-
-    height, width = frame.shape[:2]
-    annotated = frame.copy()
+class TextMeasurer:
+    """Memoised word metrics for one subtitle font configuration.
 
-    if not transcript:
-        return annotated
+    Measurements are keyed by the word text, so every distinct word is measured
+    once per (font, size) for the lifetime of the process.
+    """
 
-    active_segment_index: Optional[int] = None
-    if subtitle_segments:
-        previous_candidate: Optional[int] = None
-        for idx, (seg_start, seg_end) in enumerate(subtitle_segments):
-            start_t = transcript[seg_start]["start_time"]
-            end_t = transcript[seg_end]["end_time"]
-            if start_t <= current_time <= end_t:
-                active_segment_index = idx
-                break
-            if current_time < start_t:
-                if previous_candidate is not None:
-                    active_segment_index = previous_candidate
-                break
-            previous_candidate = idx
+    def __init__(self, design: SubtitleDesign):
+        self.use_pil_font = (
+            HAVE_PIL and design.font_path is not None and os.path.exists(design.font_path)
+        )
+        self.pil_font: Optional["ImageFont.FreeTypeFont"] = None
+        self.font = design.font
+        self.text_scale = design.text_scale
+        self.text_thickness = design.text_thickness
+        self.word_metrics: Dict[str, Tuple[int, int, int]] = {}
+        if self.use_pil_font:
+            self.pil_font = get_pil_font(design.font_path, int(design.font_size_px))
+            self.pil_ascent, pil_descent = self.pil_font.getmetrics()
+            self.default_line_height = self.pil_ascent + pil_descent
+            self.space_width = int(math.ceil(self.pil_font.getlength(" "))) or 6
         else:
-            if previous_candidate is not None:
-                active_segment_index = previous_candidate
+            self.space_width = cv2.getTextSize(
+                " ", design.font, design.text_scale, design.text_thickness
+            )[0][0]
+
+    @staticmethod
+    def font_key(design: SubtitleDesign) -> Tuple[object, ...]:
+        """Return the design fields that influence text measurement."""
+
+        return (
+            design.font_path,
+            int(design.font_size_px),
+            design.font,
+            design.text_scale,
+            design.text_thickness,
+        )
 
-    words_to_display: List[Tuple[int, str]] = []
-    if active_segment_index is not None and subtitle_segments:
-        seg_start, seg_end = subtitle_segments[active_segment_index]
-        words_to_display = [
-            (idx, transcript[idx]["word"]) for idx in range(seg_start, seg_end + 1)
-        ]
-    elif subtitle_segments is None:
-        display_window = 2.6
-        for idx, entry in enumerate(transcript):
-            midpoint = (entry["start_time"] + entry["end_time"]) / 2.0
-            if abs(midpoint - current_time) <= display_window / 2:
-                words_to_display.append((idx, entry["word"]))
+    def measure_word(self, text: str) -> Tuple[int, int, int]:
+        """Return (width, height, ascent) of ``text``."""
 
-    if subtitle_segments and active_segment_index is None:
-        # No subtitle for this moment when explicit segments are supplied.
-        return annotated
+        metrics = self.word_metrics.get(text)
+        if metrics is None:
+            metrics = self._measure(text)
+            self.word_metrics[text] = metrics
+        return metrics
 
-    use_pil_font = (
-        HAVE_PIL and design.font_path is not None and os.path.exists(design.font_path)
-    )
-    pil_font: Optional["ImageFont.FreeTypeFont"] = None
-    pil_ascent = 0
-    if use_pil_font:
-        pil_font = get_pil_font(design.font_path, int(design.font_size_px))
-        pil_ascent, pil_descent = pil_font.getmetrics()
-        default_line_height = pil_ascent + pil_descent
-
-        def measure_word(text: str) -> Tuple[int, int, int]:
+    def _measure(self, text: str) -> Tuple[int, int, int]:
+        if self.use_pil_font:
             render_text = text if text else " "
-            bbox = pil_font.getbbox(render_text)
+            bbox = self.pil_font.getbbox(render_text)
             width = int(math.ceil(bbox[2] - bbox[0]))
             height = int(math.ceil(bbox[3] - bbox[1]))
             if width <= 0:
-                width = int(math.ceil(pil_font.getlength(render_text)))
-            height = max(height, default_line_height)
-            ascent = pil_ascent
-            return max(width, 1), height, ascent
+                width = int(math.ceil(self.pil_font.getlength(render_text)))
+            height = max(height, self.default_line_height)
+            return max(width, 1), height, self.pil_ascent
+
+        ((word_w, word_h), baseline) = cv2.getTextSize(
+            text if text else " ",
+            self.font,
+            self.text_scale,
+            self.text_thickness,
+        )
+        word_w = max(word_w, 1)
+        word_h = max(word_h, 1)
+        ascent = word_h - baseline
+        if ascent <= 0:
+            ascent = word_h
+        return word_w, word_h, ascent
 
-        space_width = int(math.ceil(pil_font.getlength(" "))) or 6
-    else:
 
-        def measure_word(text: str) -> Tuple[int, int, int]:
-            ((word_w, word_h), baseline) = cv2.getTextSize(
-                text if text else " ",
-                design.font,
-                design.text_scale,
-                design.text_thickness,
-            )
-            word_w = max(word_w, 1)
-            word_h = max(word_h, 1)
-            ascent = word_h - baseline
-            if ascent <= 0:
-                ascent = word_h
-            return word_w, word_h, ascent
-
-        space_width = cv2.getTextSize(
-            " ", design.font, design.text_scale, design.text_thickness
-        )[0][0]
-    max_line_width = max(1, int(width * design.max_line_width_ratio))
+def get_text_measurer(design: SubtitleDesign) -> TextMeasurer:
+    """Return the shared ``TextMeasurer`` for ``design``'s font settings."""
 
-    def compute_line_width(word_list: List[Dict[str, object]]) -> int:
-        width_acc = 0
-        for idx_w, word_info in enumerate(word_list):
-            if idx_w > 0:
-                width_acc += space_width
-            width_acc += word_info["width"]
-        return width_acc
+    cache_key = TextMeasurer.font_key(design)
+    measurer = TEXT_MEASURER_CACHE.get(cache_key)
+    if measurer is None:
+        measurer = TextMeasurer(design)
+        TEXT_MEASURER_CACHE[cache_key] = measurer
+    return measurer
 
-    word_entries: List[Dict[str, object]] = []
-    if (
-        custom_subtitles
-        and subtitle_segments
-        and active_segment_index is not None
-        and 0 <= active_segment_index < len(custom_subtitles)
-    ):
-        custom_text = custom_subtitles[active_segment_index]
-        text_lines = [
-            line.strip()
-            for line in custom_text.replace("\r", "").splitlines()
-            if line.strip()
-        ]
-        if not text_lines:
-            text_lines = [custom_text.strip() or custom_text]
 
-        seg_start, seg_end = subtitle_segments[active_segment_index]
-        highlight_active = any(
-            not (end < seg_start or start > seg_end) for start, end in highlight_ranges
+def find_active_subtitle_segment(
+    transcript: List[Dict[str, float]],
+    subtitle_segments: Sequence[Tuple[int, int]],
+    current_time: float,
+) -> Optional[int]:
+    """Return the subtitle segment shown at ``current_time``.
+
+    A segment stays on screen until the next one starts, so gaps between
+    segments keep showing the previous subtitle.
+    """
+
+    previous_candidate: Optional[int] = None
+    for idx, (seg_start, seg_end) in enumerate(subtitle_segments):
+        start_t = transcript[seg_start]["start_time"]
+        end_t = transcript[seg_end]["end_time"]
+        if start_t <= current_time <= end_t:
+            return idx
+        if current_time < start_t:
+            return previous_candidate
+        previous_candidate = idx
+    return previous_candidate
+
+
+def balance_subtitle_lines(
+    words: List[Dict[str, object]], space_width: int, max_line_width: int
+) -> List[Dict[str, object]]:
+    """Split ``words`` into the two lines with the most even widths.
+
+    Prefix sums of the word widths make every candidate split O(1), so the
+    whole search is linear in the number of words.
+    """
+
+    prefix_widths = [0]
+    for word_info in words:
+        prefix_widths.append(prefix_widths[-1] + int(word_info["width"]))
+    total_tokens = len(words)
+    total_width = prefix_widths[-1]
+
+    best_split: Optional[int] = None
+    best_widths = (0, 0)
+    best_score = float("inf")
+    for split_idx in range(1, total_tokens):
+        width1 = prefix_widths[split_idx] + (split_idx - 1) * space_width
+        width2 = (
+            total_width
+            - prefix_widths[split_idx]
+            + (total_tokens - split_idx - 1) * space_width
         )
+        overflow = max(0, width1 - max_line_width) + max(0, width2 - max_line_width)
+        score = abs(width1 - width2) + overflow * 5
+        if score < best_score:
+            best_score = score
+            best_split = split_idx
+            best_widths = (width1, width2)
+
+    if best_split is None:
+        width = total_width + max(0, total_tokens - 1) * space_width
+        return [{"words": words, "width": width}]
+    return [
+        {"words": words[:best_split], "width": best_widths[0]},
+        {"words": words[best_split:], "width": best_widths[1]},
+    ]
 
-        for idx_line, line_text in enumerate(text_lines):
-            words = line_text.split()
-            if not words:
-                continue
-            for word in words:
-                word_width, word_height, word_ascent = measure_word(word)
-                word_entries.append(
-                    {
-                        "word": word,
-                        "is_highlighted": highlight_active,
-                        "width": word_width,
-                        "height": word_height,
-                        "ascent": word_ascent,
-                        "descent": max(0, word_height - word_ascent),
-                        "is_forced_break": False,
-                    }
-                )
-            if idx_line != len(text_lines) - 1:
-                word_entries.append({"is_forced_break": True})
-    else:
-        segments_with_highlights: List[Tuple[str, bool]] = []
-        for idx, word in words_to_display:
-            is_highlighted = any(start <= idx <= end for start, end in highlight_ranges)
-            segments_with_highlights.append((word, is_highlighted))
 
-        for word, is_highlighted in segments_with_highlights:
-            word_width, word_height, word_ascent = measure_word(word)
-            word_entries.append(
-                {
-                    "word": word,
-                    "is_highlighted": is_highlighted,
-                    "width": word_width,
-                    "height": word_height,
-                    "ascent": word_ascent,
-                    "descent": max(0, word_height - word_ascent),
-                    "is_forced_break": False,
-                }
-            )
+def compute_subtitle_layout(
+    word_entries: List[Dict[str, object]],
+    measurer: TextMeasurer,
+    width: int,
+    height: int,
+    design: SubtitleDesign,
+) -> Optional[Dict[str, object]]:
+    """Wrap ``word_entries`` into lines and position the subtitle box.
 
-    lines: List[Dict[str, object]] = []
-    current_line: List[Dict[str, object]] = []
+    Returns ``None`` when there is nothing to draw.
+    """
+
+    space_width = measurer.space_width
+    max_line_width = max(1, int(width * design.max_line_width_ratio))
+
+    lines: List[Dict[str, object]] = []
+    current_line: List[Dict[str, object]] = []
     current_width = 0
 
     for entry in word_entries:
@@ -784,35 +1307,16 @@ def draw_subtitle_on_frame(
             word_info for line in lines for word_info in line["words"]
         ]
         if flattened_words:
-            best_lines: Optional[List[Dict[str, object]]] = None
-            best_score = float("inf")
-            total_tokens = len(flattened_words)
-            for split_idx in range(1, total_tokens):
-                first_line = flattened_words[:split_idx]
-                second_line = flattened_words[split_idx:]
-                if not second_line:
-                    continue
-                width1 = compute_line_width(first_line)
-                width2 = compute_line_width(second_line)
-                overflow = max(0, width1 - max_line_width) + max(
-                    0, width2 - max_line_width
+            lines = [
+                line
+                for line in balance_subtitle_lines(
+                    flattened_words, space_width, max_line_width
                 )
-                score = abs(width1 - width2) + overflow * 5
-                if score < best_score:
-                    best_score = score
-                    best_lines = [
-                        {"words": first_line, "width": width1},
-                        {"words": second_line, "width": width2},
-                    ]
-            if best_lines:
-                lines = [line for line in best_lines if line["words"]]
-            else:
-                lines = [
-                    {"words": flattened_words, "width": compute_line_width(flattened_words)}
-                ]
+                if line["words"]
+            ]
 
     if not lines:
-        return annotated
+        return None
 
     text_block_width = max(line["width"] for line in lines)
     line_ascents: List[int] = []
@@ -845,7 +1349,6 @@ def draw_subtitle_on_frame(
     box_width = int(text_block_width + 2 * padding_x)
     box_height = int(text_block_height + 2 * padding_y)
     box_left = int(max(0, (width - box_width) / 2))
-    box_right = int(min(width, box_left + box_width))
     line_count = len(lines)
     bottom_margin_dynamic = design.bottom_margin
     if line_count == 1:
@@ -858,107 +1361,1107 @@ def draw_subtitle_on_frame(
         box_top = 0
         box_bottom = min(height, box_height)
 
-    annotated = shadowed_rect(
-        annotated,
-        box_left,
-        box_top,
-        box_width,
-        box_height,
-        box_color=design.bar_color,
-        box_alpha=design.bar_opacity,
-        shadow_offset=getattr(design, "box_shadow_offset", (0, 0)),
-        shadow_blur=getattr(design, "box_shadow_blur", 0),
-        shadow_alpha=getattr(design, "box_shadow_alpha", 0.0),
-        radius=design.corner_radius,
+    return {
+        "lines": lines,
+        "line_ascents": line_ascents,
+        "line_descents": line_descents,
+        "line_spacing": line_spacing,
+        "padding_y": padding_y,
+        "box_left": box_left,
+        "box_top": box_top,
+        "box_width": box_width,
+        "box_height": box_height,
+    }
+
+
+def build_subtitle_word_entries(
+    measurer: TextMeasurer,
+    words_to_display: List[Tuple[int, str]],
+    highlight_ranges: List[Tuple[int, int]],
+    subtitle_segments: Optional[List[Tuple[int, int]]],
+    custom_subtitles: Optional[List[str]],
+    active_segment_index: Optional[int],
+) -> List[Dict[str, object]]:
+    """Measure the words of the active subtitle, honouring custom line breaks."""
+
+    measure_word = measurer.measure_word
+    word_entries: List[Dict[str, object]] = []
+    if (
+        custom_subtitles
+        and subtitle_segments
+        and active_segment_index is not None
+        and 0 <= active_segment_index < len(custom_subtitles)
+    ):
+        custom_text = custom_subtitles[active_segment_index]
+        text_lines = [
+            line.strip()
+            for line in custom_text.replace("\r", "").splitlines()
+            if line.strip()
+        ]
+        if not text_lines:
+            text_lines = [custom_text.strip() or custom_text]
+
+        seg_start, seg_end = subtitle_segments[active_segment_index]
+        highlight_active = any(
+            not (end < seg_start or start > seg_end) for start, end in highlight_ranges
+        )
+
+        for idx_line, line_text in enumerate(text_lines):
+            words = line_text.split()
+            if not words:
+                continue
+            for word in words:
+                word_width, word_height, word_ascent = measure_word(word)
+                word_entries.append(
+                    {
+                        "word": word,
+                        "is_highlighted": highlight_active,
+                        "width": word_width,
+                        "height": word_height,
+                        "ascent": word_ascent,
+                        "descent": max(0, word_height - word_ascent),
+                        "is_forced_break": False,
+                    }
+                )
+            if idx_line != len(text_lines) - 1:
+                word_entries.append({"is_forced_break": True})
+    else:
+        segments_with_highlights: List[Tuple[str, bool]] = []
+        for idx, word in words_to_display:
+            is_highlighted = any(start <= idx <= end for start, end in highlight_ranges)
+            segments_with_highlights.append((word, is_highlighted))
+
+        for word, is_highlighted in segments_with_highlights:
+            word_width, word_height, word_ascent = measure_word(word)
+            word_entries.append(
+                {
+                    "word": word,
+                    "is_highlighted": is_highlighted,
+                    "width": word_width,
+                    "height": word_height,
+                    "ascent": word_ascent,
+                    "descent": max(0, word_height - word_ascent),
+                    "is_forced_break": False,
+                }
+            )
+    return word_entries
+
+
+def draw_subtitle_on_frame(
+    frame: np.ndarray,
+    transcript: List[Dict[str, float]],
+    current_time: float,
+    design: SubtitleDesign,
+    highlight_ranges: List[Tuple[int, int]],
+    subtitle_segments: Optional[List[Tuple[int, int]]] = None,
+    custom_subtitles: Optional[List[str]] = None,
+    layout_cache: Optional[Dict[Tuple[object, ...], Optional[Dict[str, object]]]] = None,
+    in_place: bool = False,
+) -> np.ndarray:
+    """Draw a subtitle bar on ``frame`` based on the current playback time.
+
+    Pass the same ``layout_cache`` dict for every frame of a render so each
+    subtitle's layout is computed once; it must not be shared between renders
+    with different designs, highlights or subtitle texts. With ``in_place``
+    the subtitle is drawn straight onto ``frame`` instead of a copy.
+    """
+
+    height, width = frame.shape[:2]
+    annotated = frame if in_place else frame.copy()
+
+    if not transcript:
+        return annotated
+
+    active_segment_index: Optional[int] = None
+    if subtitle_segments:
+        active_segment_index = find_active_subtitle_segment(
+            transcript, subtitle_segments, current_time
+        )
+
+    words_to_display: List[Tuple[int, str]] = []
+    if active_segment_index is not None and subtitle_segments:
+        seg_start, seg_end = subtitle_segments[active_segment_index]
+        words_to_display = [
+            (idx, transcript[idx]["word"]) for idx in range(seg_start, seg_end + 1)
+        ]
+    elif subtitle_segments is None:
+        display_window = 2.6
+        for idx, entry in enumerate(transcript):
+            midpoint = (entry["start_time"] + entry["end_time"]) / 2.0
+            if abs(midpoint - current_time) <= display_window / 2:
+                words_to_display.append((idx, entry["word"]))
+
+    if subtitle_segments and active_segment_index is None:
+        # No subtitle for this moment when explicit segments are supplied.
+        return annotated
+
+    measurer = get_text_measurer(design)
+
+    cache_key: Tuple[object, ...] = (
+        width,
+        height,
+        active_segment_index,
+        tuple(idx for idx, _ in words_to_display),
     )
+    if layout_cache is not None and cache_key in layout_cache:
+        layout = layout_cache[cache_key]
+    else:
+        layout = compute_subtitle_layout(
+            build_subtitle_word_entries(
+                measurer,
+                words_to_display,
+                highlight_ranges,
+                subtitle_segments,
+                custom_subtitles,
+                active_segment_index,
+            ),
+            measurer,
+            width,
+            height,
+            design,
+        )
+        if layout_cache is not None:
+            layout_cache[cache_key] = layout
 
-    pil_image = None
-    pil_draw = None
+    if layout is None:
+        return annotated
+
+    # The box, outline and text of a subtitle never change while it is on
+    # screen, so they are flattened into one sprite stored with the layout.
+    if "sprite" not in layout:
+        layout["sprite"] = build_subtitle_sprite(layout, measurer, design, width, height)
+    blend_sprite(annotated, layout["sprite"])
+    return annotated
 
-    y_cursor = box_top + padding_y
+
+def build_subtitle_sprite(
+    layout: Dict[str, object],
+    measurer: "TextMeasurer",
+    design: SubtitleDesign,
+    width: int,
+    height: int,
+) -> Optional[Sprite]:
+    """Render a subtitle layout's box, outline and text as one premultiplied sprite.
+
+    Layers are drawn as coverage masks on the horizontal band around the box
+    (padded by a font size for glyph overhang), stacked with ``over`` and
+    trimmed to their visible pixels.
+    """
+
+    lines = layout["lines"]
+    line_ascents = layout["line_ascents"]
+    line_descents = layout["line_descents"]
+    line_spacing = layout["line_spacing"]
+    box_left = int(round(layout["box_left"]))
+    box_top = int(round(layout["box_top"]))
+    box_width = max(0, int(round(layout["box_width"])))
+    box_height = max(0, int(round(layout["box_height"])))
+    space_width = measurer.space_width
+    pil_font = measurer.pil_font
+    use_pil_font = measurer.use_pil_font and pil_font is not None
+
+    band_top = max(0, box_top - int(design.font_size_px))
+    band_bottom = min(height, box_top + box_height + int(design.font_size_px))
+    if band_bottom <= band_top or width <= 0:
+        return None
+    band_shape = (band_bottom - band_top, width)
+
+    box_coverage = np.zeros(band_shape, dtype=np.uint8)
+    if box_width > 0 and box_height > 0:
+        # Like cv2.rectangle, the box spans box_width + 1 by box_height + 1 pixels
+        mask = rounded_rect_mask(box_width + 1, box_height + 1, design.corner_radius)
+        opacity = int(round(255 * min(max(float(design.bar_opacity), 0.0), 1.0)))
+        if opacity < 255:
+            mask = ((mask.astype(np.uint16) * opacity + 127) // 255).astype(np.uint8)
+        x0, y0 = box_left, box_top - band_top
+        x1 = min(width, x0 + mask.shape[1])
+        y1 = min(band_shape[0], y0 + mask.shape[0])
+        sx0, sy0 = max(0, -x0), max(0, -y0)
+        if x1 > max(0, x0) and y1 > max(0, y0):
+            box_coverage[max(0, y0) : y1, max(0, x0) : x1] = mask[
+                sy0 : sy0 + y1 - max(0, y0), sx0 : sx0 + x1 - max(0, x0)
+            ]
+    sprite = solid_layer(design.bar_color, box_coverage)
+
+    # Highlighted words keep the normal text colour; per-word highlight boxes are disabled.
+    text_coverage = np.zeros(band_shape, dtype=np.uint8)
+    outline_coverage = np.zeros(band_shape, dtype=np.uint8)
+    pil_mask = Image.fromarray(text_coverage) if use_pil_font else None
+    pil_draw = ImageDraw.Draw(pil_mask) if pil_mask is not None else None
+
+    y_cursor = box_top + layout["padding_y"]
     for line_index, line in enumerate(lines):
         words = line["words"]
         if not words:
             continue
         line_ascent = line_ascents[line_index]
         line_descent = line_descents[line_index]
-        top_line = y_cursor
-        baseline_y = int(top_line + line_ascent)
-        line_width = line["width"]
-        x_cursor = int((width - line_width) / 2)
+        baseline_y = int(y_cursor + line_ascent)
+        x_cursor = int((width - line["width"]) / 2)
         for word_position, word_info in enumerate(words):
             if word_position > 0:
                 x_cursor += space_width
             word = word_info["word"]
-            word_width = word_info["width"]
-            word_height = word_info["height"]
-            draw_highlight = False  # disable text colour change when highlighted segments active
-            if draw_highlight:
-                padding_word_x, padding_word_y = design.highlight_padding
-                rect_top_left = (
-                    x_cursor - padding_word_x,
-                    int(top_line - padding_word_y),
-                )
-                rect_bottom_right = (
-                    x_cursor + word_width + padding_word_x,
-                    int(baseline_y + word_info["descent"] + padding_word_y),
-                )
-                cv2.rectangle(
-                    annotated,
-                    rect_top_left,
-                    rect_bottom_right,
-                    design.highlight_color,
-                    thickness=-1,
-                )
-                text_color = design.highlight_text_color
-            else:
-                text_color = design.text_color
-
-            if use_pil_font and pil_font is not None:
-                if pil_image is None:
-                    pil_image = Image.fromarray(cv2.cvtColor(annotated, cv2.COLOR_BGR2RGB))
-                    pil_draw = ImageDraw.Draw(pil_image)
-                rgb_color = (
-                    int(text_color[2]),
-                    int(text_color[1]),
-                    int(text_color[0]),
-                )
+            if pil_draw is not None:
                 pil_draw.text(
-                    (x_cursor, baseline_y - line_ascent),
+                    (x_cursor, baseline_y - line_ascent - band_top),
                     word,
                     font=pil_font,
-                    fill=rgb_color,
+                    fill=255,
                 )
             else:
+                origin = (x_cursor, baseline_y - band_top)
                 if design.outline_thickness > 0:
                     cv2.putText(
-                        annotated,
+                        outline_coverage,
                         word,
-                        (x_cursor, baseline_y),
+                        origin,
                         design.font,
                         design.text_scale,
-                        design.outline_color,
+                        255,
                         thickness=design.outline_thickness,
                         lineType=cv2.LINE_AA,
                     )
-
                 cv2.putText(
-                    annotated,
+                    text_coverage,
                     word,
-                    (x_cursor, baseline_y),
+                    origin,
                     design.font,
                     design.text_scale,
-                    text_color,
+                    255,
                     thickness=design.text_thickness,
                     lineType=cv2.LINE_AA,
                 )
-            x_cursor += word_width
+            x_cursor += word_info["width"]
         y_cursor = baseline_y + line_descent + line_spacing
 
-    if pil_image is not None:
-        annotated = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+    if pil_mask is not None:
+        text_coverage = np.asarray(pil_mask)
+    elif design.outline_thickness > 0:
+        sprite = over(solid_layer(design.outline_color, outline_coverage), sprite)
+    sprite = over(solid_layer(design.text_color, text_coverage), sprite)
+    return crop_to_content(Sprite(0, band_top, sprite))
 
-    return annotated
+
+def build_keyframe_index(path: str) -> Optional[Dict[str, object]]:
+    """Index every video frame's timestamp and which frames are keyframes.
+
+    Frames are numbered in presentation order, matching OpenCV's frame
+    positions. Returns ``None`` when ffprobe is unavailable.
+    """
+
+    probe = run_ffprobe_json(
+        [
+            "-select_streams",
+            "v:0",
+            "-show_entries",
+            "packet=pts_time,dts_time,flags",
+            path,
+        ]
+    )
+    if probe is None:
+        return None
+
+    packets: List[Tuple[float, bool]] = []
+    for packet in probe.get("packets", []):
+        timestamp = packet.get("pts_time", packet.get("dts_time"))
+        try:
+            packet_time = float(timestamp)
+        except (TypeError, ValueError):
+            continue
+        packets.append((packet_time, "K" in str(packet.get("flags", ""))))
+    packets.sort(key=lambda item: item[0])
+
+    frame_times = [packet_time for packet_time, _ in packets]
+    keyframes = [idx for idx, (_, is_key) in enumerate(packets) if is_key]
+    gop_bounds = keyframes + [len(frame_times)]
+    max_gop_frames = max(
+        (end - start for start, end in zip(gop_bounds, gop_bounds[1:])), default=0
+    )
+    max_gop_seconds = 0.0
+    for start, end in zip(gop_bounds, gop_bounds[1:]):
+        end_time = frame_times[end] if end < len(frame_times) else frame_times[-1]
+        max_gop_seconds = max(max_gop_seconds, end_time - frame_times[start])
+
+    return {
+        "frame_times": frame_times,
+        "keyframes": keyframes,
+        "max_gop_frames": max_gop_frames,
+        "max_gop_seconds": max_gop_seconds,
+    }
+
+
+def get_keyframe_index(path: str, warn_long_gop: bool = True) -> Optional[Dict[str, object]]:
+    """Return the keyframe index for ``path``, building it once and caching it on disk.
+
+    ``warn_long_gop`` suggests re-encoding overlay clips whose keyframes are far
+    apart; it does not apply to a main video that is only sought once.
+    """
+
+    cache_key = file_cache_key(path)
+    if cache_key in KEYFRAME_INDEX_CACHE:
+        return KEYFRAME_INDEX_CACHE[cache_key]
+
+    cache_path = disk_cache_path("keyframes", cache_key)
+    index: Optional[Dict[str, object]] = None
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            index = None
+    if index is None:
+        index = build_keyframe_index(path)
+        if index is not None:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, "w", encoding="utf-8") as file:
+                json.dump(index, file)
+
+    if (
+        warn_long_gop
+        and index is not None
+        and index["max_gop_seconds"] > SEEK_FRIENDLY_MAX_GOP_SECONDS
+    ):
+        print(
+            f"[warn] Overlay clip {path} has keyframes up to "
+            f"{index['max_gop_seconds']:.1f}s apart, so seeks decode many frames. "
+            "Re-encode it with a short GOP for faster rendering, e.g. "
+            f"ffmpeg -i {path} -c:v libx264 -g 15 -c:a copy <output>"
+        )
+    KEYFRAME_INDEX_CACHE[cache_key] = index
+    return index
+
+
+FRAME_TIME_TOLERANCE = 1e-4  # Seconds; absorbs rounding in probed timestamps
+
+
+def frame_index_at_time(
+    seconds: float, fps: float, frame_times: Optional[Sequence[float]] = None
+) -> int:
+    """Return the index of the frame on screen ``seconds`` into a clip.
+
+    Uses the probed presentation times when available (exact for VFR clips),
+    otherwise assumes a constant ``fps``.
+    """
+
+    if frame_times:
+        stream_time = seconds + frame_times[0] + FRAME_TIME_TOLERANCE
+        if stream_time >= frame_times[-1] + 1.0 / fps:
+            return len(frame_times)  # Past the end of the last frame
+        return max(0, bisect.bisect_right(frame_times, stream_time) - 1)
+    return max(0, int(math.floor(seconds * fps + FRAME_TIME_TOLERANCE)))
+
+
+class OverlayClipReader:
+    """Frame-accurate reader for an overlay clip.
+
+    Reading on from the current position never seeks. Other seeks land on the
+    nearest keyframe at or before the target (from the ffprobe keyframe index,
+    or the first frame when no index is available) and decode forward, so the
+    next frame returned is always exactly the requested one.
+    """
+
+    def __init__(self, path: str, default_fps: float):
+        self.path = path
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise IOError(f"Cannot open overlay clip: {path}")
+        metadata = get_media_metadata(path)
+        frame_count, fps = metadata.frame_count, metadata.fps
+        self.keyframe_index = get_keyframe_index(path)
+        self.keyframes: List[int] = []
+        self.frame_times: Optional[List[float]] = None
+        if self.keyframe_index is not None and self.keyframe_index["frame_times"]:
+            self.frame_times = list(self.keyframe_index["frame_times"])
+            frame_count = len(self.frame_times)
+            self.keyframes = list(self.keyframe_index["keyframes"])
+        self.frame_count = frame_count
+        self.fps = fps or default_fps
+        self.position = 0  # Index of the frame the next read returns
+
+    def frame_at_time(self, seconds: float) -> int:
+        return frame_index_at_time(seconds, self.fps, self.frame_times)
+
+    def keyframe_at_or_before(self, frame_index: int) -> int:
+        pos = bisect.bisect_right(self.keyframes, frame_index) - 1
+        return self.keyframes[pos] if pos >= 0 else 0
+
+    def seek(self, frame_index: int) -> bool:
+        """Position the reader so the next ``read`` returns ``frame_index``."""
+
+        frame_index = max(0, int(frame_index))
+        if frame_index == self.position:
+            return True
+        keyframe = self.keyframe_at_or_before(frame_index)
+        if not keyframe <= self.position < frame_index:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+            self.position = keyframe
+        while self.position < frame_index:
+            if not self.grab():
+                return False
+        return True
+
+    def grab(self) -> bool:
+        """Skip one frame without converting it."""
+
+        if not self.capture.grab():
+            return False
+        self.position += 1
+        return True
+
+    def read(self, buffer: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        ret, frame = self.capture.read(buffer)
+        if ret:
+            self.position += 1
+        return ret, frame
+
+    def release(self) -> None:
+        self.capture.release()
+
+
+def find_ffmpeg() -> Optional[str]:
+    """Return an ffmpeg executable, falling back to the one bundled with MoviePy."""
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        return ffmpeg
+    try:
+        import imageio_ffmpeg
+
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return None
+
+
+class FFmpegFrameReader:
+    """Decode frames through an ffmpeg pipe with crop, scale and BGR conversion
+    done inside ffmpeg, so only canvas-sized frames cross into Python.
+
+    Exposes the same ``read``/``grab``/``seek``/``release`` interface as
+    ``OverlayClipReader``. Short forward seeks decode through the pipe; longer
+    or backward seeks restart ffmpeg with an accurate ``-ss``. Frames pass
+    through one for one (``-fps_mode passthrough``), so a variable frame rate
+    source yields the frames OpenCV counts. When ffmpeg fails, reads raise
+    ``IOError`` with its error output instead of looking like the end of the
+    video.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        output_size: Tuple[int, int],
+        crop_box: Optional[Tuple[int, int, int, int]] = None,
+        fps: float = 25.0,
+        frame_count: int = 0,
+        frame_times: Optional[Sequence[float]] = None,
+    ):
+        ffmpeg = find_ffmpeg()
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg is required for the ffmpeg decode backend.")
+        self.ffmpeg = ffmpeg
+        self.path = path
+        self.width, self.height = output_size
+        self.crop_box = crop_box
+        self.fps = fps or 25.0
+        self.frame_count = frame_count
+        self.frame_times = list(frame_times) if frame_times else None
+        self.frame_bytes = self.width * self.height * 3
+        self.process: Optional[subprocess.Popen] = None
+        self.errors: Optional[IO[bytes]] = None
+        self.position = 0
+        self._scratch: Optional[np.ndarray] = None
+        self._pending: Optional[np.ndarray] = None  # First frame, read by ``_start``
+        self._start(0)
+
+    def frame_at_time(self, seconds: float) -> int:
+        return frame_index_at_time(seconds, self.fps, self.frame_times)
+
+    def _filter_chain(self, start_time: Optional[float] = None) -> str:
+        filters: List[str] = []
+        if start_time is not None:
+            # Timestamps are kept (-copyts) so frames can be selected exactly.
+            filters.append(f"select=gte(t\\,{start_time:.6f})")
+        if self.crop_box is not None:
+            crop_w, crop_h, crop_x, crop_y = self.crop_box
+            filters.append(f"crop={crop_w}:{crop_h}:{crop_x}:{crop_y}:exact=1")
+            if (crop_w, crop_h) != (self.width, self.height):
+                filters.append(f"scale={self.width}:{self.height}:flags=area")
+        else:
+            filters.append(f"scale={self.width}:{self.height}:flags=area")
+        filters.append("format=bgr24")
+        return ",".join(filters)
+
+    def _frame_time(self, frame_index: int) -> Tuple[float, float]:
+        """Return the (stream, file-relative) presentation time of ``frame_index``."""
+
+        if self.frame_times and frame_index < len(self.frame_times):
+            stream_time = self.frame_times[frame_index]
+            return stream_time, stream_time - self.frame_times[0]
+        return frame_index / self.fps, frame_index / self.fps
+
+    def _start(self, frame_index: int) -> bool:
+        """Restart ffmpeg at ``frame_index``; ``False`` when the video ends before it."""
+
+        self._stop()
+        command = [self.ffmpeg, "-v", "error", "-nostdin"]
+        start_time: Optional[float] = None
+        if frame_index > 0:
+            stream_time, relative_time = self._frame_time(frame_index)
+            # Seek coarsely to just before the target, then let the select
+            # filter drop everything earlier than half a frame before it.
+            command += ["-ss", f"{max(0.0, relative_time - 1.0):.6f}"]
+            start_time = stream_time - 0.5 / self.fps
+        command += [
+            "-i",
+            self.path,
+            "-copyts",
+            "-map",
+            "0:v:0",
+            "-an",
+            "-sn",
+            "-vf",
+            self._filter_chain(start_time),
+            "-fps_mode",
+            "passthrough",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "bgr24",
+            "-",
+        ]
+        self.errors = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=self.errors,
+            bufsize=self.frame_bytes,
+        )
+        self.position = frame_index
+        ret, self._pending = self._read_pipe(None)
+        return ret
+
+    def _stop(self) -> None:
+        self._pending = None
+        if self.process is None:
+            return
+        if self.process.stdout is not None:
+            self.process.stdout.close()
+        if self.process.poll() is None:
+            self.process.terminate()
+        self.process.wait()
+        self.process = None
+        if self.errors is not None:
+            self.errors.close()
+            self.errors = None
+
+    def _error_text(self) -> str:
+        if self.errors is None:
+            return ""
+        self.errors.seek(0)
+        return self.errors.read().decode("utf-8", "replace").strip()
+
+    def _read_pipe(self, buffer: Optional[np.ndarray]) -> Tuple[bool, Optional[np.ndarray]]:
+        if self.process is None or self.process.stdout is None:
+            return False, None
+        if (
+            buffer is None
+            or buffer.shape != (self.height, self.width, 3)
+            or buffer.dtype != np.uint8
+            or not buffer.flags["C_CONTIGUOUS"]
+        ):
+            buffer = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        view = memoryview(buffer).cast("B")
+        filled = 0
+        while filled < self.frame_bytes:
+            count = self.process.stdout.readinto(view[filled:])
+            if not count:
+                # A clean exit is the end of the video; anything else is a decode failure
+                if self.process.wait() != 0:
+                    raise IOError(f"ffmpeg failed to decode {self.path}: {self._error_text()}")
+                return False, None
+            filled += count
+        return True, buffer
+
+    def read(self, buffer: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            if buffer is not None and buffer.shape == pending.shape and buffer.dtype == np.uint8:
+                buffer[...] = pending
+                pending = buffer
+            self.position += 1
+            return True, pending
+        ret, buffer = self._read_pipe(buffer)
+        if ret:
+            self.position += 1
+        return ret, buffer
+
+    def grab(self) -> bool:
+        ret, self._scratch = self.read(self._scratch)
+        return ret
+
+    def seek(self, frame_index: int) -> bool:
+        """Position the reader so the next ``read`` returns ``frame_index``."""
+
+        frame_index = max(0, int(frame_index))
+        if frame_index == self.position:
+            return True
+        if self.position < frame_index <= self.position + max(1, int(self.fps)):
+            while self.position < frame_index:
+                if not self.grab():
+                    return False
+            return True
+        return self._start(frame_index)
+
+    def release(self) -> None:
+        self._stop()
+
+
+def seek_main_video(cap: object, path: str, frame_index: int) -> None:
+    """Position the main video reader ``cap`` so its next read returns ``frame_index``.
+
+    OpenCV's ``CAP_PROP_POS_FRAMES`` seek is not frame-accurate on long-GOP
+    H.264. A resumed render would then be offset against its finished
+    segments, the audio and the subtitles. Like ``OverlayClipReader.seek``,
+    this lands on the keyframe at or before the target (from the keyframe
+    index) and decodes forward. ``FFmpegFrameReader`` gets the probed frame
+    times for its accurate ``-ss`` seek.
+    """
+
+    index = get_keyframe_index(path, warn_long_gop=False)
+    if isinstance(cap, FFmpegFrameReader):
+        if index is not None and index["frame_times"]:
+            cap.frame_times = list(index["frame_times"])
+        if not cap.seek(frame_index):
+            raise IOError(f"Cannot resume {path}: it ends before frame {frame_index}.")
+        return
+
+    keyframes: List[int] = list(index["keyframes"]) if index is not None else []
+    pos = bisect.bisect_right(keyframes, frame_index) - 1
+    keyframe = keyframes[pos] if pos >= 0 else 0
+    cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+    for _ in range(frame_index - keyframe):
+        if not cap.grab():
+            raise IOError(f"Cannot resume {path}: it ends before frame {frame_index}.")
+
+
+DECODE_BACKENDS = ("opencv", "ffmpeg")
+
+
+def open_overlay_reader(
+    clip_path: str,
+    canvas_width: int,
+    canvas_height: int,
+    aspect_ratio: float,
+    fps: float,
+    decode_backend: str = "opencv",
+) -> Tuple[object, bool]:
+    """Open an overlay clip for reading.
+
+    Returns ``(reader, prescaled)``; ``prescaled`` readers already deliver
+    frames cropped and scaled to the overlay's size on the canvas.
+    """
+
+    reader = OverlayClipReader(clip_path, default_fps=fps)
+    if decode_backend != "ffmpeg":
+        return reader, False
+
+    source_width = int(reader.capture.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+    source_height = int(reader.capture.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+    reader.release()
+    ffmpeg_reader = FFmpegFrameReader(
+        clip_path,
+        compute_overlay_size(canvas_width, canvas_height, aspect_ratio),
+        crop_box=compute_crop_box(source_width, source_height, aspect_ratio),
+        fps=reader.fps,
+        frame_count=reader.frame_count,
+        frame_times=reader.frame_times,
+    )
+    return ffmpeg_reader, True
+
+
+class SegmentedVideoWriter:
+    """Drop-in for ``cv2.VideoWriter`` that writes fixed-length segment files.
+
+    Each segment is encoded to a ``.part`` file and renamed into place only
+    after the encoder has been closed and the data flushed to disk, so a file
+    named ``segment_NNNNN.mp4`` is always complete.
+    """
+
+    def __init__(
+        self,
+        segment_dir: str,
+        fps: float,
+        frame_size: Tuple[int, int],
+        segment_frames: int,
+        first_segment: int = 0,
+        on_segment: Optional[Callable[[int, str, int, int], None]] = None,
+    ):
+        os.makedirs(segment_dir, exist_ok=True)
+        self.segment_dir = segment_dir
+        self.fps = fps
+        self.frame_size = frame_size
+        self.segment_frames = max(1, int(segment_frames))
+        self.segment_index = first_segment
+        self.on_segment = on_segment
+        self.segment_paths = [self.segment_path(idx) for idx in range(first_segment)]
+        self.writer: Optional["cv2.VideoWriter"] = None
+        self.frames_in_segment = 0
+
+    def segment_path(self, index: int) -> str:
+        return os.path.join(self.segment_dir, f"segment_{index:05d}.mp4")
+
+    def _part_path(self) -> str:
+        return os.path.join(self.segment_dir, f"segment_{self.segment_index:05d}.part.mp4")
+
+    def write(self, frame: np.ndarray) -> None:
+        if self.writer is None:
+            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+            self.writer = cv2.VideoWriter(
+                self._part_path(), fourcc, self.fps, self.frame_size
+            )
+            if not self.writer.isOpened():
+                raise IOError(f"Cannot create segment file: {self._part_path()}")
+            self.frames_in_segment = 0
+        self.writer.write(frame)
+        self.frames_in_segment += 1
+        if self.frames_in_segment >= self.segment_frames:
+            self._finalise()
+
+    def _finalise(self) -> None:
+        if self.writer is None:
+            return
+        self.writer.release()
+        self.writer = None
+        part_path = self._part_path()
+        final_path = self.segment_path(self.segment_index)
+        with open(part_path, "rb") as file:
+            os.fsync(file.fileno())
+        os.replace(part_path, final_path)
+        self.segment_paths.append(final_path)
+        if self.on_segment is not None:
+            self.on_segment(
+                self.segment_index,
+                final_path,
+                self.segment_index * self.segment_frames,
+                self.frames_in_segment,
+            )
+        self.segment_index += 1
+
+    def release(self) -> None:
+        self._finalise()
+
+
+# libx264 with yuv420p needs even dimensions, and crops such as 9:16 of 720p
+# are odd; MoviePy scales the same way when it encodes such frames.
+EVEN_SIZE_FILTER = "scale=trunc(iw/2)*2:trunc(ih/2)*2"
+
+
+def libx264_video_filter(video_filter: Optional[str] = None) -> str:
+    """``video_filter`` followed by the even-size scale libx264 needs."""
+
+    return f"{video_filter},{EVEN_SIZE_FILTER}" if video_filter else EVEN_SIZE_FILTER
+
+
+def streaming_marker_path(path: str) -> str:
+    """File that exists while ``path`` is still being written by a ``FragmentedMP4Writer``."""
+
+    return f"{path}.streaming"
+
+
+def begin_streaming_outputs(paths: Sequence[str]) -> None:
+    """Mark ``paths`` as streaming and remove earlier renders at those paths.
+
+    Call this as soon as a streaming render is accepted. Readers of ``/stream``
+    then wait for the new file instead of getting a 404 or the previous
+    render of the same video.
+    """
+
+    for path in paths:
+        with open(streaming_marker_path(path), "w", encoding="utf-8"):
+            pass
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def end_streaming_outputs(paths: Sequence[str]) -> None:
+    """Remove the streaming markers of ``paths``; readers stop waiting for more data."""
+
+    for path in paths:
+        if os.path.exists(streaming_marker_path(path)):
+            os.remove(streaming_marker_path(path))
+
+
+class FragmentedMP4Writer:
+    """Drop-in for ``cv2.VideoWriter`` that encodes fragmented MP4 through ffmpeg.
+
+    The file starts with an empty ``moov`` box and gains a self-contained
+    fragment at every keyframe (one per ``fragment_seconds``). A reader can
+    therefore play everything written so far while frames are still arriving.
+    ``streaming_marker_path`` exists until the last fragment is on disk.
+    ``audio_path`` is muxed in as the video is encoded. ``video_filter``, such
+    as a libass subtitle burn-in, runs inside the encoder. ``encoder_args``
+    are passed to libx264 as they are.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fps: float,
+        frame_size: Tuple[int, int],
+        audio_path: Optional[str] = None,
+        video_filter: Optional[str] = None,
+        fragment_seconds: float = 1.0,
+        encoder_args: Sequence[str] = (),
+    ):
+        ffmpeg = find_ffmpeg()
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg is required for streaming output.")
+        self.path = path
+        width, height = frame_size
+        keyframe_interval = max(1, int(round(fps * fragment_seconds)))
+        command = [
+            ffmpeg,
+            "-v",
+            "error",
+            "-nostdin",
+            "-y",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "bgr24",
+            "-s",
+            f"{width}x{height}",
+            "-r",
+            f"{fps:.6f}",
+            "-i",
+            "-",
+        ]
+        if audio_path:
+            command += ["-i", audio_path, "-map", "0:v", "-map", "1:a", "-c:a", "aac", "-shortest"]
+        command += [
+            "-vf",
+            libx264_video_filter(video_filter),
+            "-c:v",
+            "libx264",
+            "-pix_fmt",
+            "yuv420p",
+            "-g",
+            str(keyframe_interval),
+            *encoder_args,
+            "-movflags",
+            "+frag_keyframe+empty_moov+default_base_moof",
+            "-flush_packets",
+            "1",  # Hand each fragment to readers now, not when the I/O buffer fills
+            "-f",
+            "mp4",
+            path,
+        ]
+        # Readers must not mistake an earlier render for this one
+        begin_streaming_outputs([path])
+        self.errors = tempfile.TemporaryFile()
+        self.process: Optional[subprocess.Popen] = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stderr=self.errors
+        )
+
+    def isOpened(self) -> bool:  # noqa: N802 - mirrors cv2.VideoWriter
+        return self.process is not None and self.process.poll() is None
+
+    def write(self, frame: np.ndarray) -> None:
+        try:
+            self.process.stdin.write(np.ascontiguousarray(frame).data)
+        except (BrokenPipeError, OSError) as exc:
+            raise IOError(f"ffmpeg stopped writing {self.path}: {self._error_text()}") from exc
+
+    def _error_text(self) -> str:
+        self.errors.seek(0)
+        return self.errors.read().decode("utf-8", "replace").strip()
+
+    def release(self) -> None:
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        try:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+            if process.wait() != 0:
+                raise IOError(f"ffmpeg failed to write {self.path}: {self._error_text()}")
+        finally:
+            self.errors.close()
+            end_streaming_outputs([self.path])
+
+
+def encode_final_video(
+    video_path: str,
+    output_path: str,
+    video_filter: Optional[str] = None,
+    audio_path: Optional[str] = None,
+    encoder_args: Sequence[str] = (),
+) -> None:
+    """Re-encode a silent render to H.264 with ffmpeg, muxing ``audio_path`` if given."""
+
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg is required to encode the final video.")
+    command = [ffmpeg, "-v", "error", "-nostdin", "-y", "-i", video_path]
+    if audio_path:
+        command += ["-i", audio_path, "-map", "0:v", "-map", "1:a", "-c:a", "aac", "-shortest"]
+    command += [
+        "-vf",
+        libx264_video_filter(video_filter),
+        "-c:v",
+        "libx264",
+        "-pix_fmt",
+        "yuv420p",
+        *encoder_args,
+    ]
+    if not audio_path:
+        command.append("-an")
+    command.append(output_path)
+    subprocess.run(command, check=True)
+
+
+def concat_video_segments(segment_paths: Sequence[str], output_path: str) -> None:
+    """Join segment files into ``output_path`` without re-encoding."""
+
+    if not segment_paths:
+        raise RuntimeError("No rendered segments to concatenate.")
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg is required to join rendered segments.")
+    list_path = f"{output_path}.segments.txt"
+    with open(list_path, "w", encoding="utf-8") as file:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            file.write(f"file '{escaped}'\n")
+    try:
+        subprocess.run(
+            [
+                ffmpeg,
+                "-v",
+                "error",
+                "-nostdin",
+                "-y",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                list_path,
+                "-c",
+                "copy",
+                output_path,
+            ],
+            check=True,
+        )
+    finally:
+        os.remove(list_path)
+
+
+# (clip path, source frame index, decoded frame, already scaled to the canvas)
+OverlayFrame = Tuple[str, int, np.ndarray, bool]
+
+
+def composite_output_frame(
+    frame: np.ndarray,
+    output: Dict[str, object],
+    overlay: Optional[OverlayFrame],
+    current_time: float,
+    transcript: List[Dict[str, float]],
+    highlight_ranges_for_words: List[Tuple[int, int]],
+    subtitle_segments: Optional[List[Tuple[int, int]]],
+    custom_subtitles: Optional[List[str]],
+) -> None:
+    """Paste ``overlay`` and draw the subtitles on one output's frame, in place.
+
+    Scaled overlay frames are cached in ``output["overlays"]`` per clip, so a
+    held overlay frame is resized only once. An output whose ``design`` is
+    ``None`` gets no subtitles.
+    """
+
+    width, height = output["size"]
+    if overlay is not None:
+        clip_path, source_frame, overlay_frame, prescaled = overlay
+        if not prescaled:
+            aspect_ratio = output["aspect_ratio"]
+            scaled = output["overlays"].setdefault(clip_path, [None, None])
+            if scaled[0] != source_frame:
+                cropped_overlay = crop_to_aspect_ratio(overlay_frame, target_ratio=aspect_ratio)
+                scaled[1] = resize_overlay_for_canvas(
+                    cropped_overlay,
+                    canvas_width=width,
+                    canvas_height=height,
+                    aspect_ratio=aspect_ratio,
+                    dst=scaled[1],
+                )
+                scaled[0] = source_frame
+            overlay_frame = scaled[1]
+        overlay_h, overlay_w = overlay_frame.shape[:2]
+        x_start = (width - overlay_w) // 2
+        y_start = (height - overlay_h) // 2
+        frame[
+            y_start : y_start + overlay_h,
+            x_start : x_start + overlay_w,
+        ] = overlay_frame
+
+    if output["design"] is None:
+        return  # Subtitles are burned in by ffmpeg after the video pass
+    draw_subtitle_on_frame(
+        frame,
+        transcript,
+        current_time,
+        output["design"],
+        highlight_ranges_for_words,
+        subtitle_segments=subtitle_segments,
+        custom_subtitles=custom_subtitles,
+        layout_cache=output["layout_cache"],
+        in_place=True,
+    )
+
+
+# (clip path, source frame index, slot frame holding it, height, width)
+OverlayPayload = Tuple[str, int, int, int, int]
+
+
+def composite_ring_frame(
+    views: List[np.ndarray],
+    frame_index: int,
+    payload: Optional[OverlayPayload],
+    state: Dict[str, object],
+    spec: Dict[str, object],
+) -> None:
+    """``frame_ring`` handler run in compositor processes.
+
+    The parent decodes the overlay frame scheduled for ``frame_index`` into
+    the top-left corner of one of the slot's frames, and ``payload`` says
+    which one and how big it is. Only the scaled copy of the current clip is
+    kept per output.
+    """
+
+    if "outputs" not in state:
+        state["outputs"] = [
+            dict(output, overlays={}, layout_cache={}) for output in spec["outputs"]
+        ]
+    overlay: Optional[OverlayFrame] = None
+    if payload is not None:
+        clip_path, source_frame, view_index, height, width = payload
+        overlay = (clip_path, source_frame, views[view_index][:height, :width], False)
+        for output in state["outputs"]:
+            if clip_path not in output["overlays"]:
+                output["overlays"].clear()
+
+    for frame, output in zip(views, state["outputs"]):
+        composite_output_frame(
+            frame,
+            output,
+            overlay,
+            frame_index / spec["fps"],
+            spec["transcript"],
+            spec["highlight_ranges"],
+            spec["subtitle_segments"],
+            spec["custom_subtitles"],
+        )
 
 
 def process_video_with_overlays(
@@ -969,22 +2472,102 @@ def process_video_with_overlays(
     output_path: str,
     subtitle_segments: Optional[List[Tuple[int, int]]] = None,
     custom_subtitles: Optional[List[str]] = None,
+    decode_backend: str = "opencv",
+    checkpoint: Optional[RenderCheckpoint] = None,
+    target_aspect_ratio: float = 4.0 / 5.0,
+    extra_outputs: Optional[Sequence[OutputVariant]] = None,
+    workers: int = 1,
+    draw_subtitles: bool = True,
+    streaming: Optional[StreamingEncode] = None,
+    progress: Optional[RenderProgress] = None,
+    ring_slots: Optional[int] = None,
 ) -> None:
-    """Stream through the video, overlay clips, and draw subtitles."""
+    """Stream through the video, overlay clips, and draw subtitles.
+
+    ``decode_backend="ffmpeg"`` decodes the main video and overlays through
+    ffmpeg pipes that crop and scale inside the decoder. With a ``checkpoint``
+    the output is encoded in segments, starting after the segments an earlier
+    run already finished, and joined into ``output_path`` at the end.
+
+    Each of ``extra_outputs`` gets its own crop, overlay scaling, subtitle
+    layout and encoder, but the main video and overlays are decoded only once
+    for all of them.
+
+    With ``workers > 1`` overlays and subtitles are drawn by that many
+    processes on frames in a shared-memory ring (see ``frame_ring``), while
+    this process decodes, schedules overlays and encodes. ``ring_slots``
+    overrides how many frames may be in flight between them.
+
+    ``draw_subtitles=False`` leaves the subtitles to a later libass pass (see
+    ``write_subtitle_tracks``). With ``streaming`` every output is encoded to
+    fragmented MP4 by ffmpeg as frames arrive (see ``FragmentedMP4Writer``).
+    ``progress`` is told about every encoded frame of the main output (see
+    ``render_progress``).
+    """
+
+    if decode_backend not in DECODE_BACKENDS:
+        raise ValueError(
+            f"Unknown decode backend '{decode_backend}'. Use one of {DECODE_BACKENDS}."
+        )
+    if streaming is not None and checkpoint is not None:
+        raise ValueError("Streaming outputs are written in one pass and cannot be checkpointed.")
+    if decode_backend == "ffmpeg" and find_ffmpeg() is None:
+        print("[warn] ffmpeg not found; falling back to the OpenCV decode backend.")
+        decode_backend = "opencv"
 
     cap = cv2.VideoCapture(main_video_path)
 
     if not cap.isOpened():
         raise IOError(f"Cannot open main video: {main_video_path}")
 
-    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
-    source_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
-    source_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+    metadata = get_media_metadata(main_video_path)
+    fps = metadata.fps or cap.get(cv2.CAP_PROP_FPS) or 25.0
+    # Decoders apply the rotation flag, so frames arrive in display orientation.
+    source_width, source_height = metadata.display_size
+    if not metadata.has_video:
+        source_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+        source_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
 
-    target_aspect_ratio = 4.0 / 5.0
-    width, height = compute_cropped_dimensions(
-        source_width, source_height, target_aspect_ratio
-    )
+    outputs: List[Dict[str, object]] = [
+        {"aspect_ratio": target_aspect_ratio, "path": output_path, "design": subtitle_design}
+    ]
+    for variant in extra_outputs or ():
+        outputs.append(
+            {
+                "aspect_ratio": parse_aspect_ratio(variant.aspect_ratio),
+                "path": variant.output_path,
+                "design": variant.subtitle_design or subtitle_design,
+            }
+        )
+    for output in outputs:
+        output["size"] = compute_cropped_dimensions(
+            source_width, source_height, output["aspect_ratio"]
+        )
+        output["canvas"] = None
+        output["overlays"] = {}  # Clip path -> [source frame, overlay scaled for this output]
+        output["layout_cache"] = {}
+        if not draw_subtitles:
+            output["design"] = None
+    width, height = outputs[0]["size"]
+    multi_output = len(outputs) > 1
+    workers = max(1, int(workers))
+
+    if decode_backend == "ffmpeg":
+        cap.release()
+        # The smallest centred box that holds every output's crop
+        decode_width = max(output["size"][0] for output in outputs)
+        decode_height = max(output["size"][1] for output in outputs)
+        cap = FFmpegFrameReader(
+            main_video_path,
+            (decode_width, decode_height),
+            crop_box=(
+                decode_width,
+                decode_height,
+                max((source_width - decode_width) // 2, 0),
+                max((source_height - decode_height) // 2, 0),
+            ),
+            fps=fps,
+        )
 
     segment_clip_paths: List[Optional[str]] = []
     clip_state: Dict[str, Dict[str, object]] = {}
@@ -998,30 +2581,73 @@ def process_video_with_overlays(
             continue
         if not os.path.exists(clip_path):
             raise FileNotFoundError(f"Overlay clip not found: {clip_path}")
-        overlay_capture = cv2.VideoCapture(clip_path)
-        if not overlay_capture.isOpened():
-            raise IOError(f"Cannot open overlay clip: {clip_path}")
-        total_frames = int(overlay_capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        # Several outputs share one overlay decode, so frames are scaled per
+        # output; with workers the parent decodes and compositors scale.
+        overlay_reader, overlay_prescaled = open_overlay_reader(
+            clip_path,
+            width,
+            height,
+            target_aspect_ratio,
+            fps,
+            "opencv" if multi_output or workers > 1 else decode_backend,
+        )
+        total_frames = overlay_reader.frame_count
         clip_state[clip_path] = {
-            "capture": overlay_capture,
+            "path": clip_path,
+            "capture": overlay_reader,
+            "prescaled": overlay_prescaled,
+            "frame_buffer": None,
+            "shown_frame": None,  # Source index currently held in frame_buffer
             "total_frames": total_frames,
-            "fps": overlay_capture.get(cv2.CAP_PROP_FPS) or fps,
-            "next_frame": 0,
+            "fps": overlay_reader.fps,
+            "duration": total_frames / overlay_reader.fps,
+            "clip_start_time": 0.0,  # Clip time at the first frame of this segment
+            "segment_start_frame": 0,
+            "last_active_frame": 0,
+            "speed": 1.0,
             "current_segment_index": None,
             "current_subtitle_index": None,
             "last_segment_index": None,
             "last_subtitle_index": None,
-            "continuation_pending": False,
-            "needs_seek": True,
-            "seek_frame": 0,
-            "frames_to_drop": 0,
             "finished": total_frames <= 0,
         }
 
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-    if not writer.isOpened():
-        raise IOError(f"Cannot create output file: {output_path}")
+    resume_frame = 0
+    if checkpoint is not None:
+        resume_frame = checkpoint.completed_segments * checkpoint.segment_frames
+    for output_index, output in enumerate(outputs):
+        if streaming is not None:
+            video_filters = streaming.video_filters
+            output["writer"] = FragmentedMP4Writer(
+                output["path"],
+                fps,
+                output["size"],
+                audio_path=streaming.audio_path,
+                video_filter=video_filters[output_index]
+                if output_index < len(video_filters)
+                else None,
+                fragment_seconds=streaming.fragment_seconds,
+                encoder_args=streaming.encoder_args,
+            )
+        elif checkpoint is not None:
+            # All writers cut segments on the same frames; a segment is
+            # reported durable once the last output has finalised it too.
+            is_last = output_index == len(outputs) - 1
+            output["writer"] = SegmentedVideoWriter(
+                checkpoint.segment_dir
+                if output_index == 0
+                else os.path.join(checkpoint.segment_dir, f"output_{output_index}"),
+                fps,
+                output["size"],
+                checkpoint.segment_frames,
+                first_segment=checkpoint.completed_segments,
+                on_segment=checkpoint.on_segment if is_last else None,
+            )
+        else:
+            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+            output["writer"] = cv2.VideoWriter(output["path"], fourcc, fps, output["size"])
+            if not output["writer"].isOpened():
+                raise IOError(f"Cannot create output file: {output['path']}")
 
     highlight_frame_ranges: List[List[int]] = []
     highlight_subtitle_indices: List[Optional[int]] = []
@@ -1076,198 +2702,929 @@ def process_video_with_overlays(
             adjusted_curr_start = max(curr_start, prev_range[1] + 1)
             curr_range[0] = min(adjusted_curr_start, curr_range[1])
 
-    frame_index = 0
-    highlight_ranges_for_words = [
-        (seg["start_word"], seg["end_word"]) for seg in highlight_segments
-    ]
+    segment_frame_spans: Dict[int, Tuple[int, int]] = {
+        seg_idx: (start_f, end_f) for start_f, end_f, seg_idx in highlight_frame_ranges
+    }
+
+    # An overlay's decoder and frame buffers are released once the schedule has
+    # passed the clip's last frame, rather than all being held to the end.
+    clip_last_frames: Dict[str, int] = {}
+    for start_f, end_f, seg_idx in highlight_frame_ranges:
+        clip_path = segment_clip_paths[seg_idx]
+        if clip_path:
+            clip_last_frames[clip_path] = max(end_f, clip_last_frames.get(clip_path, end_f))
+    clips_ending: Dict[int, List[str]] = {}
+    for clip_path, last_frame in clip_last_frames.items():
+        clips_ending.setdefault(last_frame, []).append(clip_path)
+
+    def release_finished_overlays(frame_index: int) -> None:
+        for clip_path in clips_ending.pop(frame_index, ()):
+            clip_info = clip_state.get(clip_path)
+            if clip_info is None:
+                continue
+            clip_info["capture"].release()
+            clip_info["frame_buffer"] = None
+            for output in outputs:
+                output["overlays"].pop(clip_path, None)
+
+    def schedule_overlay(frame_index: int) -> Optional[Tuple[Dict[str, object], int]]:
+        """Advance the overlay state to ``frame_index`` and return (clip, source frame)."""
+
+        active_overlay_index: Optional[int] = None
+        for start_f, end_f, seg_idx in highlight_frame_ranges:
+            if start_f <= frame_index <= end_f:
+                active_overlay_index = seg_idx
+                break
+        if active_overlay_index is None:
+            return None
+        clip_path = segment_clip_paths[active_overlay_index]
+        if not clip_path:
+            return None
+        clip_info = clip_state.get(clip_path)
+        if clip_info is None:
+            return None
+
+        current_subtitle_index = highlight_subtitle_indices[active_overlay_index]
+        current_segment_index = clip_info.get("current_segment_index")
+        if current_segment_index != active_overlay_index:
+            if current_segment_index is not None:
+                clip_info["last_segment_index"] = current_segment_index
+            if clip_info.get("current_subtitle_index") is not None:
+                clip_info["last_subtitle_index"] = clip_info["current_subtitle_index"]
+            prev_segment_index = clip_info.get("last_segment_index")
+            prev_subtitle_index = clip_info.get("last_subtitle_index")
+            if subtitle_segments:
+                should_continue = (
+                    prev_subtitle_index is not None
+                    and current_subtitle_index is not None
+                    and current_subtitle_index == prev_subtitle_index + 1
+                )
+            else:
+                should_continue = (
+                    prev_segment_index is not None
+                    and active_overlay_index == prev_segment_index + 1
+                )
+            # Overlays are sampled by time: each output frame maps to the
+            # source frame on screen at that point of the clip, so clips whose
+            # fps differs from the main video play at their real speed.
+            if should_continue:
+                clip_info["clip_start_time"] = clip_info["clip_start_time"] + (
+                    clip_info["last_active_frame"] + 1 - clip_info["segment_start_frame"]
+                ) * clip_info["speed"] / fps
+            else:
+                clip_info["clip_start_time"] = 0.0
+            clip_info["segment_start_frame"] = frame_index
+            clip_info["speed"] = 1.0
+            if highlight_segments[active_overlay_index].get("fit_to_segment"):
+                span_start, span_end = segment_frame_spans[active_overlay_index]
+                remaining = clip_info["duration"] - clip_info["clip_start_time"]
+                span_frames = span_end - frame_index + 1
+                if remaining > 0 and span_frames > 0:
+                    clip_info["speed"] = remaining * fps / span_frames
+            clip_info["finished"] = clip_info["total_frames"] <= 0
+            clip_info["current_segment_index"] = active_overlay_index
+            clip_info["current_subtitle_index"] = current_subtitle_index
+        else:
+            clip_info["current_subtitle_index"] = current_subtitle_index
+
+        clip_info["last_active_frame"] = frame_index
+        clip_time = clip_info["clip_start_time"] + (
+            frame_index - clip_info["segment_start_frame"]
+        ) * clip_info["speed"] / fps
+        source_frame = clip_info["capture"].frame_at_time(clip_time)
+        if source_frame >= clip_info["total_frames"]:
+            clip_info["finished"] = True
+        return clip_info, source_frame
+
+    def decode_overlay(clip_info: Dict[str, object], source_frame: int) -> None:
+        """Hold ``source_frame`` of the clip in its frame buffer."""
+
+        if clip_info["finished"] or source_frame == clip_info["shown_frame"]:
+            return
+        # Frames between the last shown one and the target are skipped with
+        # grab() (or a keyframe jump) inside seek, and a held frame is not
+        # decoded again at all.
+        overlay_cap = clip_info["capture"]
+        ret_o = overlay_cap.seek(source_frame)
+        if ret_o:
+            ret_o, overlay_frame = overlay_cap.read(clip_info["frame_buffer"])
+        if not ret_o:
+            clip_info["finished"] = True
+        else:
+            clip_info["frame_buffer"] = overlay_frame
+            clip_info["shown_frame"] = source_frame
+
+    # Resuming: replay the (decode-free) overlay schedule up to the first
+    # frame still to render, then position the main video there.
+    for skipped_index in range(resume_frame):
+        schedule_overlay(skipped_index)
+        release_finished_overlays(skipped_index)
+    if resume_frame > 0:
+        seek_main_video(cap, main_video_path, resume_frame)
+
+    frame_index = resume_frame
+    if progress is not None:
+        total_frames = metadata.frame_count or int(round(metadata.duration * fps))
+        progress.set_stage("video", total_frames=total_frames, frames_done=resume_frame)
+    highlight_ranges_for_words = [
+        (seg["start_word"], seg["end_word"]) for seg in highlight_segments
+    ]
+
+    # Frame-sized buffers are allocated on the first frame and reused for the
+    # rest of the render: the decoder writes into ``decode_buffer``, each
+    # output's crop is copied once into its contiguous ``canvas`` and
+    # everything after that (overlay, subtitles, encoder input) works on the
+    # canvas in place. Only the last output may draw on the decode buffer.
+    decode_buffer: Optional[np.ndarray] = None
+
+    if workers > 1:
+        ring_spec = {
+            "outputs": [
+                {key: output[key] for key in ("aspect_ratio", "size", "design")}
+                for output in outputs
+            ],
+            "fps": fps,
+            "transcript": transcript,
+            "highlight_ranges": highlight_ranges_for_words,
+            "subtitle_segments": subtitle_segments,
+            "custom_subtitles": custom_subtitles,
+        }
+
+        def encode_slot(views: List[np.ndarray]) -> None:
+            for output, view in zip(outputs, views):
+                output["writer"].write(view)
+            if progress is not None:
+                progress.frame_done(views[0])
+
+        # One output decoded at its final size goes straight into the slot
+        decode_in_slot = not multi_output and isinstance(cap, FFmpegFrameReader)
+        frame_shapes = [(size[1], size[0], 3) for size in (output["size"] for output in outputs)]
+        overlay_view = len(frame_shapes)
+        if clip_state:
+            # Overlay clips are decoded once, here, into an extra frame of the
+            # slot that fits the largest clip in either orientation
+            overlay_dims = []
+            for clip_path, clip_info in clip_state.items():
+                capture = clip_info["capture"].capture
+                clip_width, clip_height = get_media_metadata(clip_path).display_size
+                overlay_dims.append((clip_width, clip_height))
+                overlay_dims.append(
+                    (
+                        int(capture.get(cv2.CAP_PROP_FRAME_WIDTH) or 0),
+                        int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0),
+                    )
+                )
+            frame_shapes.append(
+                (
+                    max(1, max(dims[1] for dims in overlay_dims)),
+                    max(1, max(dims[0] for dims in overlay_dims)),
+                    3,
+                )
+            )
+        with FramePipeline(
+            frame_shapes,
+            workers,
+            composite_ring_frame,
+            (ring_spec,),
+            on_frame=encode_slot,
+            first_frame=resume_frame,
+            slot_count=ring_slots,
+        ) as pipeline:
+            while True:
+                slot = pipeline.acquire()
+                views = pipeline.views(slot)
+                ret, decoded = cap.read(views[0] if decode_in_slot else decode_buffer)
+                if not ret:
+                    pipeline.release(slot)
+                    break
+                if decoded is not views[0]:
+                    decode_buffer = decoded
+                    for output, view in zip(outputs, views):
+                        np.copyto(view, crop_to_aspect_ratio(decoded, output["aspect_ratio"]))
+                payload: Optional[OverlayPayload] = None
+                scheduled = schedule_overlay(frame_index)
+                if scheduled is not None:
+                    clip_info, source_frame = scheduled
+                    decode_overlay(clip_info, source_frame)
+                    if not clip_info["finished"] and clip_info["shown_frame"] is not None:
+                        held = clip_info["frame_buffer"]
+                        height, width = held.shape[:2]
+                        np.copyto(views[overlay_view][:height, :width], held)
+                        payload = (
+                            clip_info["path"],
+                            clip_info["shown_frame"],
+                            overlay_view,
+                            height,
+                            width,
+                        )
+                pipeline.submit(slot, frame_index, payload)
+                release_finished_overlays(frame_index)
+                frame_index += 1
+            pipeline.finish()
+    else:
+        while True:
+            ret, decoded = cap.read(decode_buffer)
+            if not ret:
+                break
+            decode_buffer = decoded
+
+            current_time = frame_index / fps
+            overlay: Optional[OverlayFrame] = None
+            scheduled = schedule_overlay(frame_index)
+            if scheduled is not None:
+                clip_info, source_frame = scheduled
+                decode_overlay(clip_info, source_frame)
+                if not clip_info["finished"] and clip_info["shown_frame"] is not None:
+                    overlay = (
+                        clip_info["path"],
+                        clip_info["shown_frame"],
+                        clip_info["frame_buffer"],
+                        clip_info["prescaled"],
+                    )
+
+            for output_index, output in enumerate(outputs):
+                cropped = crop_to_aspect_ratio(decoded, output["aspect_ratio"])
+                if cropped is decoded and output_index == len(outputs) - 1:
+                    frame = decoded
+                else:
+                    canvas = output["canvas"]
+                    if canvas is None or canvas.shape != cropped.shape:
+                        canvas = output["canvas"] = np.empty(cropped.shape, dtype=cropped.dtype)
+                    np.copyto(canvas, cropped)
+                    frame = canvas
+                composite_output_frame(
+                    frame,
+                    output,
+                    overlay,
+                    current_time,
+                    transcript,
+                    highlight_ranges_for_words,
+                    subtitle_segments,
+                    custom_subtitles,
+                )
+                output["writer"].write(frame)
+                if progress is not None and output_index == 0:
+                    progress.frame_done(frame)
+            release_finished_overlays(frame_index)
+            frame_index += 1
+
+    cap.release()
+    for clip_info in clip_state.values():
+        overlay_cap = clip_info.get("capture")
+        if overlay_cap is not None:
+            overlay_cap.release()
+    for output in outputs:
+        output["writer"].release()
+        if checkpoint is not None:
+            concat_video_segments(output["writer"].segment_paths, output["path"])
+
+
+# --------------------------------------------------------------------------- #
+# Subtitle tracks
+# --------------------------------------------------------------------------- #
+
+
+SUBTITLE_RENDERERS = ("python", "ass")
+SUBTITLE_SIDECAR_FORMATS = ("srt", "ass")
+
+
+def ffmpeg_has_filter(name: str) -> bool:
+    """Whether the available ffmpeg build includes the filter ``name``."""
+
+    available = FFMPEG_FILTER_CACHE.get(name)
+    if available is None:
+        available = False
+        ffmpeg = find_ffmpeg()
+        if ffmpeg is not None:
+            try:
+                listing = subprocess.run(
+                    [ffmpeg, "-hide_banner", "-filters"],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+            except (OSError, subprocess.CalledProcessError):
+                listing = ""
+            available = any(line.split()[1:2] == [name] for line in listing.splitlines())
+        FFMPEG_FILTER_CACHE[name] = available
+    return available
+
+
+def resolve_subtitle_renderer(renderer: str) -> str:
+    """Validate ``renderer`` and fall back to Python when ffmpeg lacks libass."""
+
+    if renderer not in SUBTITLE_RENDERERS:
+        raise ValueError(
+            f"Unknown subtitle renderer '{renderer}'. Use one of {SUBTITLE_RENDERERS}."
+        )
+    if renderer == "ass" and not ffmpeg_has_filter("subtitles"):
+        print("[warn] ffmpeg with libass not found; drawing subtitles in Python instead.")
+        return "python"
+    return renderer
+
+
+def truetype_line_height_ratio(font_path: str) -> Optional[float]:
+    """Line height per em that libass sizes ``font_path`` by, from its OS/2 table.
+
+    libass treats an ASS font size as usWinAscent + usWinDescent rather than
+    the em size PIL uses. Returns ``None`` when the tables are missing.
+    """
+
+    try:
+        with open(font_path, "rb") as file:
+            data = file.read()
+        table_count = struct.unpack(">H", data[4:6])[0]
+        offsets: Dict[bytes, int] = {}
+        for index in range(table_count):
+            record = 12 + 16 * index
+            tag, _, offset, _ = struct.unpack(">4sIII", data[record : record + 16])
+            offsets[tag] = offset
+        units_per_em = struct.unpack(">H", data[offsets[b"head"] + 18 : offsets[b"head"] + 20])[0]
+        win_ascent, win_descent = struct.unpack(
+            ">hh", data[offsets[b"OS/2"] + 74 : offsets[b"OS/2"] + 78]
+        )
+    except (OSError, KeyError, struct.error):
+        return None
+    if units_per_em <= 0 or win_ascent + win_descent <= 0:
+        return None
+    return (win_ascent + win_descent) / units_per_em
+
+
+def ass_style_for_design(design: SubtitleDesign, frame_size: Tuple[int, int]) -> AssStyle:
+    """Closest ASS style to ``design``.
+
+    ASS cannot express rounded box corners, a box shadow or the line spacing,
+    and pads the box by the same amount on every side (``margin_x``). Designs
+    that depend on those need the Python renderer. Highlighted words get
+    ``highlight_text_color`` through inline overrides and, on a box design,
+    ``highlight_color`` for the box behind them; that pill has square corners
+    and no ``highlight_padding``, and outline designs have no pill at all.
+    """
+
+    measurer = get_text_measurer(design)
+    if measurer.use_pil_font:
+        family, style_name = measurer.pil_font.getname()
+        font_name = family if style_name in (None, "Regular") else f"{family} {style_name}"
+        ratio = truetype_line_height_ratio(design.font_path)
+        if ratio is not None:
+            font_size = round(design.font_size_px * ratio, 2)
+        else:
+            font_size = float(measurer.default_line_height)
+        outline = 0.0
+    else:
+        font_name = "Sans"
+        font_size = float(measurer.measure_word("Ag")[1])
+        outline = max(0.0, (design.outline_thickness - design.text_thickness) / 2.0)
+    width = frame_size[0]
+    side_margin = max(0, int(width * (1.0 - design.max_line_width_ratio) / 2))
+    style = AssStyle(
+        font_name=font_name,
+        font_size=font_size,
+        primary_colour=tuple(design.text_color),
+        outline_colour=tuple(design.outline_color),
+        bold=not measurer.use_pil_font and design.text_thickness >= 2,
+        border_style=ASS_BORDER_OUTLINE,
+        outline=outline if design.outline_thickness > 0 else 0.0,
+        margin_l=side_margin,
+        margin_r=side_margin,
+        margin_v=int(design.bottom_margin),
+        highlight_text_colour=tuple(design.highlight_text_color),
+    )
+    if design.bar_opacity > 0:
+        style.border_style = ASS_BORDER_BOX
+        style.outline_colour = tuple(design.bar_color)
+        style.outline_opacity = float(design.bar_opacity)
+        style.outline = float(max(0, getattr(design, "margin_x", design.margin)))
+        style.highlight_box_colour = tuple(design.highlight_color)
+    return style
+
+
+def subtitle_events(
+    transcript: List[Dict[str, float]],
+    subtitle_segments: Optional[List[Tuple[int, int]]],
+    custom_subtitles: Optional[List[str]],
+    design: SubtitleDesign,
+    frame_size: Tuple[int, int],
+    duration: float,
+    text_inset: int = 0,
+    highlight_ranges: Sequence[Tuple[int, int]] = (),
+) -> List[SubtitleEvent]:
+    """Resolve subtitle segments into timed, wrapped events.
+
+    Lines break exactly where ``draw_subtitle_on_frame`` breaks them, and each
+    event lasts until the next one starts, as on the Python-rendered frames.
+    ``margin_v`` puts the text ``text_inset`` pixels above where the Python
+    renderer puts the bottom of its box. Words inside ``highlight_ranges``
+    are flagged in ``highlighted`` for the ASS writer to recolour.
+    """
+
+    if not transcript or not subtitle_segments:
+        return []
+    measurer = get_text_measurer(design)
+    width, height = frame_size
+    events: List[SubtitleEvent] = []
+    for index, (seg_start, seg_end) in enumerate(subtitle_segments):
+        start = transcript[seg_start]["start_time"]
+        if index + 1 < len(subtitle_segments):
+            end = transcript[subtitle_segments[index + 1][0]]["start_time"]
+        else:
+            end = max(duration, transcript[seg_end]["end_time"])
+        if end <= start:
+            continue
+        layout = compute_subtitle_layout(
+            build_subtitle_word_entries(
+                measurer,
+                [(idx, transcript[idx]["word"]) for idx in range(seg_start, seg_end + 1)],
+                list(highlight_ranges),
+                subtitle_segments,
+                custom_subtitles,
+                index,
+            ),
+            measurer,
+            width,
+            height,
+            design,
+        )
+        if layout is None:
+            continue
+        box_gap = height - (layout["box_top"] + layout["box_height"])
+        events.append(
+            SubtitleEvent(
+                start=start,
+                end=end,
+                lines=[" ".join(word["word"] for word in line["words"]) for line in layout["lines"]],
+                margin_v=box_gap + text_inset,
+                highlighted=[
+                    [bool(word["is_highlighted"]) for word in line["words"]]
+                    for line in layout["lines"]
+                ],
+            )
+        )
+    return events
+
+
+def burn_track_path(output_path: str) -> str:
+    """Where the ASS track burned into ``output_path`` is kept during the render."""
+
+    return f"{os.path.splitext(output_path)[0]}.burn.ass"
+
+
+def write_subtitle_tracks(
+    config: ProjectConfig,
+    variants: Sequence[OutputVariant],
+    transcript: List[Dict[str, float]],
+    subtitle_segments: Optional[List[Tuple[int, int]]],
+    custom_subtitles: Optional[List[str]],
+    burn: bool,
+    highlight_ranges: Sequence[Tuple[int, int]] = (),
+) -> Tuple[List[str], List[Optional[str]]]:
+    """Write ``config.subtitle_sidecars`` next to every deliverable.
+
+    With ``burn`` an ASS track is also written for each output (see
+    ``burn_track_path``). Returns the sidecar paths and, per output, the
+    ffmpeg video filter that burns its track in (``None`` without ``burn``).
+    """
+
+    formats = [fmt for fmt in config.subtitle_sidecars if fmt in SUBTITLE_SIDECAR_FORMATS]
+    if not formats and not burn:
+        return [], [None] * len(variants)
+    metadata = get_media_metadata(config.main_video_path)
+    source_width, source_height = metadata.display_size
+    sidecar_paths: List[str] = []
+    video_filters: List[Optional[str]] = []
+    for variant in variants:
+        design = variant.subtitle_design or config.subtitle_design
+        frame_size = compute_cropped_dimensions(
+            source_width, source_height, parse_aspect_ratio(variant.aspect_ratio)
+        )
+        style = ass_style_for_design(design, frame_size)
+        text_inset = (
+            style.outline
+            if style.border_style == ASS_BORDER_BOX
+            else getattr(design, "margin_y", design.margin)
+        )
+        events = subtitle_events(
+            transcript,
+            subtitle_segments,
+            custom_subtitles,
+            design,
+            frame_size,
+            metadata.duration,
+            int(round(text_inset)),
+            highlight_ranges,
+        )
+        root = os.path.splitext(variant.output_path)[0]
+        for fmt in formats:
+            path = f"{root}.{fmt}"
+            if fmt == "srt":
+                write_srt(path, events)
+            else:
+                write_ass(path, events, style, frame_size)
+            sidecar_paths.append(path)
+        video_filter: Optional[str] = None
+        if burn:
+            track_path = burn_track_path(variant.output_path)
+            write_ass(track_path, events, style, frame_size)
+            fonts_dir = None
+            if design.font_path and os.path.exists(design.font_path):
+                fonts_dir = os.path.dirname(os.path.abspath(design.font_path))
+            video_filter = subtitles_filter(os.path.abspath(track_path), fonts_dir)
+        video_filters.append(video_filter)
+    return sidecar_paths, video_filters
+
+
+def burn_subtitle_track(
+    video_path: str, video_filter: str, output_path: str, encoder_args: Sequence[str] = ()
+) -> None:
+    """Re-encode ``video_path`` into ``output_path`` with libass drawing the subtitles."""
+
+    if find_ffmpeg() is None:
+        raise RuntimeError("ffmpeg is required to burn in subtitles.")
+    encode_final_video(video_path, output_path, video_filter, encoder_args=encoder_args)
+
+
+# --------------------------------------------------------------------------- #
+# Audio mixing
+# --------------------------------------------------------------------------- #
+
+
+DUCKING_SOURCES = ("auto", "audio", "transcript")
+DUCKING_FRAME_SECONDS = 0.01  # Resolution of the speech envelope and gain curve
+DUCKING_ANALYSIS_RATE = 8000  # Hz; plenty to measure speech energy
+SPEECH_FLOOR_DB = -45.0  # Frames quieter than this never count as speech
+SPEECH_RELATIVE_DB = 20.0  # Frames this far below the loud (95th percentile) level are pauses
+
+
+def decode_audio_rms(
+    path: str, frame_seconds: float = DUCKING_FRAME_SECONDS
+) -> Optional[np.ndarray]:
+    """Return the RMS level of every ``frame_seconds`` block of ``path``'s audio.
+
+    Mono PCM is streamed from ffmpeg a minute at a time, so an hour-long file
+    never has to fit in memory. Returns ``None`` without ffmpeg or audio.
+    """
+
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        return None
+    frame_samples = max(1, int(round(DUCKING_ANALYSIS_RATE * frame_seconds)))
+    read_bytes = frame_samples * 4 * int(round(60.0 / frame_seconds))
+    process = subprocess.Popen(
+        [
+            ffmpeg,
+            "-v",
+            "error",
+            "-nostdin",
+            "-i",
+            path,
+            "-map",
+            "0:a:0",
+            "-vn",
+            "-ac",
+            "1",
+            "-ar",
+            str(DUCKING_ANALYSIS_RATE),
+            "-f",
+            "f32le",
+            "pipe:1",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    levels: List[np.ndarray] = []
+    try:
+        while True:
+            data = process.stdout.read(read_bytes)
+            if not data:
+                break
+            samples = np.frombuffer(data[: len(data) - len(data) % 4], dtype="<f4")
+            padding = (-len(samples)) % frame_samples  # Only the last read is short
+            if padding:
+                samples = np.concatenate([samples, np.zeros(padding, dtype=np.float32)])
+            blocks = samples.reshape(-1, frame_samples)
+            levels.append(np.sqrt(np.mean(np.square(blocks), axis=1)))
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+    if returncode != 0 or not levels:
+        return None
+    return np.concatenate(levels)
+
+
+def speech_mask_from_levels(levels: np.ndarray) -> np.ndarray:
+    """Mark envelope frames loud enough, relative to the whole file, to be speech."""
+
+    decibels = 20.0 * np.log10(levels + 1e-10)
+    threshold = max(SPEECH_FLOOR_DB, float(np.percentile(decibels, 95)) - SPEECH_RELATIVE_DB)
+    return decibels > threshold
+
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+def speech_mask_from_transcript(
+    transcript: List[Dict[str, float]],
+    duration: float,
+    frame_seconds: float = DUCKING_FRAME_SECONDS,
+) -> np.ndarray:
+    """Mark envelope frames covered by a transcript word."""
 
-        frame = crop_to_aspect_ratio(frame, target_aspect_ratio)
+    frame_count = max(1, int(math.ceil(duration / frame_seconds)))
+    if not transcript:
+        return np.zeros(frame_count, dtype=bool)
+    starts = np.array([word["start_time"] for word in transcript], dtype=np.float64)
+    ends = np.array([word["end_time"] for word in transcript], dtype=np.float64)
+    start_frames = np.clip(np.floor(starts / frame_seconds).astype(np.int64), 0, frame_count)
+    end_frames = np.clip(np.ceil(ends / frame_seconds).astype(np.int64), 0, frame_count)
+    # +1 where a word starts, -1 where it ends; a running sum > 0 means "inside a word"
+    edges = np.zeros(frame_count + 1, dtype=np.int64)
+    np.add.at(edges, start_frames, 1)
+    np.add.at(edges, end_frames, -1)
+    return np.cumsum(edges)[:frame_count] > 0
+
+
+def ducking_gain_curve(
+    speech: np.ndarray, ducking: MusicDucking, frame_seconds: float = DUCKING_FRAME_SECONDS
+) -> np.ndarray:
+    """Turn a speech mask into a music gain curve with linear attack/release ramps.
+
+    Instead of running a recursive envelope follower sample by sample, every
+    frame's distance to the previous and the next speech frame is found with
+    running max/min scans. The ramps are then plain arithmetic on those
+    distances. The attack looks ahead, which an offline mix can afford, so the
+    music is already down when the first word starts.
+    """
+
+    frame_count = len(speech)
+    if frame_count == 0 or not speech.any():
+        return np.ones(frame_count, dtype=np.float32)
+    index = np.arange(frame_count)
+    last_speech = np.maximum.accumulate(np.where(speech, index, -1))
+    next_speech = np.minimum.accumulate(np.where(speech, index, frame_count * 4)[::-1])[::-1]
+    since = np.where(last_speech >= 0, index - last_speech, np.inf)
+    until = np.where(next_speech < frame_count * 4, next_speech - index, np.inf)
+
+    release_frames = max(1.0, ducking.release / frame_seconds)
+    attack_frames = max(1.0, ducking.attack / frame_seconds)
+    duck = np.maximum(
+        np.clip(1.0 - since / release_frames, 0.0, 1.0),
+        np.clip(1.0 - until / attack_frames, 0.0, 1.0),
+    )
+    return (1.0 - (1.0 - float(ducking.gain)) * duck).astype(np.float32)
 
-        current_time = frame_index / fps
-        active_overlay_index: Optional[int] = None
-        for start_f, end_f, seg_idx in highlight_frame_ranges:
-            if start_f <= frame_index <= end_f:
-                active_overlay_index = seg_idx
-                break
 
-        if active_overlay_index is not None:
-            clip_path = segment_clip_paths[active_overlay_index]
-            if clip_path:
-                clip_info = clip_state.get(clip_path)
-                if clip_info is not None:
-                    current_subtitle_index = highlight_subtitle_indices[
-                        active_overlay_index
-                    ]
-                    current_segment_index = clip_info.get("current_segment_index")
-                    if current_segment_index != active_overlay_index:
-                        if current_segment_index is not None:
-                            clip_info["last_segment_index"] = current_segment_index
-                        if clip_info.get("current_subtitle_index") is not None:
-                            clip_info["last_subtitle_index"] = clip_info[
-                                "current_subtitle_index"
-                            ]
-                        prev_segment_index = clip_info.get("last_segment_index")
-                        prev_subtitle_index = clip_info.get("last_subtitle_index")
-                        if subtitle_segments:
-                            should_continue = (
-                                prev_subtitle_index is not None
-                                and current_subtitle_index is not None
-                                and current_subtitle_index == prev_subtitle_index + 1
-                            )
-                        else:
-                            should_continue = (
-                                prev_segment_index is not None
-                                and active_overlay_index == prev_segment_index + 1
-                            )
-                        if not should_continue:
-                            clip_info["next_frame"] = 0
-                            clip_info["seek_frame"] = 0
-                            clip_info["needs_seek"] = True
-                            clip_info["continuation_pending"] = False
-                            clip_info["frames_to_drop"] = 0
-                        else:
-                            target_next = max(int(clip_info.get("next_frame", 0)), 0)
-                            clip_info["seek_frame"] = target_next
-                            clip_info["needs_seek"] = True
-                            clip_info["continuation_pending"] = True
-                            clip_info["frames_to_drop"] = 0
-                        clip_info["finished"] = clip_info["total_frames"] <= 0
-                        clip_info["current_segment_index"] = active_overlay_index
-                        clip_info["current_subtitle_index"] = current_subtitle_index
-                    else:
-                        clip_info["current_subtitle_index"] = current_subtitle_index
-
-                    overlay_total_frames = clip_info["total_frames"]
-                    current_index = int(clip_info.get("next_frame", 0))
-                    can_render = (
-                        overlay_total_frames > 0
-                        and current_index < overlay_total_frames
-                    )
-                    if not can_render:
-                        clip_info["finished"] = True
-                        clip_info["next_frame"] = overlay_total_frames
-                    else:
-                        overlay_cap = clip_info["capture"]
-                        if clip_info.get("needs_seek", False):
-                            seek_frame = int(
-                                clip_info.get("seek_frame", current_index)
-                            )
-                            seek_frame = max(
-                                0, min(seek_frame, overlay_total_frames - 1)
-                            )
-                            overlay_cap.set(cv2.CAP_PROP_POS_FRAMES, seek_frame)
-                            clip_info["needs_seek"] = False
-                            current_index = seek_frame
-                            clip_info["next_frame"] = current_index
-
-                        drop_count = int(clip_info.get("frames_to_drop", 0) or 0)
-                        while (
-                            drop_count > 0
-                            and current_index < overlay_total_frames
-                            and not clip_info.get("finished", False)
-                        ):
-                            ret_drop, _ = overlay_cap.read()
-                            if not ret_drop:
-                                clip_info["finished"] = True
-                                clip_info["next_frame"] = overlay_total_frames
-                                break
-                            current_index += 1
-                            drop_count -= 1
-                        clip_info["frames_to_drop"] = drop_count
-                        clip_info["next_frame"] = current_index
-
-                        if clip_info.get("finished", False):
-                            pass
-                        elif current_index >= overlay_total_frames:
-                            clip_info["finished"] = True
-                            clip_info["next_frame"] = overlay_total_frames
-                        else:
-                            ret_o, overlay_frame = overlay_cap.read()
-                            if not ret_o:
-                                clip_info["finished"] = True
-                                clip_info["next_frame"] = overlay_total_frames
-                            else:
-                                current_index += 1
-                                clip_info["next_frame"] = current_index
-                                clip_info["continuation_pending"] = False
-                                clip_info["finished"] = (
-                                    current_index >= overlay_total_frames
-                                )
-                                overlay_frame = crop_to_aspect_ratio(
-                                    overlay_frame, target_ratio=target_aspect_ratio
-                                )
-                                overlay_frame = resize_overlay_for_canvas(
-                                    overlay_frame,
-                                    canvas_width=width,
-                                    canvas_height=height,
-                                    aspect_ratio=target_aspect_ratio,
-                                )
-                                overlay_h, overlay_w = overlay_frame.shape[:2]
-                                x_start = (width - overlay_w) // 2
-                                y_start = (height - overlay_h) // 2
-                                frame[
-                                    y_start : y_start + overlay_h,
-                                    x_start : x_start + overlay_w,
-                                ] = overlay_frame
-
-        frame_with_subtitles = draw_subtitle_on_frame(
-            frame,
-            transcript,
-            current_time,
-            subtitle_design,
-            highlight_ranges_for_words,
-            subtitle_segments=subtitle_segments,
-            custom_subtitles=custom_subtitles,
+def compute_ducking_gain(
+    main_video_path: str,
+    transcript: List[Dict[str, float]],
+    duration: float,
+    ducking: MusicDucking,
+) -> Optional[np.ndarray]:
+    """Build the music gain curve for ``ducking`` (``None`` when it does not apply)."""
+
+    if not ducking.enabled:
+        return None
+    if ducking.source not in DUCKING_SOURCES:
+        raise ValueError(
+            f"Unknown ducking source '{ducking.source}'. Use one of {DUCKING_SOURCES}."
+        )
+    speech: Optional[np.ndarray] = None
+    if ducking.source in ("auto", "audio"):
+        levels = decode_audio_rms(main_video_path)
+        if levels is not None:
+            speech = speech_mask_from_levels(levels)
+        elif ducking.source == "audio":
+            print("[warn] Could not measure the main audio; music is not ducked.")
+            return None
+    if speech is None:
+        speech = speech_mask_from_transcript(transcript, duration)
+    return ducking_gain_curve(speech, ducking)
+
+
+def apply_gain_curve(
+    clip: "mpy.AudioClip", gain: np.ndarray, frame_seconds: float = DUCKING_FRAME_SECONDS
+) -> "mpy.AudioClip":
+    """Multiply ``clip`` by ``gain`` (one value per ``frame_seconds``, from t=0).
+
+    MoviePy asks for audio in blocks of sample times, so each block costs one
+    ``np.interp`` and one multiply.
+    """
+
+    frame_times = (np.arange(len(gain)) + 0.5) * frame_seconds
+
+    def filter_frame(get_frame, t):
+        frame = get_frame(t)
+        factors = np.interp(t, frame_times, gain)
+        if np.ndim(frame) == 2:
+            factors = np.reshape(factors, (-1, 1))
+        return frame * factors
+
+    if hasattr(clip, "transform"):
+        return clip.transform(filter_frame, keep_duration=True)
+    return clip.fl(filter_frame, keep_duration=True)
+
+
+LOOP_SAMPLE_RATE = 44100
+LOOP_CHANNELS = 2
+PCM_CACHE_VERSION = 1
+# Decoded PCM is about 10 MB per minute of audio; least recently used files go first
+PCM_CACHE_MAX_BYTES = int(float(os.environ.get("VIDEO_OVERLAY_PCM_CACHE_MB", "2048")) * MB)
+
+
+def prune_pcm_cache(
+    max_bytes: Optional[int] = PCM_CACHE_MAX_BYTES,
+    max_age: Optional[float] = None,
+    keep: Sequence[str] = (),
+) -> List[str]:
+    """Delete decoded PCM files from ``CACHE_DIR/pcm``; return their paths.
+
+    Files unused for more than ``max_age`` seconds are removed, then the least
+    recently used ones until the rest fit in ``max_bytes``. ``keep`` is never
+    removed. Renders that already mapped a removed file keep reading it.
+    """
+
+    pcm_dir = os.path.join(CACHE_DIR, "pcm")
+    try:
+        names = os.listdir(pcm_dir)
+    except OSError:
+        return []
+    entries: List[Tuple[float, int, str]] = []
+    for name in names:
+        if not name.endswith(".s16"):
+            continue
+        path = os.path.join(pcm_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+    keep_paths = {os.path.abspath(path) for path in keep}
+    total = sum(size for _, size, _ in entries)
+    cutoff = time.time() - max_age if max_age is not None else None
+    removed: List[str] = []
+    for used_at, size, path in entries:
+        expired = cutoff is not None and used_at < cutoff
+        over_budget = max_bytes is not None and total > max_bytes
+        if not (expired or over_budget) or os.path.abspath(path) in keep_paths:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed.append(path)
+    return removed
+
+
+def decode_pcm_buffer(path: str, sample_rate: int = LOOP_SAMPLE_RATE) -> np.ndarray:
+    """Return ``path``'s audio as a read-only memory-mapped ``(samples, 2)`` int16 array.
+
+    The PCM is decoded once into ``CACHE_DIR/pcm`` and mapped from there, so
+    any number of readers share one copy and only touched pages are resident.
+    Each use marks the file as recently used for ``prune_pcm_cache``, which
+    runs after every new decode to keep the directory within its size cap.
+    """
+
+    cache_key = (PCM_CACHE_VERSION, *file_cache_key(path), sample_rate, LOOP_CHANNELS)
+    digest = hashlib.sha1(repr(cache_key).encode("utf-8")).hexdigest()
+    pcm_path = os.path.join(CACHE_DIR, "pcm", f"{digest}.s16")
+    if not os.path.exists(pcm_path):
+        ffmpeg = find_ffmpeg()
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg is required to decode looped audio.")
+        os.makedirs(os.path.dirname(pcm_path), exist_ok=True)
+        partial_path = f"{pcm_path}.{os.getpid()}.part"
+        completed = subprocess.run(
+            [
+                ffmpeg,
+                "-v",
+                "error",
+                "-nostdin",
+                "-y",
+                "-i",
+                path,
+                "-map",
+                "0:a:0",
+                "-vn",
+                "-ac",
+                str(LOOP_CHANNELS),
+                "-ar",
+                str(sample_rate),
+                "-f",
+                "s16le",
+                partial_path,
+            ],
+            capture_output=True,
+            text=True,
         )
-        writer.write(frame_with_subtitles)
-        frame_index += 1
+        if completed.returncode != 0:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise RuntimeError(f"Could not decode audio from {path}: {completed.stderr.strip()}")
+        os.replace(partial_path, pcm_path)
+        prune_pcm_cache(keep=[pcm_path])
+    else:
+        os.utime(pcm_path)
+    if os.path.getsize(pcm_path) < 2 * LOOP_CHANNELS:
+        raise ValueError(f"Audio file has no samples: {path}")
+    return np.memmap(pcm_path, dtype="<i2", mode="r").reshape(-1, LOOP_CHANNELS)
+
+
+class LoopedAudioSource:
+    """An audio file repeated end to end, read by sample index from one buffer.
+
+    Output sample ``i`` is buffer sample ``i % period``, so an hour of a
+    30-second bed costs the same memory as one pass. With a crossfade, the
+    last ``crossfade`` seconds of each pass overlap the start of the next one
+    (equal-power fade), which hides clicks at the loop point.
+    """
+
+    def __init__(self, path: str, crossfade: float = 0.0, sample_rate: int = LOOP_SAMPLE_RATE):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.samples = decode_pcm_buffer(path, sample_rate)
+        length = len(self.samples)
+        self.crossfade_samples = max(0, min(int(round(crossfade * sample_rate)), length // 2))
+        self.period = length - self.crossfade_samples
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+    def read(self, indices: np.ndarray, volume: float = 1.0) -> np.ndarray:
+        """Return float frames (``(n, channels)``) for absolute output sample indices."""
+
+        indices = np.maximum(indices, 0)
+        position = indices % self.period
+        frames = self.samples[position].astype(np.float32)
+        fade = self.crossfade_samples
+        if fade:
+            # The first pass starts clean; later passes fade in over the previous tail
+            blend = (position < fade) & (indices >= self.period)
+            if blend.any():
+                head = position[blend]
+                angle = (head.astype(np.float32) + 0.5) * (np.pi / 2 / fade)
+                tail = self.samples[head + self.period].astype(np.float32)
+                frames[blend] = (
+                    frames[blend] * np.sin(angle)[:, None] + tail * np.cos(angle)[:, None]
+                )
+        return frames * (float(volume) / 32768.0)
 
-    cap.release()
-    for clip_info in clip_state.values():
-        overlay_cap = clip_info.get("capture")
-        if overlay_cap is not None:
-            overlay_cap.release()
-    writer.release()
+    def clip(self, duration: float, volume: float = 1.0) -> "mpy.AudioClip":
+        """Return a MoviePy clip that streams ``duration`` seconds of the loop."""
 
+        sample_rate = self.sample_rate
 
-def merge_audio_tracks(
-    silent_video_path: str,
+        def frame_function(t):
+            indices = np.round(np.atleast_1d(t) * sample_rate).astype(np.int64)
+            frames = self.read(indices, volume)
+            return frames if np.ndim(t) else frames[0]
+
+        return mpy.AudioClip(frame_function, duration=duration, fps=sample_rate)
+
+
+def build_audio_mix(
     main_video_path: str,
     transcript: List[Dict[str, float]],
     highlight_segments: List[Dict[str, Optional[object]]],
-    final_output_path: str,
+    duration: float,
     preserve_main_audio: bool = True,
     global_music_path: Optional[str] = None,
     global_music_volume: float = 1.0,
-) -> None:
-    """Attach the original audio, per-segment music, and optional global music using MoviePy."""
+    music_ducking: Optional[MusicDucking] = None,
+    loop_crossfade: float = 0.0,
+    audio_buffer_samples: Optional[int] = None,
+) -> Tuple[Optional[mpy.AudioClip], List[object]]:
+    """Compose the soundtrack of a ``duration``-second render.
 
-    if not HAVE_MOVIEPY:
-        print("[warn] MoviePy is not installed. Output video will be silent.")
-        return
+    Returns the mixed clip (``None`` when there is nothing to hear) and the
+    source clips to close once the mix has been written.
 
-    processed_clip = mpy.VideoFileClip(silent_video_path)
-    main_clip = mpy.VideoFileClip(main_video_path, audio=True)
+    With ``audio_buffer_samples`` the main audio is read through an audio-only
+    reader holding that many samples, without opening the video stream.
+    """
 
+    sources: List[object] = []
     base_audio: Optional[mpy.AudioClip] = None
-    external_audio_clip: Optional[mpy.AudioFileClip] = None
-    if preserve_main_audio:
-        base_audio = safe_audio_subclip(main_clip.audio, 0, processed_clip.duration)
-
-        if base_audio is None:
+    if audio_buffer_samples:
+        if preserve_main_audio:
             try:
-                external_audio_clip = mpy.AudioFileClip(main_video_path)
-                base_audio = safe_audio_subclip(
-                    external_audio_clip, 0, processed_clip.duration
-                )
+                main_audio = mpy.AudioFileClip(main_video_path, buffersize=int(audio_buffer_samples))
+                sources.append(main_audio)
+                base_audio = safe_audio_subclip(main_audio, 0, duration)
             except Exception as exc:  # noqa: BLE001
                 print(f"[warn] Unable to load audio track from main video ({exc}).")
-                base_audio = None
+    else:
+        main_clip = mpy.VideoFileClip(main_video_path, audio=True)
+        sources.append(main_clip)
+        if preserve_main_audio:
+            base_audio = safe_audio_subclip(main_clip.audio, 0, duration)
+
+            if base_audio is None:
+                try:
+                    external_audio_clip = mpy.AudioFileClip(main_video_path)
+                    sources.append(external_audio_clip)
+                    base_audio = safe_audio_subclip(external_audio_clip, 0, duration)
+                except Exception as exc:  # noqa: BLE001
+                    print(f"[warn] Unable to load audio track from main video ({exc}).")
+                    base_audio = None
 
     audio_layers: List[mpy.AudioClip] = []
     if base_audio is not None:
@@ -1276,23 +3633,14 @@ def merge_audio_tracks(
     if global_music_path:
         if not os.path.exists(global_music_path):
             raise FileNotFoundError(f"Global music file not found: {global_music_path}")
-        global_music_clip = mpy.AudioFileClip(global_music_path)
-        if global_music_clip.duration < processed_clip.duration:
-            loops = math.ceil(processed_clip.duration / global_music_clip.duration)
-            global_music_clip = mpy.concatenate_audioclips(
-                [global_music_clip] * max(1, loops)
+        if duration > 0:
+            global_music_clip = LoopedAudioSource(global_music_path, loop_crossfade).clip(
+                duration, global_music_volume
             )
-        global_music_clip = safe_audio_subclip(
-            global_music_clip, 0, processed_clip.duration
-        )
-        if global_music_clip is not None:
-            volume = float(global_music_volume)
-            if hasattr(global_music_clip, "volumex"):
-                global_music_clip = global_music_clip.volumex(volume)
-            elif hasattr(global_music_clip, "fx"):
-                from moviepy.audio.fx import volumex as volumex_fx
-
-                global_music_clip = volumex_fx(global_music_clip, volume)
+            if base_audio is not None and music_ducking is not None:
+                gain = compute_ducking_gain(main_video_path, transcript, duration, music_ducking)
+                if gain is not None:
+                    global_music_clip = apply_gain_curve(global_music_clip, gain)
             if hasattr(global_music_clip, "set_start"):
                 global_music_clip = global_music_clip.set_start(0)
             elif hasattr(global_music_clip, "with_start"):
@@ -1308,50 +3656,299 @@ def merge_audio_tracks(
         end_word = int(segment["end_word"])
         start_time = transcript[start_word]["start_time"]
         end_time = transcript[end_word]["end_time"]
-        duration = max(end_time - start_time, 0.0)
-        if duration <= 0:
+        segment_duration = max(end_time - start_time, 0.0)
+        if segment_duration <= 0:
             continue
-        music_clip = mpy.AudioFileClip(music_path)
-        if music_clip.duration < duration:
-            loops = math.ceil(duration / music_clip.duration)
-            music_clip = mpy.concatenate_audioclips([music_clip] * loops)
-        music_clip = safe_audio_subclip(music_clip, 0, duration)
-        volume = float(segment.get("music_volume", 1.0))
-        if hasattr(music_clip, "volumex"):
-            music_clip = music_clip.volumex(volume)
-        elif hasattr(music_clip, "fx"):
-            from moviepy.audio.fx import volumex as volumex_fx
-            music_clip = volumex_fx(music_clip, volume)
-        else:
-            music_clip = music_clip  # fallback: no volume adjustment
+        music_clip = LoopedAudioSource(music_path, loop_crossfade).clip(
+            segment_duration, float(segment.get("music_volume", 1.0))
+        )
         if hasattr(music_clip, "set_start"):
             music_clip = music_clip.set_start(start_time)
         elif hasattr(music_clip, "with_start"):
             music_clip = music_clip.with_start(start_time)
         audio_layers.append(music_clip)
 
-    final_clip = processed_clip
+    final_audio: Optional[mpy.AudioClip] = None
     if audio_layers:
         final_audio = mpy.CompositeAudioClip(audio_layers)
         if hasattr(final_audio, "set_duration"):
-            final_audio = final_audio.set_duration(processed_clip.duration)
+            final_audio = final_audio.set_duration(duration)
         elif hasattr(final_audio, "with_duration"):
-            final_audio = final_audio.with_duration(processed_clip.duration)
-        if hasattr(final_clip, "set_audio"):
-            final_clip = final_clip.set_audio(final_audio)
-        elif hasattr(final_clip, "with_audio"):
-            final_clip = final_clip.with_audio(final_audio)
-        else:
-            raise AttributeError(
-                "MoviePy VideoClip does not support set_audio/with_audio methods."
+            final_audio = final_audio.with_duration(duration)
+    return final_audio, sources
+
+
+def write_audio_mix(
+    mix_path: str,
+    main_video_path: str,
+    transcript: List[Dict[str, float]],
+    highlight_segments: List[Dict[str, Optional[object]]],
+    duration: float,
+    **mix_options: object,
+) -> bool:
+    """Render the soundtrack to a WAV file before any video exists.
+
+    Streaming outputs mux this file while frames are being encoded. Takes the
+    options of ``build_audio_mix`` and returns ``False`` when there is no audio.
+    """
+
+    if not HAVE_MOVIEPY:
+        print("[warn] MoviePy is not installed. Output video will be silent.")
+        return False
+    final_audio, sources = build_audio_mix(
+        main_video_path, transcript, highlight_segments, duration, **mix_options
+    )
+    try:
+        if final_audio is None:
+            return False
+        final_audio.write_audiofile(mix_path, fps=LOOP_SAMPLE_RATE, logger=None)
+        return True
+    finally:
+        for source in sources:
+            source.close()
+
+
+def merge_audio_tracks(
+    silent_video_path: str,
+    main_video_path: str,
+    transcript: List[Dict[str, float]],
+    highlight_segments: List[Dict[str, Optional[object]]],
+    final_output_path: str,
+    preserve_main_audio: bool = True,
+    global_music_path: Optional[str] = None,
+    global_music_volume: float = 1.0,
+    music_ducking: Optional[MusicDucking] = None,
+    loop_crossfade: float = 0.0,
+    extra_outputs: Sequence[Tuple[str, str]] = (),
+    video_filters: Optional[Sequence[Optional[str]]] = None,
+    audio_buffer_samples: Optional[int] = None,
+    bounded: bool = False,
+) -> None:
+    """Attach the original audio, per-segment music, and optional global music using MoviePy.
+
+    Music shorter than its span loops (see ``LoopedAudioSource``), blending
+    ``loop_crossfade`` seconds at each wrap. With ``music_ducking`` enabled
+    and the main audio kept, the global music dips under speech.
+
+    ``extra_outputs`` lists further ``(silent_video_path, final_output_path)``
+    pairs of the same length, such as other crops of one render. The mix is
+    then rendered once to a WAV file that every output reuses.
+
+    ``video_filters`` holds an optional ffmpeg ``-vf`` filter per output (main
+    output first), applied while the final video is encoded.
+
+    ``bounded`` keeps memory flat: the mix is written to WAV chunk by chunk,
+    and ffmpeg then encodes each output with ``BOUNDED_X264_ARGS`` and muxes
+    the WAV in, instead of MoviePy holding the video and the audio graph at once.
+    """
+
+    if not HAVE_MOVIEPY:
+        print("[warn] MoviePy is not installed. Output video will be silent.")
+        return
+
+    processed_clip = mpy.VideoFileClip(silent_video_path)
+    if bounded:
+        processed_clip.close()  # Only its duration is needed; ffmpeg reads the frames
+    final_audio, sources = build_audio_mix(
+        main_video_path,
+        transcript,
+        highlight_segments,
+        processed_clip.duration,
+        preserve_main_audio=preserve_main_audio,
+        global_music_path=global_music_path,
+        global_music_volume=global_music_volume,
+        music_ducking=music_ducking,
+        loop_crossfade=loop_crossfade,
+        audio_buffer_samples=audio_buffer_samples,
+    )
+
+    outputs = [(silent_video_path, final_output_path), *extra_outputs]
+    mix_path: Optional[str] = None
+    mixed_audio_clip: Optional[mpy.AudioFileClip] = None
+    if final_audio is not None and (len(outputs) > 1 or bounded):
+        mix_path = f"{os.path.splitext(final_output_path)[0]}.mix.wav"
+        final_audio.write_audiofile(mix_path, fps=LOOP_SAMPLE_RATE, logger=None)
+        if not bounded:
+            mixed_audio_clip = final_audio = mpy.AudioFileClip(mix_path)
+
+    try:
+        if bounded:
+            for output_index, (output_silent_path, output_path) in enumerate(outputs):
+                encode_final_video(
+                    output_silent_path,
+                    output_path,
+                    video_filters[output_index] if video_filters else None,
+                    audio_path=mix_path,
+                    encoder_args=BOUNDED_X264_ARGS,
+                )
+            return
+        for output_index, (output_silent_path, output_path) in enumerate(outputs):
+            video_clip = (
+                processed_clip
+                if output_silent_path == silent_video_path
+                else mpy.VideoFileClip(output_silent_path)
+            )
+            final_clip = video_clip
+            if final_audio is not None:
+                if hasattr(final_clip, "set_audio"):
+                    final_clip = final_clip.set_audio(final_audio)
+                elif hasattr(final_clip, "with_audio"):
+                    final_clip = final_clip.with_audio(final_audio)
+                else:
+                    raise AttributeError(
+                        "MoviePy VideoClip does not support set_audio/with_audio methods."
+                    )
+            video_filter = video_filters[output_index] if video_filters else None
+            final_clip.write_videofile(
+                output_path,
+                codec="libx264",
+                audio_codec="aac",
+                # A filter of our own replaces the even-size scale MoviePy adds
+                ffmpeg_params=["-vf", libx264_video_filter(video_filter)] if video_filter else None,
             )
+            # Closing ``final_clip`` would also close the audio the next output needs
+            if video_clip is not processed_clip:
+                video_clip.close()
+    finally:
+        processed_clip.close()
+        for source in sources:
+            source.close()
+        if mixed_audio_clip is not None:
+            mixed_audio_clip.close()
+        if mix_path is not None and os.path.exists(mix_path):
+            os.remove(mix_path)
 
-    final_clip.write_videofile(final_output_path, codec="libx264", audio_codec="aac")
-    final_clip.close()
-    processed_clip.close()
-    main_clip.close()
-    if external_audio_clip is not None:
-        external_audio_clip.close()
+
+# --------------------------------------------------------------------------- #
+# Memory budget
+# --------------------------------------------------------------------------- #
+
+
+MEMORY_BUDGET_ENV = "VIDEO_OVERLAY_MEMORY_BUDGET_MB"
+# Rough frame counts behind the estimates; frames are YUV 4:2:0 unless noted
+DECODER_POOL_FRAMES = 8  # Reference and output frames a video decoder keeps
+MP4V_ENCODER_FRAMES = 2
+X264_ENCODER_FRAMES = 64  # Lookahead, B-frames and frame threads at libx264 defaults
+BOUNDED_X264_ARGS = ["-threads", "2", "-rc-lookahead", "10"]
+BOUNDED_X264_FRAMES = 16
+MOVIEPY_AUDIO_BUFFER_SAMPLES = 200000  # MoviePy's default audio reader buffer
+BOUNDED_AUDIO_BUFFER_SAMPLES = 22050
+AUDIO_BUFFER_SAMPLE_BYTES = 2 * 8  # Stereo float64, as MoviePy buffers it
+
+
+@dataclass
+class MemoryPlan:
+    """Estimated peak memory of a render and whether it uses the bounded-memory paths."""
+
+    estimates: Dict[str, int]  # Bytes per render stage ("video", "audio", "subtitles")
+    budget: Optional[int] = None  # Bytes; ``None`` is unlimited
+    bounded: bool = False
+
+    @property
+    def peak(self) -> int:
+        return max(self.estimates.values(), default=0)
+
+
+def estimate_render_memory(config: ProjectConfig, bounded: bool = False) -> Dict[str, int]:
+    """Estimate the peak bytes each stage of ``render_project`` adds for ``config``.
+
+    The estimate counts frame buffers, decoder and encoder frame pools
+    (including those of ffmpeg child processes) and audio reader buffers. It
+    leaves out the interpreter and transcription. ``bounded`` estimates the
+    paths ``render_project`` switches to when the budget is exceeded.
+    """
+
+    metadata = get_media_metadata(config.main_video_path)
+    source_width, source_height = metadata.display_size
+    sizes = [
+        compute_cropped_dimensions(
+            source_width, source_height, parse_aspect_ratio(variant.aspect_ratio)
+        )
+        for variant in output_variants(config)
+    ]
+    output_bytes = [width * height * 3 for width, height in sizes]
+    yuv_bytes = [width * height * 3 // 2 for width, height in sizes]
+    workers = max(1, int(config.render_workers))
+
+    video = DECODER_POOL_FRAMES * source_width * source_height * 3 // 2
+    if config.decode_backend == "ffmpeg" or (bounded and find_ffmpeg() is not None):
+        # Decoded straight to the box holding every crop
+        video += max(width for width, _ in sizes) * max(height for _, height in sizes) * 3
+    else:
+        video += source_width * source_height * 3
+    video += sum(output_bytes)  # Per-output canvases
+    clip_paths = {
+        assignment.clip_path
+        for assignment in config.highlight_assignments
+        if assignment.clip_path
+    }
+    overlay_box = (0, 0)
+    for clip_path in clip_paths:
+        try:
+            clip_width, clip_height = get_media_metadata(clip_path).display_size
+        except (IOError, OSError):
+            continue
+        # Decoder, held frame and a scaled copy per output
+        video += (
+            DECODER_POOL_FRAMES * clip_width * clip_height * 3 // 2
+            + clip_width * clip_height * 3
+            + sum(output_bytes)
+        )
+        overlay_box = (max(overlay_box[0], clip_width), max(overlay_box[1], clip_height))
+    if workers > 1:
+        # Each slot also carries the overlay frame the parent decoded; each
+        # compositor keeps one scaled copy of it per output
+        slots = workers + 1 if bounded else workers * SLOTS_PER_WORKER
+        video += slots * (sum(output_bytes) + overlay_box[0] * overlay_box[1] * 3)
+        if overlay_box[0]:
+            video += workers * sum(output_bytes)
+    if config.stream_output:
+        encoder_frames = BOUNDED_X264_FRAMES if bounded else X264_ENCODER_FRAMES
+    else:
+        encoder_frames = MP4V_ENCODER_FRAMES
+    video += encoder_frames * sum(yuv_bytes)
+    estimates = {"video": video}
+
+    audio_sources = int(bool(config.preserve_audio)) + int(bool(config.global_music_path))
+    audio_sources += sum(1 for assignment in config.highlight_assignments if assignment.music_path)
+    buffer_samples = BOUNDED_AUDIO_BUFFER_SAMPLES if bounded else MOVIEPY_AUDIO_BUFFER_SAMPLES
+    audio = audio_sources * buffer_samples * AUDIO_BUFFER_SAMPLE_BYTES
+    if audio_sources and not bounded:
+        audio += 2 * source_width * source_height * 3  # MoviePy opens the main video too
+    final_encode = (BOUNDED_X264_FRAMES if bounded else X264_ENCODER_FRAMES) * max(yuv_bytes)
+    if config.stream_output:
+        if audio_sources:
+            estimates["audio"] = audio  # Pre-mixed before the video pass
+    elif audio_sources:
+        # Outputs are encoded one after another; MoviePy also reads the silent render
+        estimates["audio"] = audio + final_encode + (0 if bounded else 2 * max(output_bytes))
+    elif config.subtitle_renderer == "ass":
+        estimates["subtitles"] = final_encode
+    return estimates
+
+
+def plan_render_memory(config: ProjectConfig, verbose: bool = True) -> MemoryPlan:
+    """Estimate ``config``'s render and switch to bounded-memory paths if it exceeds the budget.
+
+    The budget is ``config.memory_budget_mb``, else ``VIDEO_OVERLAY_MEMORY_BUDGET_MB``.
+    """
+
+    if config.memory_budget_mb:
+        budget: Optional[int] = int(float(config.memory_budget_mb) * MB)
+    else:
+        budget = budget_from_env(MEMORY_BUDGET_ENV)
+    plan = MemoryPlan(estimate_render_memory(config), budget)
+    if budget is None or plan.peak <= budget:
+        return plan
+    bounded_plan = MemoryPlan(estimate_render_memory(config, bounded=True), budget, bounded=True)
+    if verbose:
+        print(
+            f"[info] Estimated peak {plan.peak / MB:.0f} MB exceeds the {budget / MB:.0f} MB "
+            f"budget; rendering on bounded-memory paths ({bounded_plan.peak / MB:.0f} MB)."
+        )
+        if bounded_plan.peak > budget:
+            print("[warn] The bounded-memory render is still estimated above the budget.")
+    return bounded_plan
 
 
 # --------------------------------------------------------------------------- #
@@ -1359,14 +3956,115 @@ def merge_audio_tracks(
 # --------------------------------------------------------------------------- #
 
 
-def render_project(config: ProjectConfig) -> Dict[str, object]:
-    """Run the full pipeline and return metadata for inspection."""
+def output_variants(config: ProjectConfig) -> List[OutputVariant]:
+    """Return every deliverable of ``config``, the main ``output_path`` first."""
 
-    transcript = build_transcript(
-        config.main_video_path,
-        transcript_text=config.transcript_text,
-        whisper_model=config.whisper_model,
+    root, ext = os.path.splitext(config.output_path)
+    variants = [
+        OutputVariant(config.aspect_ratio, config.output_path, config.subtitle_design)
+    ]
+    for variant in config.extra_outputs:
+        suffix = str(variant.aspect_ratio).replace(":", "x")
+        variants.append(
+            OutputVariant(
+                variant.aspect_ratio,
+                variant.output_path or f"{root}_{suffix}{ext or '.mp4'}",
+                variant.subtitle_design or config.subtitle_design,
+            )
+        )
+    return variants
+
+
+def silent_render_path(output_path: str) -> str:
+    """Where the video pass writes ``output_path`` before the audio is merged."""
+
+    root, ext = os.path.splitext(output_path)
+    return f"{root}.silent{ext or '.mp4'}"
+
+
+def render_project(
+    config: ProjectConfig,
+    checkpoint: Optional[RenderCheckpoint] = None,
+    transcript: Optional[List[Dict[str, float]]] = None,
+    progress: Optional[RenderProgress] = None,
+) -> Dict[str, object]:
+    """Run the full pipeline and return metadata for inspection.
+
+    ``timings`` in the result holds the wall-clock seconds spent in each stage.
+    Pass a ``checkpoint`` to encode in resumable segments (see ``render_jobs``),
+    and a ``transcript`` to skip transcription. ``outputs`` lists the main
+    output followed by ``config.extra_outputs``, and ``subtitle_files`` the
+    SRT/ASS sidecars written next to them.
+
+    With ``config.stream_output`` the soundtrack is mixed first and every
+    output is encoded to fragmented MP4 as its frames are composited, so the
+    files can be played while the render runs. Such a render is a single pass
+    and ignores ``checkpoint``. A ``progress`` follows the stages and the
+    frames of the video pass.
+
+    ``memory`` in the result holds the estimated and the measured peak memory
+    of each stage. When the estimate exceeds the memory budget (see
+    ``plan_render_memory``) the render takes bounded-memory paths. It decodes
+    through ffmpeg, keeps fewer frames in flight between workers, mixes audio
+    in small chunks to a WAV file and encodes with ``BOUNDED_X264_ARGS``.
+    """
+
+    memory_plan = plan_render_memory(config)
+    streamed_paths = (
+        [variant.output_path for variant in output_variants(config)] if config.stream_output else []
     )
+    # Marked before the transcript and audio stages, so readers wait for this render
+    begin_streaming_outputs(streamed_paths)
+    try:
+        with MemoryTracker() as tracker:
+            result = render_project_stages(
+                config, checkpoint, transcript, progress, memory_plan, tracker
+            )
+    except BaseException:
+        # Readers of a half-written stream stop waiting for more fragments
+        end_streaming_outputs(streamed_paths)
+        raise
+    result["memory"] = {
+        "budget_mb": round(memory_plan.budget / MB, 1) if memory_plan.budget else None,
+        "bounded": memory_plan.bounded,
+        "estimate_mb": {
+            stage: round(nbytes / MB, 1) for stage, nbytes in memory_plan.estimates.items()
+        },
+        "stages": tracker.report(),
+    }
+    return result
+
+
+def render_project_stages(
+    config: ProjectConfig,
+    checkpoint: Optional[RenderCheckpoint],
+    transcript: Optional[List[Dict[str, float]]],
+    progress: Optional[RenderProgress],
+    memory_plan: MemoryPlan,
+    tracker: MemoryTracker,
+) -> Dict[str, object]:
+    """Run the stages of ``render_project``, reporting each to ``progress`` and ``tracker``."""
+
+    def enter_stage(stage: str) -> None:
+        tracker.enter(stage)
+        if progress is not None:
+            progress.set_stage(stage)
+
+    bounded = memory_plan.bounded
+    encoder_args = BOUNDED_X264_ARGS if bounded else []
+
+    timings: Dict[str, float] = {}
+    render_started = stage_started = time.perf_counter()
+    if transcript is None:
+        enter_stage("transcript")
+        transcript = build_transcript(
+            config.main_video_path,
+            transcript_text=config.transcript_text,
+            whisper_model=config.whisper_model,
+        )
+        timings["transcript"] = time.perf_counter() - stage_started
+    stage_started = time.perf_counter()
+    enter_stage("preparing")
     highlight_segments = map_assignments_to_segments(
         transcript, config.highlight_assignments
     )
@@ -1374,11 +4072,22 @@ def render_project(config: ProjectConfig) -> Dict[str, object]:
     any_segment_music = any(
         assignment.music_path for assignment in config.highlight_assignments
     )
+    preserve_audio = config.preserve_audio and has_main_audio(config.main_video_path)
     needs_audio_merge = HAVE_MOVIEPY and (
-        config.preserve_audio or bool(config.global_music_path) or any_segment_music
+        preserve_audio or bool(config.global_music_path) or any_segment_music
     )
+    variants = output_variants(config)
     final_output_path = config.output_path
-    silent_output_path = final_output_path
+    render_variants = variants
+    burn_subtitles = resolve_subtitle_renderer(config.subtitle_renderer) == "ass"
+    mix_options = {
+        "preserve_main_audio": preserve_audio,
+        "global_music_path": config.global_music_path,
+        "global_music_volume": config.global_music_volume,
+        "music_ducking": config.music_ducking,
+        "loop_crossfade": config.music_loop_crossfade,
+        "audio_buffer_samples": BOUNDED_AUDIO_BUFFER_SAMPLES if bounded else None,
+    }
 
     subtitle_segments = config.subtitle_segments
     custom_subtitle_texts: Optional[List[str]] = None
@@ -1396,44 +4105,123 @@ def render_project(config: ProjectConfig) -> Dict[str, object]:
             transcript, highlight_segments
         )
 
-    if needs_audio_merge:
-        root, ext = os.path.splitext(final_output_path)
-        ext = ext or ".mp4"
-        silent_output_path = f"{root}.silent{ext}"
-
-    process_video_with_overlays(
-        config.main_video_path,
+    if (needs_audio_merge or burn_subtitles) and not config.stream_output:
+        render_variants = [
+            OutputVariant(
+                variant.aspect_ratio,
+                silent_render_path(variant.output_path),
+                variant.subtitle_design,
+            )
+            for variant in variants
+        ]
+    subtitle_files, video_filters = write_subtitle_tracks(
+        config,
+        variants,
         transcript,
-        highlight_segments,
-        config.subtitle_design,
-        silent_output_path,
-        subtitle_segments=subtitle_segments,
-        custom_subtitles=custom_subtitle_texts,
+        subtitle_segments,
+        custom_subtitle_texts,
+        burn_subtitles,
+        [(seg["start_word"], seg["end_word"]) for seg in highlight_segments],
     )
+    timings["segments"] = time.perf_counter() - stage_started
+
+    streaming: Optional[StreamingEncode] = None
+    mix_path: Optional[str] = None
+    if config.stream_output:
+        if checkpoint is not None:
+            print("[info] Streaming output is rendered in one pass; it will not resume from segments.")
+            checkpoint = None
+        if needs_audio_merge:
+            stage_started = time.perf_counter()
+            enter_stage("audio")
+            mix_path = f"{os.path.splitext(final_output_path)[0]}.mix.wav"
+            if not write_audio_mix(
+                mix_path,
+                config.main_video_path,
+                transcript,
+                highlight_segments,
+                get_media_metadata(config.main_video_path).duration,
+                **mix_options,
+            ):
+                mix_path = None
+            timings["audio"] = time.perf_counter() - stage_started
+        streaming = StreamingEncode(
+            audio_path=mix_path, video_filters=video_filters, encoder_args=encoder_args
+        )
 
-    if needs_audio_merge:
+    decode_backend = config.decode_backend
+    if bounded and decode_backend != "ffmpeg" and find_ffmpeg() is not None:
+        decode_backend = "ffmpeg"  # Decodes straight to the crop instead of the full frame
+    stage_started = time.perf_counter()
+    enter_stage("video")
+    try:
+        process_video_with_overlays(
+            config.main_video_path,
+            transcript,
+            highlight_segments,
+            config.subtitle_design,
+            render_variants[0].output_path,
+            subtitle_segments=subtitle_segments,
+            custom_subtitles=custom_subtitle_texts,
+            decode_backend=decode_backend,
+            checkpoint=checkpoint,
+            target_aspect_ratio=parse_aspect_ratio(config.aspect_ratio),
+            extra_outputs=render_variants[1:],
+            workers=config.render_workers,
+            draw_subtitles=not burn_subtitles,
+            streaming=streaming,
+            progress=progress,
+            ring_slots=config.render_workers + 1 if bounded else None,
+        )
+    finally:
+        if mix_path is not None and os.path.exists(mix_path):
+            os.remove(mix_path)
+    timings["video"] = time.perf_counter() - stage_started
+
+    if streaming is None and needs_audio_merge:
+        stage_started = time.perf_counter()
+        enter_stage("audio")
         merge_audio_tracks(
-            silent_output_path,
+            render_variants[0].output_path,
             config.main_video_path,
             transcript,
             highlight_segments,
             final_output_path,
-            preserve_main_audio=config.preserve_audio,
-            global_music_path=config.global_music_path,
-            global_music_volume=config.global_music_volume,
+            extra_outputs=[
+                (silent.output_path, variant.output_path)
+                for silent, variant in zip(render_variants[1:], variants[1:])
+            ],
+            video_filters=video_filters,
+            bounded=bounded,
+            **mix_options,
         )
-        if (
-            os.path.exists(silent_output_path)
-            and silent_output_path != final_output_path
-        ):
-            os.remove(silent_output_path)
+        timings["audio"] = time.perf_counter() - stage_started
+    elif streaming is None and burn_subtitles:
+        stage_started = time.perf_counter()
+        enter_stage("subtitles")
+        for silent, variant, video_filter in zip(render_variants, variants, video_filters):
+            burn_subtitle_track(
+                silent.output_path, video_filter, variant.output_path, encoder_args=encoder_args
+            )
+        timings["subtitles"] = time.perf_counter() - stage_started
+    if render_variants is not variants:
+        for silent in render_variants:
+            if os.path.exists(silent.output_path):
+                os.remove(silent.output_path)
+    for variant in variants:
+        if burn_subtitles and os.path.exists(burn_track_path(variant.output_path)):
+            os.remove(burn_track_path(variant.output_path))
+    timings["total"] = time.perf_counter() - render_started
 
     return {
         "transcript": transcript,
         "highlight_segments": highlight_segments,
         "output_path": final_output_path,
+        "outputs": [variant.output_path for variant in variants],
         "subtitle_segments": subtitle_segments,
         "custom_subtitles": custom_subtitle_texts,
+        "subtitle_files": subtitle_files,
+        "timings": timings,
     }
 
 
@@ -1450,6 +4238,53 @@ def load_project_config_from_json(
     with open(path, "r", encoding="utf-8") as file:
         data = json.load(file)
 
+    return apply_project_config_data(data, base_config)
+
+
+def parse_subtitle_design(design_data: Dict[str, object]) -> SubtitleDesign:
+    """Build a ``SubtitleDesign`` from its JSON form (lists become tuples)."""
+
+    kwargs = {}
+    for field_name in (
+        "bar_color",
+        "bar_opacity",
+        "text_color",
+        "text_scale",
+        "text_thickness",
+        "outline_color",
+        "outline_thickness",
+        "highlight_color",
+        "highlight_text_color",
+        "margin",
+        "margin_x",
+        "margin_y",
+        "bottom_margin",
+        "max_line_width_ratio",
+        "line_spacing",
+        "corner_radius",
+        "box_shadow_offset",
+        "box_shadow_blur",
+        "box_shadow_alpha",
+        "shadow_color",
+        "shadow_offset",
+        "shadow_thickness",
+        "highlight_padding",
+        "font_path",
+        "font_size_px",
+    ):
+        if field_name in design_data:
+            value = design_data[field_name]
+            if isinstance(value, list):
+                value = tuple(value)
+            kwargs[field_name] = value
+    return SubtitleDesign(**kwargs)
+
+
+def apply_project_config_data(
+    data: Dict[str, object], base_config: ProjectConfig
+) -> ProjectConfig:
+    """Populate ``ProjectConfig`` from an already parsed configuration mapping."""
+
     highlight_items = data.get("highlight_assignments", data.get("highlights", []))
     assignments: List[HighlightAssignment] = []
 
@@ -1463,6 +4298,7 @@ def load_project_config_from_json(
                 occurrence=int(item.get("occurrence", 1)),
                 start_word=item.get("start_word"),
                 end_word=item.get("end_word"),
+                fit_to_segment=bool(item.get("fit_to_segment", False)),
             )
         )
     if assignments:
@@ -1472,49 +4308,74 @@ def load_project_config_from_json(
         base_config.transcript_text = data["transcript_text"]
 
     if "subtitle_design" in data:
-        design_data = data["subtitle_design"]
-        kwargs = {}
-        for field_name in (
-            "bar_color",
-            "bar_opacity",
-            "text_color",
-            "text_scale",
-            "text_thickness",
-            "outline_color",
-            "outline_thickness",
-            "highlight_color",
-            "highlight_text_color",
-            "margin",
-            "margin_x",
-            "margin_y",
-            "bottom_margin",
-            "max_line_width_ratio",
-            "line_spacing",
-            "corner_radius",
-            "box_shadow_offset",
-            "box_shadow_blur",
-            "box_shadow_alpha",
-            "shadow_color",
-            "shadow_offset",
-            "shadow_thickness",
-            "highlight_padding",
-            "font_path",
-            "font_size_px",
-        ):
-            if field_name in design_data:
-                value = design_data[field_name]
-                if isinstance(value, list):
-                    value = tuple(value)
-                kwargs[field_name] = value
-        base_config.subtitle_design = SubtitleDesign(**kwargs)
+        base_config.subtitle_design = parse_subtitle_design(data["subtitle_design"])
 
     if "preserve_audio" in data:
         base_config.preserve_audio = bool(data["preserve_audio"])
 
+    if "decode_backend" in data:
+        base_config.decode_backend = str(data["decode_backend"])
+    if "render_workers" in data:
+        base_config.render_workers = max(1, int(data["render_workers"]))
+    if "stream_output" in data:
+        base_config.stream_output = bool(data["stream_output"])
+    if "memory_budget_mb" in data:
+        base_config.memory_budget_mb = float(data["memory_budget_mb"]) or None
+    if "subtitle_renderer" in data:
+        if data["subtitle_renderer"] not in SUBTITLE_RENDERERS:
+            raise ValueError(
+                f"Unknown subtitle renderer '{data['subtitle_renderer']}'. "
+                f"Use one of {SUBTITLE_RENDERERS}."
+            )
+        base_config.subtitle_renderer = str(data["subtitle_renderer"])
+    if "subtitle_sidecars" in data:
+        sidecars = data["subtitle_sidecars"] or []
+        if isinstance(sidecars, str):
+            sidecars = [sidecars]
+        for fmt in sidecars:
+            if fmt not in SUBTITLE_SIDECAR_FORMATS:
+                raise ValueError(
+                    f"Unknown subtitle sidecar format '{fmt}'. Use one of {SUBTITLE_SIDECAR_FORMATS}."
+                )
+        base_config.subtitle_sidecars = [str(fmt) for fmt in sidecars]
+
     if "global_music_path" in data:
         base_config.global_music_path = data["global_music_path"]
     if "global_music_volume" in data:
         base_config.global_music_volume = float(data["global_music_volume"])
+    if "aspect_ratio" in data:
+        parse_aspect_ratio(data["aspect_ratio"])
+        base_config.aspect_ratio = str(data["aspect_ratio"])
+    if "extra_outputs" in data:
+        variants: List[OutputVariant] = []
+        for item in data["extra_outputs"] or []:
+            if isinstance(item, str):
+                item = {"aspect_ratio": item}
+            parse_aspect_ratio(item["aspect_ratio"])
+            design_data = item.get("subtitle_design")
+            variants.append(
+                OutputVariant(
+                    aspect_ratio=str(item["aspect_ratio"]),
+                    output_path=str(item.get("output_path") or ""),
+                    subtitle_design=parse_subtitle_design(design_data) if design_data else None,
+                )
+            )
+        base_config.extra_outputs = variants
+    if "music_loop_crossfade" in data:
+        base_config.music_loop_crossfade = max(0.0, float(data["music_loop_crossfade"]))
+    if "music_ducking" in data:
+        ducking_data = data["music_ducking"]
+        if isinstance(ducking_data, bool):
+            base_config.music_ducking = MusicDucking(enabled=ducking_data)
+        elif isinstance(ducking_data, dict):
+            kwargs = {
+                key: ducking_data[key]
+                for key in ("enabled", "gain", "attack", "release", "source")
+                if key in ducking_data
+            }
+            # Giving ducking settings turns it on unless "enabled" says otherwise
+            kwargs.setdefault("enabled", True)
+            base_config.music_ducking = MusicDucking(**kwargs)
 
     if "subtitle_segments" in data:
         base_config.subtitle_segments = [
@@ -1551,83 +4412,274 @@ def load_project_config_from_json(
     return base_config
 
 
+# --------------------------------------------------------------------------- #
+# Batch rendering
+# --------------------------------------------------------------------------- #
+
+
+def load_batch_manifest(path: str) -> Dict[str, object]:
+    """Read a batch manifest, accepting either a list of jobs or a mapping."""
+
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+
+    if isinstance(data, list):
+        data = {"jobs": data}
+    if not isinstance(data, dict) or not isinstance(data.get("jobs"), list):
+        raise ValueError(f"Batch manifest {path} must contain a 'jobs' list.")
+    return data
+
+
+def build_batch_job_config(job: Dict[str, object]) -> ProjectConfig:
+    """Create the ``ProjectConfig`` for one batch manifest entry.
+
+    A job names its main video and output, optionally points at a project
+    JSON via ``config``, and may override any project setting inline.
+    """
+
+    main_video = job.get("main_video") or job.get("main_video_path")
+    if not main_video:
+        raise ValueError("Batch job is missing 'main_video'.")
+    config = ProjectConfig(
+        main_video_path=str(main_video),
+        output_path=str(job.get("output") or job.get("output_path") or "output.mp4"),
+    )
+    if job.get("whisper_model"):
+        config.whisper_model = str(job["whisper_model"])
+    if job.get("config"):
+        config = load_project_config_from_json(str(job["config"]), config)
+    return apply_project_config_data(job, config)
+
+
+def run_batch_job(index: int, job: Dict[str, object]) -> Dict[str, object]:
+    """Render one manifest entry inside a worker and report its outcome."""
+
+    started_at = time.time()
+    started = time.perf_counter()
+    entry: Dict[str, object] = {
+        "index": index,
+        "main_video": job.get("main_video") or job.get("main_video_path"),
+        "output_path": job.get("output") or job.get("output_path"),
+        "worker_pid": os.getpid(),
+        "started_at": started_at,
+    }
+    try:
+        config = build_batch_job_config(job)
+        entry["output_path"] = config.output_path
+        result = render_project(config)
+        entry["timings"] = result["timings"]
+        entry["memory"] = result["memory"]
+        entry["status"] = "succeeded"
+    except Exception as exc:  # noqa: BLE001 - one failed job must not stop the batch
+        entry["status"] = "failed"
+        entry["error"] = f"{type(exc).__name__}: {exc}"
+    entry["seconds"] = time.perf_counter() - started
+    return entry
+
+
+def run_batch(
+    manifest_path: str,
+    workers: Optional[int] = None,
+    report_path: Optional[str] = None,
+) -> Dict[str, object]:
+    """Render every job in ``manifest_path`` across a pool of long-lived workers.
+
+    Worker processes are reused between jobs, so the module level font,
+    Whisper model, transcript and overlay caches stay warm for the whole batch;
+    each keeps only its most recently used entries. A worker that dies (for
+    example killed for running out of memory) fails its jobs instead of the
+    batch, and the report is written however the batch ends.
+    """
+
+    manifest = load_batch_manifest(manifest_path)
+    jobs: List[Dict[str, object]] = list(manifest["jobs"])
+    worker_count = int(workers or manifest.get("workers") or os.cpu_count() or 1)
+    worker_count = max(1, min(worker_count, len(jobs) or 1))
+    report_path = report_path or str(manifest.get("report") or "batch_report.json")
+
+    results: List[Dict[str, object]] = []
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=worker_count) as executor:
+            futures = {
+                executor.submit(run_batch_job, index, job): index
+                for index, job in enumerate(jobs)
+            }
+            for future in as_completed(futures):
+                try:
+                    entry = future.result()
+                except Exception as exc:  # noqa: BLE001 - e.g. BrokenProcessPool after an OOM kill
+                    entry = failed_batch_entry(
+                        futures[future], jobs[futures[future]], f"{type(exc).__name__}: {exc}"
+                    )
+                    entry["seconds"] = time.perf_counter() - started
+                results.append(entry)
+                print(
+                    f"[batch] Job {entry['index']} {entry['status']} in "
+                    f"{entry['seconds']:.1f}s ({len(results)}/{len(jobs)})"
+                )
+    finally:
+        total_seconds = time.perf_counter() - started
+        finished = {int(item["index"]) for item in results}
+        results.extend(
+            failed_batch_entry(index, job, "Did not finish: the batch was stopped.")
+            for index, job in enumerate(jobs)
+            if index not in finished
+        )
+        report = write_batch_report(
+            manifest_path, report_path, worker_count, len(jobs), results, total_seconds
+        )
+    return report
+
+
+def failed_batch_entry(index: int, job: Dict[str, object], error: str) -> Dict[str, object]:
+    """Report entry for a job whose worker never returned its own."""
+
+    return {
+        "index": index,
+        "main_video": job.get("main_video") or job.get("main_video_path"),
+        "output_path": job.get("output") or job.get("output_path"),
+        "status": "failed",
+        "error": error,
+        "seconds": 0.0,
+    }
+
+
+def write_batch_report(
+    manifest_path: str,
+    report_path: str,
+    worker_count: int,
+    total_jobs: int,
+    results: List[Dict[str, object]],
+    total_seconds: float,
+) -> Dict[str, object]:
+    """Summarise ``results`` and write them to ``report_path``."""
+
+    results.sort(key=lambda item: int(item["index"]))
+    succeeded = sum(1 for item in results if item["status"] == "succeeded")
+    report: Dict[str, object] = {
+        "manifest": manifest_path,
+        "workers": worker_count,
+        "total_jobs": total_jobs,
+        "succeeded": succeeded,
+        "failed": total_jobs - succeeded,
+        "total_seconds": total_seconds,
+        "renders_per_hour": succeeded * 3600.0 / total_seconds if total_seconds > 0 else 0.0,
+        "jobs": results,
+    }
+    with open(report_path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=4)
+
+    print(
+        f"[batch] {succeeded}/{total_jobs} renders succeeded in {total_seconds:.1f}s "
+        f"({report['renders_per_hour']:.1f} renders/hour). Report written to {report_path}"
+    )
+    return report
+
+
 # --------------------------------------------------------------------------- #
 # Demo / CLI entry point
 # --------------------------------------------------------------------------- #
 
 
-def run_demo(output_path: str = "demo_output.mp4") -> None:
-    """Generate a dummy project for quick smoke testing."""
+def create_dummy_video(
+    path: str,
+    duration: float = 6.0,
+    fps: int = 30,
+    resolution: Tuple[int, int] = (720, 1280),
+    with_audio: bool = True,
+) -> None:
+    """Write a synthetic colour-cycling video, used by the demo and benchmarks.
+
+    Frames are drawn as the encoder asks for them, so memory does not grow
+    with ``duration``.
+    """
+
+    h, w = resolution
+    total_frames = int(duration * fps)
+
+    def frame_function(t: float) -> np.ndarray:
+        idx = min(total_frames - 1, int(round(t * fps)))
+        hue = int((idx / total_frames) * 180) % 180
+        hsv = np.zeros((h, w, 3), dtype=np.uint8)
+        hsv[..., 0] = hue
+        hsv[..., 1] = 200
+        hsv[..., 2] = 220
+        frame = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+        cv2.putText(
+            frame,
+            f"Frame {idx}",
+            (50, 100),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            1.3,
+            (255, 255, 255),
+            3,
+            cv2.LINE_AA,
+        )
+        return frame
 
-    base_video_path = "demo_base.mp4"
-    overlay_clip_path = "demo_overlay.mp4"
+    write_generated_clip(path, frame_function, total_frames / fps, fps, with_audio)
 
-    def create_dummy_video(
-        path: str,
-        duration: float = 6.0,
-        fps: int = 30,
-        resolution: Tuple[int, int] = (720, 1280),
-    ) -> None:
-        h, w = resolution
-        total_frames = int(duration * fps)
-        frames = []
-        for idx in range(total_frames):
-            hue = int((idx / total_frames) * 180) % 180
-            hsv = np.zeros((h, w, 3), dtype=np.uint8)
-            hsv[..., 0] = hue
-            hsv[..., 1] = 200
-            hsv[..., 2] = 220
-            frame = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
-            cv2.putText(
-                frame,
-                f"Frame {idx}",
-                (50, 100),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                1.3,
-                (255, 255, 255),
-                3,
-                cv2.LINE_AA,
-            )
-            frames.append(frame)
 
-        clip = mpy.ImageSequenceClip(frames, fps=fps)
-        silent_audio = mpy.AudioClip(lambda t: [0, 0], duration=duration, fps=44100)
-        clip = clip.with_audio(silent_audio)
-        clip.write_videofile(path, codec="libx264", audio_codec="aac")
+def create_overlay_clip(
+    path: str,
+    duration: float = 2.5,
+    fps: int = 30,
+    resolution: Tuple[int, int] = (960, 768),
+    with_audio: bool = True,
+) -> None:
+    """Write a synthetic bouncing-circle overlay clip, drawing frames on demand."""
+
+    h, w = resolution
+    total_frames = int(duration * fps)
+
+    def frame_function(t: float) -> np.ndarray:
+        idx = min(total_frames - 1, int(round(t * fps)))
+        frame = np.zeros((h, w, 3), dtype=np.uint8)
+        radius = 120
+        center_x = w // 2
+        center_y = int(
+            h * (0.3 + 0.4 * abs(math.sin(math.pi * idx / total_frames)))
+        )
+        cv2.circle(frame, (center_x, center_y), radius, (0, 255, 180), -1)
+        cv2.putText(
+            frame,
+            "Overlay",
+            (center_x - 180, center_y),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            1.6,
+            (30, 30, 30),
+            3,
+            cv2.LINE_AA,
+        )
+        return frame
+
+    write_generated_clip(path, frame_function, total_frames / fps, fps, with_audio)
 
-    def create_overlay_clip(
-        path: str,
-        duration: float = 2.5,
-        fps: int = 30,
-        resolution: Tuple[int, int] = (960, 768),
-    ) -> None:
-        h, w = resolution
-        total_frames = int(duration * fps)
-        frames = []
-        for idx in range(total_frames):
-            frame = np.zeros((h, w, 3), dtype=np.uint8)
-            radius = 120
-            center_x = w // 2
-            center_y = int(
-                h * (0.3 + 0.4 * abs(math.sin(math.pi * idx / total_frames)))
-            )
-            cv2.circle(frame, (center_x, center_y), radius, (0, 255, 180), -1)
-            cv2.putText(
-                frame,
-                "Overlay",
-                (center_x - 180, center_y),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                1.6,
-                (30, 30, 30),
-                3,
-                cv2.LINE_AA,
-            )
-            frames.append(frame)
 
-        clip = mpy.ImageSequenceClip(frames, fps=fps)
+def write_generated_clip(
+    path: str,
+    frame_function: Callable[[float], np.ndarray],
+    duration: float,
+    fps: int,
+    with_audio: bool,
+) -> None:
+    """Encode frames produced by ``frame_function(t)`` one at a time, with optional silence."""
+
+    clip = mpy.VideoClip(frame_function, duration=duration)
+    if with_audio:
         silent_audio = mpy.AudioClip(lambda t: [0, 0], duration=duration, fps=44100)
         clip = clip.with_audio(silent_audio)
-        clip.write_videofile(path, codec="libx264", audio_codec="aac")
+        clip.write_videofile(path, fps=fps, codec="libx264", audio_codec="aac")
+    else:
+        clip.write_videofile(path, fps=fps, codec="libx264", audio=False)
+
+
+def run_demo(output_path: str = "demo_output.mp4") -> None:
+    """Generate a dummy project for quick smoke testing."""
+
+    base_video_path = "demo_base.mp4"
+    overlay_clip_path = "demo_overlay.mp4"
 
     create_dummy_video(base_video_path, resolution=(720, 1280))
     create_overlay_clip(overlay_clip_path, resolution=(960, 768))
@@ -1669,6 +4721,75 @@ def parse_cli_args() -> argparse.Namespace:
         help="JSON file describing highlight assignments and optional design overrides.",
     )
 
+    parser.add_argument(
+        "--decode-backend",
+        choices=DECODE_BACKENDS,
+        help="Decoder for the main video and overlays (overrides the config file).",
+    )
+
+    parser.add_argument(
+        "--render-workers",
+        type=int,
+        help="Compositor processes sharing frames through shared memory (default 1).",
+    )
+
+    parser.add_argument(
+        "--subtitle-renderer",
+        choices=SUBTITLE_RENDERERS,
+        help=(
+            "'python' draws subtitles pixel-exactly per frame; 'ass' has ffmpeg's "
+            "libass burn in a generated ASS track while encoding."
+        ),
+    )
+    parser.add_argument(
+        "--subtitle-sidecar",
+        action="append",
+        choices=SUBTITLE_SIDECAR_FORMATS,
+        help="Also write the subtitles as an .srt or .ass file next to the output (repeatable).",
+    )
+
+    parser.add_argument(
+        "--stream-output",
+        action="store_true",
+        help="Write fragmented MP4 that can be played while the render is still running.",
+    )
+
+    parser.add_argument(
+        "--memory-budget-mb",
+        type=float,
+        help=(
+            "Estimated peak memory above which the render switches to bounded-memory "
+            "paths (defaults to $VIDEO_OVERLAY_MEMORY_BUDGET_MB)."
+        ),
+    )
+
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="sample",
+        choices=PROFILE_MODES,
+        help=(
+            "Profile the render and write a per-function report next to the "
+            "output ('sample' by default, which adds a folded flame-graph stack "
+            "dump, or 'cprofile' for deterministic profiling and a .pstats file)."
+        ),
+    )
+
+    parser.add_argument(
+        "--batch",
+        metavar="MANIFEST",
+        help="JSON manifest of jobs to render across a pool of worker processes.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes for --batch (defaults to the CPU count).",
+    )
+    parser.add_argument(
+        "--report",
+        help="Where --batch writes its summary report (defaults to batch_report.json).",
+    )
+
     parser.add_argument(
         "--demo",
         action="store_true",
@@ -1684,8 +4805,14 @@ def main() -> None:
         run_demo()
         return
 
+    if args.batch:
+        report = run_batch(args.batch, workers=args.workers, report_path=args.report)
+        if report["failed"]:
+            raise SystemExit(1)
+        return
+
     if not args.main_video:
-        raise SystemExit("Please provide --main-video or use --demo.")
+        raise SystemExit("Please provide --main-video, --batch or use --demo.")
 
     config = ProjectConfig(
         main_video_path=args.main_video,
@@ -1694,8 +4821,25 @@ def main() -> None:
 
     if args.config:
         config = load_project_config_from_json(args.config, config)
-
-    render_project(config)
+    if args.decode_backend:
+        config.decode_backend = args.decode_backend
+    if args.render_workers:
+        config.render_workers = max(1, args.render_workers)
+    if args.stream_output:
+        config.stream_output = True
+    if args.subtitle_renderer:
+        config.subtitle_renderer = args.subtitle_renderer
+    if args.subtitle_sidecar:
+        config.subtitle_sidecars = list(args.subtitle_sidecar)
+    if args.memory_budget_mb:
+        config.memory_budget_mb = args.memory_budget_mb
+
+    if args.profile:
+        profile_call(
+            lambda: render_project(config), config.output_path, mode=args.profile
+        )
+    else:
+        render_project(config)
     print(
         f"[info] Render completed successfully. Output written to {config.output_path}"
     )